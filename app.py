@@ -1,28 +1,92 @@
-from flask import Flask
-from endpoints.detect_outliers import detect_outliers_bp
-from endpoints.fill_missing import fill_missing_bp
-from endpoints.feature_extraction import feature_extraction_bp
-from endpoints.describe_data import describe_data_bp
-from endpoints.get_dataframe import get_dataframe_bp
-from endpoints.upload_data import upload_data_bp
-from endpoints.dash_plot import create_dash_app
-
-app = Flask(__name__)
+from flask import Flask, jsonify
+from flask_compress import Compress
+from core import config
+from core.logs import configure_logging
+from core.metrics import instrument
+from core.workspace import current_dataset, dataset_id, valid_dataset_id
 
 prefix = '/api/v1'
 
-app.register_blueprint(detect_outliers_bp, url_prefix=prefix)
-app.register_blueprint(fill_missing_bp, url_prefix=prefix)
-app.register_blueprint(feature_extraction_bp, url_prefix=prefix)
-app.register_blueprint(describe_data_bp, url_prefix=prefix)
-app.register_blueprint(get_dataframe_bp, url_prefix=prefix)
-app.register_blueprint(upload_data_bp, url_prefix=prefix)
+components = ("api", "dashboard")
+
+
+def parse_components(value):
+    selected = tuple(dict.fromkeys(part.strip().lower() for part in value.split(",") if part.strip())) if isinstance(value, str) else tuple(value)
+    unknown = [name for name in selected if name not in components]
+    if unknown or not selected:
+        raise ValueError(f"Invalid components {', '.join(unknown) or '(none)'}. Use any of {', '.join(components)}.")
+    return selected
+
+
+def register_api(app):
+    # The endpoint modules, and the stages behind them, are only imported by apps that serve the API
+    from endpoints.detect_outliers import detect_outliers_bp
+    from endpoints.fill_missing import fill_missing_bp
+    from endpoints.feature_extraction import feature_extraction_bp
+    from endpoints.describe_data import describe_data_bp
+    from endpoints.get_dataframe import get_dataframe_bp
+    from endpoints.upload_data import upload_data_bp
+    from endpoints.jobs import jobs_bp
+    from endpoints.pipeline import pipeline_bp
+    from endpoints.transform import transform_bp
+    from endpoints.datasets import datasets_bp
+    from endpoints.metrics import metrics_bp
+    from endpoints.masks import masks_bp
+
+    dataset_blueprints = (
+        detect_outliers_bp, fill_missing_bp, feature_extraction_bp, describe_data_bp, get_dataframe_bp,
+        upload_data_bp, jobs_bp, pipeline_bp, transform_bp, masks_bp,
+    )
+
+    # Every endpoint works on the default dataset under /api/v1 and on a named one under /api/v1/datasets/<dataset>
+    names = [datasets_bp.name]
+    for blueprint in dataset_blueprints:
+        app.register_blueprint(blueprint, url_prefix=prefix)
+        app.register_blueprint(blueprint, url_prefix=prefix + '/datasets/<dataset>', name=f"{blueprint.name}_dataset")
+        names += [blueprint.name, f"{blueprint.name}_dataset"]
+    app.register_blueprint(datasets_bp, url_prefix=prefix)
+    app.register_blueprint(metrics_bp, url_prefix=prefix)
+
+    # Every request to these blueprints is timed and counted in /api/v1/metrics; ?profile=1 returns its profile
+    instrument(app, names)
+
+    @app.route(prefix + '/')
+    def index():
+        return "<h1>Welcome to the Data Processing API!</h1>"
+
+
+def create_app(components=None):
+    # "api" serves the REST endpoints, "dashboard" the Dash app; API-only workers never import Dash or Plotly
+    selected = parse_components(components or config.app_components)
+    configure_logging()
+
+    app = Flask(__name__)
+
+    # Non-streamed responses are compressed by Flask-Compress; streamed data responses compress themselves
+    app.config['COMPRESS_ALGORITHM'] = config.compress_algorithms
+    app.config['COMPRESS_STREAMS'] = False
+    Compress(app)
+
+    @app.url_value_preprocessor
+    def pull_dataset(endpoint, values):
+        # Set for every request, since worker threads are reused
+        current_dataset.set((values or {}).pop('dataset', None))
+
+    @app.before_request
+    def check_dataset():
+        if not valid_dataset_id(dataset_id()):
+            return jsonify({"error": "Invalid dataset id."}), 400
+
+    if "api" in selected:
+        register_api(app)
+    if "dashboard" in selected:
+        from endpoints.dash_plot import create_dash_app
+        create_dash_app(app)
+    return app
 
-create_dash_app(app)
 
-@app.route(prefix + '/')
-def index():
-    return "<h1>Welcome to the Data Processing API!</h1>"
+# Served by "flask run", "gunicorn app:app" and the tests; FEATURE_ENGINE_COMPONENTS picks what it serves
+app = create_app()
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,41 @@
+import argparse
+import sys
+
+from benchmarks import harness
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Time the API endpoints and the pipeline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks and store the results as JSON")
+    run.add_argument("--sizes", default="10000x50,100000x50", help="comma-separated ROWSxCOLUMNS dataset sizes")
+    run.add_argument("--repeat", type=int, default=3, help="timed calls per benchmark")
+    run.add_argument("--select", default="", help="comma-separated substrings of the benchmarks to run")
+    run.add_argument("--output", help="results file (default: benchmarks/results/<commit>.json)")
+
+    compare = commands.add_parser("compare", help="compare two results files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown or memory growth (0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        document = harness.run([size for size in args.sizes.split(",") if size], args.repeat,
+                               [name for name in args.select.split(",") if name])
+        output = args.output or f"benchmarks/results/{document['commit'] or 'local'}{'-dirty' if document['dirty'] else ''}.json"
+        harness.save(document, output)
+        print(f"Results written to {output}")
+        return 0
+
+    rows = harness.compare(harness.load(args.baseline), harness.load(args.current), args.threshold)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['benchmark']:32} {row['rows']:>10}x{row['columns']:<5} time x{row['time_ratio']:6.2f}  "
+              f"memory x{row['memory_ratio']:6.2f}  {flag}")
+    # A non-zero exit status lets CI fail on regressions
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
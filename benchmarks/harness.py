@@ -0,0 +1,128 @@
+import gc
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.suite import cases, parse_size, upload_body, upload_case
+from core import config
+
+
+def measure(function, repeat=3):
+    # Wall time of each call, then one more call under tracemalloc for the peak of the Python and
+    # NumPy allocations it made (tracing slows the call down, so it is not timed)
+    seconds = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "first": seconds[0],
+        "min": min(seconds),
+        "median": statistics.median(seconds),
+        "repeat": repeat,
+    }, peak
+
+
+def request(client, dataset, method, path, options):
+    options = {key: value() if callable(value) else value for key, value in options.items()}
+    with client.open(f"/api/v1/datasets/{dataset}{path}", method=method, **options) as response:
+        # Streamed bodies are produced while they are read
+        body = response.get_data()
+    if response.status_code >= 400:
+        raise RuntimeError(f"{method} {path} returned {response.status_code}: {body[:200]!r}")
+    return len(body)
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "storage_format": config.storage_format,
+        "float_dtype": config.float_dtype,
+    }
+
+
+def run(sizes, repeat=3, select=None, log=print):
+    # Runs the suite against a throwaway data directory and returns the results document
+    from app import app
+
+    data_dir, config.data_dir = config.data_dir, tempfile.mkdtemp(prefix="feature-engine-bench-")
+    results = []
+    try:
+        with app.test_client() as client:
+            for size in sizes:
+                rows, columns = parse_size(size)
+                dataset = f"bench-{rows}x{columns}"
+                body = upload_body(rows, columns)
+                for name, method, path, options in (upload_case(body),) + cases:
+                    if select and not any(pattern in name for pattern in select) and name != "upload":
+                        continue
+                    seconds, peak = measure(lambda: request(client, dataset, method, path, options), repeat)
+                    results.append({"benchmark": name, "rows": rows, "columns": columns,
+                                    "seconds": seconds, "peak_bytes": peak})
+                    log(f"{name:32} {rows:>10}x{columns:<5} median {seconds['median']:9.4f}s  "
+                        f"first {seconds['first']:9.4f}s  peak {peak / 2 ** 20:9.1f} MiB")
+    finally:
+        shutil.rmtree(config.data_dir, ignore_errors=True)
+        config.data_dir = data_dir
+    return {
+        **environment(),
+        # Peak resident set of the whole run, in bytes
+        "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "results": results,
+    }
+
+
+def save(document, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(document, file, indent=2)
+
+
+def load(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def compare(baseline, current, threshold=0.1):
+    # Matches the benchmarks of two result documents and returns one row per benchmark; a
+    # regression is a median time or peak memory more than `threshold` above the baseline
+    before = {(result["benchmark"], result["rows"], result["columns"]): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        key = (result["benchmark"], result["rows"], result["columns"])
+        if key not in before:
+            continue
+        old = before[key]
+        time_ratio = result["seconds"]["median"] / max(old["seconds"]["median"], 1e-9)
+        memory_ratio = result["peak_bytes"] / max(old["peak_bytes"], 1)
+        rows.append({
+            "benchmark": result["benchmark"], "rows": result["rows"], "columns": result["columns"],
+            "time_ratio": time_ratio, "memory_ratio": memory_ratio,
+            "regression": time_ratio > 1 + threshold or memory_ratio > 1 + threshold,
+        })
+    return rows
@@ -0,0 +1,34 @@
+import io
+
+from scripts.generate_data import generate_frame
+
+# Benchmarks of the API on a named dataset, in pipeline order: each case reads what the ones
+# before it wrote. Every case is (name, method, path, request options); the path is relative
+# to /api/v1/datasets/<dataset>.
+cases = (
+    ("fill_missing[mean]", "GET", "/fill_missing?method=mean", {}),
+    ("fill_missing[time]", "GET", "/fill_missing?method=time", {}),
+    ("detect_outliers[iqr]", "GET", "/detect_outliers?method=iqr", {}),
+    ("feature_extraction[variance]", "GET", "/feature_extraction?top_x=50", {}),
+    ("describe", "GET", "/describe", {}),
+    ("describe[exact]", "GET", "/describe?exact=true", {}),
+    ("get_dataframe[json]", "GET", "/get_dataframe", {}),
+    ("get_dataframe[arrow]", "GET", "/get_dataframe?format=arrow", {}),
+    ("pipeline", "POST", "/pipeline", {"json": {"fill_method": "mean", "outlier_method": "iqr", "top_x": 50}}),
+)
+
+
+def parse_size(size):
+    # "100000x50" -> (100000, 50)
+    rows, _, columns = size.lower().partition("x")
+    return int(rows), int(columns or 50)
+
+
+def upload_body(rows, columns, seed=42):
+    df = generate_frame(rows, columns, seed=seed)
+    return df.to_csv(index=False).encode()
+
+
+def upload_case(body):
+    # The body is rebuilt for every call since the request consumes the stream
+    return ("upload", "POST", "/upload", {"data": lambda: io.BytesIO(body), "content_type": "text/csv"})
@@ -0,0 +1,141 @@
+import os
+
+import pandas as pd
+
+from core import config
+from core.config import choices
+from core.artifacts import current_version
+from core.backends import resolve_path, stage_path
+from core.models import model_registry
+from core.schema import apply_schema, load_schema
+from core.stats import summary_store
+from core.store import dataset_store
+from core.workspace import dataset_id, workspace
+
+# What happens to rows whose timestamp is not after the last stored one: "skip" drops them
+# (deduplication), "update" replaces the stored rows with the same timestamp and inserts the rest
+conflicts = ("skip", "update")
+
+# Stages extended after the raw data, in order: stage name and output stage
+downstream = (("fill_missing", "imputed"), ("detect_outliers", "transformed"), ("feature_extraction", "selected"))
+
+
+class AppendError(ValueError):
+    pass
+
+
+def prepare_batch(batch, schema):
+    # The batch with the dataset's columns and dtypes, ordered by timestamp, one row per timestamp
+    if not schema:
+        raise AppendError("Upload the dataset before appending to it.")
+    if "timestamp" not in schema["dtypes"]:
+        raise AppendError("Appending needs a timestamp column to key the rows on.")
+    columns = list(schema["dtypes"])
+    missing = [column for column in columns if column not in batch.columns]
+    extra = [column for column in batch.columns if column not in columns]
+    if missing or extra:
+        raise AppendError(f"The batch must have the dataset columns. Missing: {', '.join(missing) or 'none'}; unknown: {', '.join(extra) or 'none'}.")
+    batch = apply_schema(batch[columns], schema)
+    if not pd.api.types.is_datetime64_any_dtype(batch["timestamp"]) or batch["timestamp"].isna().any():
+        raise AppendError("Every row needs a valid timestamp.")
+    # The last row of a repeated timestamp wins
+    batch = batch.drop_duplicates("timestamp", keep="last").sort_values("timestamp", kind="stable")
+    return batch.reset_index(drop=True)
+
+
+def _exists(path):
+    return current_version(path) is not None or os.path.exists(resolve_path(path))
+
+
+def _model(stage):
+    model_id = model_registry.latest(stage)
+    return model_id, model_registry.get(model_id) if model_id else None
+
+
+def _apply(stage, target, df, action, store, context=True):
+    # Runs rows through one stage with the parameters of its last run; None when it has no output
+    # or no fitted model to extend
+    path = stage_path(target)
+    if not _exists(path):
+        return None, None
+    if stage == "feature_extraction":
+        # The features selected by the last run
+        columns = list(store.tail(target, path, 0).columns)
+        if any(column not in df.columns for column in columns):
+            return None, None
+        return df[columns], {"stage": stage}
+    model_id, model = _model(stage)
+    if model is None:
+        return None, None
+    if stage == "fill_missing":
+        # New rows come after the last stored ones, so gaps at the start of the batch are filled from them
+        context = store.tail(target, path, config.append_context_rows) if context else df.iloc[:0]
+        df_filled, report = model.transform(pd.concat([context, df], ignore_index=True))
+        return df_filled.iloc[len(context):], {"stage": stage, "model_id": model_id, **report}
+    df, report = model.transform(df, action)
+    return df, {"stage": stage, "model_id": model_id, **report}
+
+
+def _append(stage, df, path, store):
+    # Appends to a stage output and carries its /describe summary forward, if it had one
+    summary = summary_store.get(path) if _exists(path) else None
+    df = store.append(stage, df, path)
+    if summary is not None:
+        summary_store.extend(summary, path, df)
+    return {"rows": len(df), "version": current_version(path)}
+
+
+def _rewrite(batch, path, action, store):
+    # Rows inside the stored history: the raw data is merged and every stage output is rebuilt
+    # from it with the fitted parameters, which costs a pass over the whole history. Also returns
+    # how many batch rows replaced a stored row; the others are inserted.
+    raw = store.load("raw", path)
+    updated = int(batch["timestamp"].isin(raw["timestamp"]).sum())
+    keep = ~raw["timestamp"].isin(batch["timestamp"])
+    df = pd.concat([raw[keep.to_numpy()], batch], ignore_index=True).sort_values("timestamp", kind="stable")
+    df = store.save("raw", df, path)
+    results = [{"stage": "raw", "rows": len(df), "version": current_version(path)}]
+    for stage, target in downstream:
+        df, result = _apply(stage, target, df, action, store, context=False)
+        if df is None:
+            break
+        df = store.save(target, df, stage_path(target))
+        results.append({**result, "rows": len(df), "version": current_version(stage_path(target))})
+    return results, updated
+
+
+def append_rows(batch, path=None, conflict="skip", action="cap", store=dataset_store):
+    # Adds new rows, keyed by timestamp, to the raw data and pushes only them through the stages
+    # that have outputs, with the parameters fitted by their last run. Stored rows are not revised.
+    if conflict not in conflicts:
+        raise AppendError(f"Invalid conflict mode. Only {choices(conflicts)} are supported.")
+    path = path or stage_path("raw")
+    with workspace.lock():
+        batch = prepare_batch(batch, load_schema())
+        if not _exists(path):
+            raise AppendError("Upload the dataset before appending to it.")
+        last = store.tail("raw", path, 1)["timestamp"]
+        late = batch["timestamp"] <= last.iloc[-1] if len(last) else pd.Series(False, index=batch.index)
+        report = {"dataset": dataset_id(), "received": len(batch), "late": int(late.sum()), "conflict": conflict}
+
+        if late.any() and conflict == "update":
+            stages, updated = _rewrite(batch, path, action, store)
+            report.update({"appended": len(batch) - updated, "updated": updated, "rewritten": True})
+        else:
+            batch = batch[~late.to_numpy()]
+            report.update({"appended": len(batch), "skipped": report["late"], "rewritten": False})
+            stages = []
+            if len(batch):
+                stages.append({"stage": "raw", **_append("raw", batch, path, store)})
+                df = batch
+                for stage, target in downstream:
+                    df, result = _apply(stage, target, df, action, store)
+                    if df is None:
+                        break
+                    stages.append({**result, **_append(target, df, stage_path(target), store)})
+
+    done = {result["stage"] for result in stages}
+    # Outputs left behind by this batch; running their stage again brings them up to date
+    report["stale"] = [stage for stage, target in downstream if stage not in done and _exists(stage_path(target))] if stages else []
+    report["stages"] = stages
+    return report
@@ -0,0 +1,192 @@
+import json
+import os
+import re
+import shutil
+import uuid
+
+import pandas as pd
+
+from core import config
+from core.backends import backend_for_path, read_frame, resolve_path
+from core.schema import apply_schema
+from core.workspace import FileLock
+
+# Stage artifacts are immutable versions under .versions/<stem>/<version><ext> next to the stage
+# file. The stage file itself is a hard link to the latest version, swapped in with an atomic
+# rename, so readers always see a complete file and can pin an older version while it is kept.
+# An appended version only holds its new rows; <version><ext>.segments.json lists the earlier
+# versions whose files hold the rows before them.
+
+
+def _lock(path):
+    return FileLock(os.path.join(os.path.dirname(path) or ".", ".lock"))
+
+
+def read_lock(path):
+    # Shared lock for readers; the directory may not exist yet if nothing was written
+    if not os.path.isdir(os.path.dirname(path) or "."):
+        raise FileNotFoundError(path)
+    return _lock(path).shared()
+
+
+def temp_path(path):
+    # Unique per writer, so concurrent processes never write to the same temporary file
+    return f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+
+
+def versions_dir(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(os.path.dirname(path) or ".", ".versions", stem)
+
+
+def versions(path):
+    # Kept versions of the artifact, oldest first
+    try:
+        names = os.listdir(versions_dir(path))
+    except FileNotFoundError:
+        return []
+    extension = os.path.splitext(path)[1]
+    return sorted(int(name[:-len(extension)]) for name in names if re.fullmatch(r"\d+" + re.escape(extension), name))
+
+
+def version_path(path, version):
+    return os.path.join(versions_dir(path), f"{version:06d}{os.path.splitext(path)[1]}")
+
+
+def current_version(path):
+    # The stage file and its version share an inode
+    try:
+        inode = os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+    for version in reversed(versions(path)):
+        try:
+            if os.stat(version_path(path, version)).st_ino == inode:
+                return version
+        except FileNotFoundError:
+            continue
+    return None
+
+
+def segments(path, version):
+    # Earlier versions whose rows come before the rows of this version; none for a full write
+    try:
+        with open(version_path(path, version) + ".segments.json") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return []
+
+
+def artifact_files(path, version=None):
+    # Files holding the rows of the current (or a pinned) version, in order
+    if version is None:
+        version = current_version(path)
+        if version is None:
+            return [resolve_path(path)]
+    return [version_path(path, part) for part in segments(path, version)] + [artifact_path(path, version)]
+
+
+def read_artifact(path, version=None, schema=None):
+    frames = [read_frame(file, schema) for file in artifact_files(path, version)]
+    if len(frames) == 1:
+        return frames[0]
+    # Categories may differ between the segments, so the dtypes are applied to the whole frame again
+    return apply_schema(pd.concat(frames, ignore_index=True), schema)
+
+
+def iter_artifact(path, chunk_rows, schema=None, version=None):
+    # The rows of the artifact as frames of at most chunk_rows rows, segment by segment
+    for file in artifact_files(path, version):
+        yield from backend_for_path(file).iter_chunks(file, chunk_rows, schema)
+
+
+def artifact_size(path, version=None):
+    # Bytes of the files holding the artifact's rows
+    return sum(os.path.getsize(file) for file in artifact_files(path, version))
+
+
+def read_tail(path, rows, schema=None):
+    # The last rows of the current version, reading only the segments that hold them
+    frames = []
+    for file in reversed(artifact_files(path)):
+        frames.insert(0, backend_for_path(file).tail(file, rows, schema))
+        rows -= len(frames[0])
+        if rows <= 0:
+            break
+    return frames[0] if len(frames) == 1 else apply_schema(pd.concat(frames, ignore_index=True), schema)
+
+
+def artifact_path(path, version=None):
+    # Path to read: the current stage file, or a pinned version
+    if version is None:
+        return resolve_path(path)
+    pinned = version_path(path, version)
+    if not os.path.exists(pinned):
+        raise FileNotFoundError(f"Version {version} of {os.path.basename(path)} is not available.")
+    return pinned
+
+
+def commit(written_path, path, parts=None):
+    # Publishes a completely written file as the next version of the artifact. Callers serialize
+    # writers (workspace.lock); the exclusive lock is only held for the swap itself.
+    os.makedirs(versions_dir(path), exist_ok=True)
+    version = (versions(path) or [0])[-1] + 1
+    target = version_path(path, version)
+    os.replace(written_path, target)
+    if parts:
+        with open(target + ".segments.json", "w") as file:
+            json.dump(parts, file)
+
+    link = temp_path(path)
+    try:
+        os.link(target, link)
+    except OSError:
+        # Filesystems without hard links get a copy instead
+        shutil.copyfile(target, link)
+    with _lock(path).exclusive():
+        os.replace(link, path)
+    _prune(path)
+    return version
+
+
+def _write(df, path):
+    written_path = temp_path(path)
+    try:
+        backend_for_path(path).write(df, written_path)
+    except BaseException:
+        if os.path.exists(written_path):
+            os.remove(written_path)
+        raise
+    return written_path
+
+
+def write_artifact(df, path):
+    return commit(_write(df, path), path)
+
+
+def append_artifact(df, path, schema=None):
+    # Adds rows to the artifact by writing only them as the next version. Once a version has
+    # config.append_max_segments segments, or the stage file is not versioned yet, the whole
+    # artifact is written again instead, so reads never have to combine too many files.
+    previous = current_version(path)
+    parts = segments(path, previous) + [previous] if previous is not None else None
+    if parts is None or len(parts) >= config.append_max_segments:
+        if os.path.exists(resolve_path(path)):
+            df = apply_schema(pd.concat([read_artifact(path, previous, schema), df], ignore_index=True), schema)
+        return write_artifact(df, path)
+    return commit(_write(df, path), path, parts)
+
+
+def _prune(path):
+    directory = versions_dir(path)
+    # Versions kept, and the earlier ones whose files hold some of their rows
+    kept = versions(path)[-max(config.artifact_versions, 1):]
+    referenced = set(kept).union(*(segments(path, version) for version in kept))
+    for version in versions(path):
+        if version in referenced:
+            continue
+        prefix = os.path.basename(version_path(path, version))
+        # The version and files derived from it, like its .stats.npz summary
+        for name in os.listdir(directory):
+            if name.startswith(prefix):
+                os.remove(os.path.join(directory, name))
@@ -0,0 +1,198 @@
+import os
+
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from core import config
+from core.schema import apply_schema, categories, iter_csv, read_csv
+from core.workspace import dataset_dir, dataset_id
+
+# File stem of each pipeline stage output under the data directory
+stage_files = {
+    "raw": "dummy_data_with_outliers",
+    "imputed": "imputed_data",
+    "transformed": "transformed_data",
+    "selected": "selected_features",
+}
+
+
+class CsvWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", newline="")
+        self._header = True
+
+    def write(self, df):
+        df.to_csv(self._file, index=False, header=self._header)
+        self._header = False
+
+    def close(self):
+        self._file.close()
+
+
+class ArrowWriter:
+    # Appends DataFrame chunks as record batches; the first chunk fixes the schema
+    def __init__(self, path, open_writer):
+        self.path = path
+        self.schema = None
+        self._open_writer = open_writer
+        self._writer = None
+
+    def write(self, df):
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        if self._writer is None:
+            self.schema = table.schema
+            self._writer = self._open_writer(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class CsvBackend:
+    name = "csv"
+    extension = ".csv"
+
+    def read(self, path, schema=None):
+        return read_csv(path, schema)
+
+    def tail(self, path, rows, schema=None):
+        df = self.read(path, schema)
+        return df.iloc[len(df) - min(rows, len(df)):]
+
+    def iter_chunks(self, path, chunk_rows, schema=None):
+        return iter_csv(path, chunk_rows, schema)
+
+    def write(self, df, path):
+        df.to_csv(path, index=False)
+
+    def open_writer(self, path):
+        return CsvWriter(path)
+
+
+class FeatherBackend:
+    name = "feather"
+    extension = ".feather"
+
+    def read(self, path, schema=None):
+        # Uncompressed Arrow IPC files are memory-mapped instead of read into a buffer.
+        # Categorical columns are dictionary-encoded by Arrow, without Python strings.
+        table = feather.read_table(path, memory_map=True)
+        return apply_schema(table.to_pandas(split_blocks=True, categories=categories(schema)), schema)
+
+    def tail(self, path, rows, schema=None):
+        # Only the pages of the last rows of the memory-mapped file are read
+        table = feather.read_table(path, memory_map=True)
+        table = table.slice(max(table.num_rows - rows, 0))
+        return apply_schema(table.to_pandas(split_blocks=True, categories=categories(schema)), schema)
+
+    def iter_chunks(self, path, chunk_rows, schema=None):
+        # Slices of the memory-mapped table; an empty file still gives one (empty) chunk with its columns
+        table = feather.read_table(path, memory_map=True)
+        for start in range(0, max(table.num_rows, 1), chunk_rows):
+            yield apply_schema(table.slice(start, chunk_rows).to_pandas(split_blocks=True, categories=categories(schema)), schema)
+
+    def write(self, df, path):
+        feather.write_feather(df, path, compression="uncompressed")
+
+    def open_writer(self, path):
+        # Feather V2 is the Arrow IPC file format, so batches can be streamed into it
+        options = pa.ipc.IpcWriteOptions(compression=None)
+        return ArrowWriter(path, lambda path, schema: pa.ipc.new_file(path, schema, options=options))
+
+
+class ParquetBackend:
+    name = "parquet"
+    extension = ".parquet"
+
+    def read(self, path, schema=None):
+        table = pq.read_table(path, memory_map=True)
+        return apply_schema(table.to_pandas(split_blocks=True, categories=categories(schema)), schema)
+
+    def tail(self, path, rows, schema=None):
+        # The last row groups holding the rows
+        file = pq.ParquetFile(path, memory_map=True)
+        groups, count = [], 0
+        for group in reversed(range(file.num_row_groups)):
+            if count >= rows and groups:
+                break
+            groups.insert(0, group)
+            count += file.metadata.row_group(group).num_rows
+        table = file.read_row_groups(groups) if groups else file.schema_arrow.empty_table()
+        table = table.slice(max(table.num_rows - rows, 0))
+        return apply_schema(table.to_pandas(split_blocks=True, categories=categories(schema)), schema)
+
+    def iter_chunks(self, path, chunk_rows, schema=None):
+        file = pq.ParquetFile(path, memory_map=True)
+        if not file.metadata.num_rows:
+            yield apply_schema(file.schema_arrow.empty_table().to_pandas(), schema)
+            return
+        for batch in file.iter_batches(batch_size=chunk_rows):
+            table = pa.Table.from_batches([batch])
+            yield apply_schema(table.to_pandas(split_blocks=True, categories=categories(schema)), schema)
+
+    def write(self, df, path):
+        df.to_parquet(path, index=False, compression="snappy")
+
+    def open_writer(self, path):
+        return ArrowWriter(path, lambda path, schema: pq.ParquetWriter(path, schema, compression="snappy"))
+
+
+backends = {backend.name: backend for backend in (CsvBackend(), FeatherBackend(), ParquetBackend())}
+
+
+def get_backend(name=None):
+    name = (name or config.storage_format).lower()
+    if name not in backends:
+        raise ValueError(f"Unknown storage format \"{name}\". Supported formats: {', '.join(backends)}.")
+    return backends[name]
+
+
+def backend_for_path(path):
+    extension = os.path.splitext(path)[1].lower()
+    for backend in backends.values():
+        if backend.extension == extension:
+            return backend
+    return backends["csv"]
+
+
+def resolve_path(path):
+    # Falls back to the same stage file in another format, e.g. sample CSVs shipped under data/
+    if os.path.exists(path):
+        return path
+    stem = os.path.splitext(path)[0]
+    for backend in backends.values():
+        if os.path.exists(stem + backend.extension):
+            return stem + backend.extension
+    return path
+
+
+def read_frame(path, schema=None):
+    return backend_for_path(path).read(path, schema)
+
+
+def write_frame(df, path):
+    backend_for_path(path).write(df, path)
+
+
+def stage_path(stage, storage_format=None, dataset=None):
+    return os.path.join(dataset_dir(dataset), stage_files[stage] + get_backend(storage_format).extension)
+
+
+def dataset_path(stage, default_path):
+    # Endpoints keep their module-level path for the default dataset; other datasets use their own directory
+    return default_path if dataset_id() == config.default_dataset else stage_path(stage)
+
+
+def export_frame(df, path, storage_format="csv"):
+    # Opt-in copy of a stage output in another format, next to the original file
+    backend = get_backend(storage_format)
+    export_path = os.path.splitext(path)[0] + backend.extension
+    if export_path != path:
+        # Written next to the target and renamed, so readers never see a partial file
+        temp_path = f"{export_path}.{os.getpid()}.tmp"
+        backend.write(df, temp_path)
+        os.replace(temp_path, export_path)
+    return export_path
@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from itertools import chain
+
+from flask import Response, request
+from werkzeug.http import is_resource_modified
+
+from core import config
+from core.artifacts import artifact_path
+from core.metrics import registry, timed
+from core.responses import compress, stream_response
+from core.schema import schema_path
+from core.workspace import dataset_id
+
+# Responses of the read endpoints, and the dashboard's tables and figures, kept until the stage
+# output they were computed from changes. Entries are keyed by what a read of the output sees
+# (the file of the current or pinned version, whose inode changes with every version, and the
+# dataset schema), the request's parameters and, for bodies, the negotiated encoding. The key's
+# hash is a strong ETag, so conditional requests are answered without building the body.
+
+
+def validator(path, version=None):
+    # (identity, last modified) of a stage output; None when it does not exist
+    try:
+        stat = os.stat(artifact_path(path, version))
+    except FileNotFoundError:
+        return None
+    try:
+        schema = os.stat(schema_path()).st_mtime_ns
+    except FileNotFoundError:
+        schema = None
+    identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size, schema)
+    return identity, datetime.fromtimestamp(int(stat.st_mtime), timezone.utc)
+
+
+def cache_key(*parts):
+    return hashlib.sha256(json.dumps([dataset_id(), *parts], default=str).encode()).hexdigest()[:32]
+
+
+def _count(result):
+    registry.inc("feature_engine_response_cache_total", {"result": result}, 1,
+                 "Cached responses and views: hits, misses and 304 Not Modified answers.")
+
+
+class ResponseCache:
+    # Serialized bodies in memory (least recently used first out) and on disk (oldest first out),
+    # both bounded in bytes; views (Python objects for the dashboard) only in memory
+    def __init__(self, memory_budget=None, disk_budget=None, directory=None):
+        self.memory_budget = config.response_cache_memory if memory_budget is None else memory_budget
+        self.disk_budget = config.response_cache_disk if disk_budget is None else disk_budget
+        self._directory = directory
+        self.memory_usage = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    @property
+    def directory(self):
+        return self._directory or os.path.join(config.data_dir, "responses")
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = self._read(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        # entry: {"value": ...} for views, or {"body": bytes, "mimetype", "encoding", "headers"}
+        entry["nbytes"] = len(entry["body"]) if "body" in entry else len(json.dumps(entry["value"], default=str))
+        self._remember(key, entry)
+        if "body" in entry:
+            self._write(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.memory_usage = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "memory_usage": self.memory_usage, "memory_budget": self.memory_budget}
+
+    def _remember(self, key, entry):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.memory_usage -= previous["nbytes"]
+            if entry["nbytes"] > self.memory_budget:
+                return
+            while self._entries and self.memory_usage + entry["nbytes"] > self.memory_budget:
+                self.memory_usage -= self._entries.popitem(last=False)[1]["nbytes"]
+            self._entries[key] = entry
+            self.memory_usage += entry["nbytes"]
+        registry.set("feature_engine_response_cache_bytes", {}, self.memory_usage, "Memory used by cached responses and views.")
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.response")
+
+    def _read(self, key):
+        # The JSON header line, then the body
+        if self.disk_budget <= 0:
+            return None
+        try:
+            with open(self._path(key), "rb") as file:
+                entry = json.loads(file.readline())
+                entry["body"] = file.read()
+            os.utime(self._path(key))
+        except (FileNotFoundError, ValueError):
+            return None
+        entry["nbytes"] = len(entry["body"])
+        return entry
+
+    def _write(self, key, entry):
+        if self.disk_budget <= 0 or entry["nbytes"] > self.disk_budget:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{self._path(key)}.{uuid.uuid4().hex[:8]}.tmp"
+        header = {name: entry[name] for name in ("mimetype", "encoding", "headers")}
+        with open(temp_path, "wb") as file:
+            file.write(json.dumps(header).encode() + b"\n")
+            file.write(entry["body"])
+        os.replace(temp_path, self._path(key))
+        self._evict_disk()
+
+    def _evict_disk(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".response"):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, name))
+        usage = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if usage <= self.disk_budget:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            usage -= size
+
+
+response_cache = ResponseCache()
+
+
+def _respond(body, status, mimetype, etag, modified, encoding=None, headers=None):
+    response = Response(body, status=status, mimetype=mimetype)
+    response.set_etag(etag)
+    response.last_modified = modified
+    # Clients may keep the body but must revalidate it, which is a 304 while the data is unchanged
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["Vary"] = "Accept, Accept-Encoding"
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers.update(headers or {})
+    return response
+
+
+def cached_response(name, path, build, version=None, variant=()):
+    # A read of the stage output at path, answered from the cache while the output is unchanged.
+    # build() returns (chunks, mimetype, headers) for the body; bodies of at most
+    # config.response_cache_max_entry bytes are kept compressed with the negotiated encoding,
+    # larger ones are streamed as they are built (with the same ETag).
+    current = validator(path, version)
+    if current is None:
+        # Missing outputs are reported by build()
+        chunks, mimetype, headers = build()
+        response = stream_response(chunks, mimetype)
+        response.headers.update(headers)
+        return response
+
+    identity, modified = current
+    encoding = request.accept_encodings.best_match(config.compress_algorithms)
+    key = cache_key(name, identity, sorted(request.args.items(multi=True)), variant, encoding)
+    if not is_resource_modified(request.environ, etag=key, last_modified=modified):
+        _count("not_modified")
+        return _respond(None, 304, None, key, modified)
+
+    entry = response_cache.get(key)
+    if entry is not None:
+        _count("hit")
+        return _respond(entry["body"], 200, entry["mimetype"], key, modified, entry["encoding"], entry["headers"])
+    _count("miss")
+
+    chunks, mimetype, headers = build()
+    chunks, buffered, size = iter(chunks), [], 0
+    with timed("serialize"):
+        for chunk in chunks:
+            buffered.append(chunk)
+            size += len(chunk)
+            if size > config.response_cache_max_entry:
+                break
+        else:
+            buffered = [chunk.encode() if isinstance(chunk, str) else chunk for chunk in buffered]
+            # Compressed like the stream would be, chunk by chunk, so both have the same bytes
+            body = b"".join(compress(buffered, encoding) if encoding else buffered)
+            chunks = None
+    if chunks is not None:
+        response = stream_response(chain(buffered, chunks), mimetype)
+        response.set_etag(key)
+        response.last_modified = modified
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers.update(headers)
+        return response
+    # Not kept if the output changed while the body was built
+    if validator(path, version) == current:
+        response_cache.put(key, {"body": body, "mimetype": mimetype, "encoding": encoding, "headers": headers})
+    return _respond(body, 200, mimetype, key, modified, encoding, headers)
+
+
+def cached_view(name, path, compute, *args):
+    # compute() for a dashboard table or figure of the stage output at path, kept while the output
+    # is unchanged, so a refresh is a stat and a lookup
+    current = validator(path)
+    if current is None:
+        return compute()
+    key = cache_key(name, current[0], args)
+    entry = response_cache.get(key)
+    if entry is not None:
+        _count("hit")
+        return entry["value"]
+    _count("miss")
+    value = compute()
+    if validator(path) == current:
+        response_cache.put(key, {"value": value})
+    return value
@@ -0,0 +1,314 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from core import artifacts, config
+from core.config import choices
+from core.artifacts import artifact_files, artifact_path, artifact_size, iter_artifact, read_tail
+from core.backends import backend_for_path, stage_path
+from core.imputation import Imputer
+from core.masks import MaskBuilder, mask_store
+from core.metrics import processed, timed, timed_chunks
+from core.models import model_registry
+from core.outliers import OutlierDetector, flagged, numeric_block, outlier_actions
+from core.schema import apply_schema, categories, load_schema
+from core.selection import check_scorer, rank_features, scorers, top_features
+from core.stats import ColumnSummary, summary_store
+from core.store import dataset_store
+from core.workspace import dataset_id, workspace
+
+# Out-of-core execution of the stages: the input stage is read in chunks, once to fit (column
+# totals, summaries, a row sample) and once more to transform, and the transformed chunks are
+# written straight to the next version of the output stage. Memory is bounded by the chunk size,
+# not by the length of the history.
+
+execution_modes = ("memory", "chunked", "auto")
+
+# Fill methods that can be fitted and applied chunk by chunk
+chunk_fill_methods = ("mean", "constant", "ffill")
+
+# Peak memory of an in-memory stage relative to the size of its input on disk: the loaded
+# frame, its float64 block, the result block and the result frame
+memory_copies = 4
+
+# Memory per cell of a chunk while it is processed, mostly the sorts of the summary update,
+# used to size chunks from the memory limit
+chunk_cell_bytes = 400
+
+
+class MemoryLimitError(MemoryError):
+    pass
+
+
+def _anonymous_memory():
+    # Resident memory that is not backed by files, so memory-mapped stage files are not counted;
+    # None where /proc is not available
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, IndexError, ValueError):
+        pass
+    return None
+
+
+class MemoryGuard:
+    # Checks the memory a job added since it started against the limit, after every chunk. Jobs
+    # run in their own worker process; in the API process concurrent requests count as well.
+    def __init__(self, limit=None):
+        self.limit = config.job_memory_limit if limit is None else limit
+        self.baseline = _anonymous_memory()
+        self.peak = 0
+
+    def check(self):
+        if self.baseline is None:
+            return
+        used = max(_anonymous_memory() - self.baseline, 0)
+        self.peak = max(self.peak, used)
+        if self.limit and used > self.limit:
+            raise MemoryLimitError(f"The job used {used // 2 ** 20} MB, above the limit of {self.limit // 2 ** 20} MB. "
+                                   "Lower FEATURE_ENGINE_CHUNK_ROWS or raise FEATURE_ENGINE_JOB_MEMORY_MB.")
+
+
+def resolve_mode(mode, path, streamable=True):
+    # The mode a stage reading path runs in. Responses and exports of the whole output frame
+    # (streamable=False) need it in memory, so they only run if it fits under the limit.
+    mode = (mode or config.execution_mode).lower()
+    if mode not in execution_modes:
+        raise ValueError(f"Invalid mode. Only {choices(execution_modes)} are supported.")
+    if mode == "chunked":
+        if not streamable:
+            raise ValueError("Chunked runs only return a JSON summary and cannot export; read the output with /get_dataframe.")
+        return mode
+    needed = artifact_size(path) * memory_copies
+    if not config.job_memory_limit or needed <= config.job_memory_limit:
+        return "memory"
+    if mode == "auto" and streamable:
+        return "chunked"
+    raise MemoryLimitError(f"Processing {os.path.basename(path)} in memory needs about {needed // 2 ** 20} MB, above the "
+                           f"limit of {config.job_memory_limit // 2 ** 20} MB. Run it with mode=chunked and a JSON response.")
+
+
+def chunk_rows(schema=None):
+    # Rows per chunk: FEATURE_ENGINE_CHUNK_ROWS, or as many as a fraction of the memory limit holds
+    if config.chunk_rows:
+        return config.chunk_rows
+    columns = len((schema or {}).get("dtypes", {})) or 100
+    limit = config.job_memory_limit or 2 ** 30
+    return int(np.clip(limit // (columns * chunk_cell_bytes), 1000, 1000000))
+
+
+def content_key(path):
+    # Identifies the content of an artifact without reading it: its files, sizes and mtimes
+    digest = hashlib.sha256()
+    for file in artifact_files(path):
+        stat = os.stat(file)
+        digest.update(f"{os.path.abspath(file)}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+class ChunkedRun:
+    # Reads stage files in chunks and writes stage outputs from chunks for one dataset, under
+    # one memory limit
+    def __init__(self, store=dataset_store, limit=None):
+        self.store = store
+        self.dataset = dataset_id()
+        self.schema = load_schema(self.dataset)
+        self.chunk_rows = chunk_rows(self.schema)
+        self.guard = MemoryGuard(limit)
+        self.columns = 0
+
+    def read(self, path):
+        for chunk in timed_chunks(iter_artifact(path, self.chunk_rows, self.schema), "read"):
+            self.guard.check()
+            yield chunk
+
+    def summary(self, path):
+        # The /describe summary of a stage file, built in one pass if it has none yet
+        summary = summary_store.get(path)
+        if summary is None:
+            for chunk in self.read(path):
+                columns, values = numeric_block(chunk)
+                summary = summary or ColumnSummary(columns)
+                if len(values):
+                    summary.update(values)
+            summary_store.put(artifact_path(path), summary)
+        return summary
+
+    def sample(self, path, columns, complete_rows=False, seed=None):
+        # Fixed-seed uniform sample of at most config.selection_sample_rows rows, in their order:
+        # the rows with the smallest random keys are kept across chunks
+        size = config.selection_sample_rows
+        rng = np.random.default_rng(config.random_seed if seed is None else seed)
+        sample, keys = None, np.empty(0)
+        for chunk in self.read(path):
+            chunk = chunk[columns].dropna() if complete_rows else chunk[columns]
+            sample = chunk if sample is None else pd.concat([sample, chunk], ignore_index=True)
+            keys = np.concatenate([keys, rng.random(len(chunk))])
+            if size and len(keys) > size:
+                keep = np.sort(np.argpartition(keys, size)[:size])
+                sample, keys = sample.iloc[keep].reset_index(drop=True), keys[keep]
+        return sample
+
+    def write(self, stage, chunks):
+        # Streams the chunks into the next version of the stage output, with its /describe summary
+        # and its index of missing and flagged cells
+        path = stage_path(stage)
+        written_path = artifacts.temp_path(path)
+        writer = backend_for_path(path).open_writer(written_path)
+        strings = categories(self.schema)
+        summary, masks, rows = None, MaskBuilder(), 0
+        try:
+            for chunk in chunks:
+                flags = flagged(chunk)
+                # Categories differ between chunks, so categoricals are stored as strings like at upload
+                chunk = apply_schema(chunk, self.schema)
+                chunk = chunk.astype({column: object for column in strings if column in chunk.columns})
+                with timed("write"):
+                    writer.write(chunk)
+                columns, values = numeric_block(chunk)
+                summary = summary or ColumnSummary(columns)
+                if len(values):
+                    summary.update(values)
+                masks.add(chunk, flags)
+                rows += len(chunk)
+                self.columns = len(chunk.columns)
+                self.guard.check()
+            if summary is None:
+                raise ValueError("The input stage has no rows.")
+            with timed("write"):
+                writer.close()
+                version = artifacts.commit(written_path, path)
+        except BaseException:
+            writer.close()
+            if os.path.exists(written_path):
+                os.remove(written_path)
+            raise
+        # Frames cached for the stage are stale, and the summary answers the next /describe
+        self.store.invalidate(self.dataset, stage)
+        summary_store.put(path, summary)
+        mask_store.put(path, masks.finish())
+        workspace.record(self.dataset, stage, path, rows, version=version)
+        processed(rows, self.columns)
+        return {"file_path": path, "version": version, "rows": rows}
+
+    def report(self):
+        return {"mode": "chunked", "chunk_rows": self.chunk_rows, "peak_memory_bytes": self.guard.peak}
+
+
+def fill_missing(run, source, method="mean", overrides=None, max_gap=None, window=None, period=None, value=0.0, reuse=False):
+    imputer = Imputer(method.lower(), overrides, max_gap, window, period, value)
+    methods = {imputer.method, *imputer.overrides.values()}
+    if not methods <= set(chunk_fill_methods):
+        raise ValueError(f"Only {choices(chunk_fill_methods)} fills run in chunks; use mode=memory for the others.")
+    if "ffill" in methods and max_gap not in (None, ""):
+        raise ValueError("max_gap is not supported by chunked forward fills; use mode=memory.")
+    params = {"method": imputer.method, "overrides": imputer.overrides, "max_gap": imputer.max_gap,
+              "window": imputer.window, "period": imputer.period, "value": imputer.value}
+    imputer, model_id, refit = model_registry.fit("fill_missing", params, None, lambda _: imputer.fit_chunks(run.read(source)),
+                                                  reuse, content_key(source))
+    report = {"filled": {}, "total_filled": 0, "remaining_missing": 0}
+
+    def transform():
+        context = None
+        for chunk in run.read(source):
+            # A forward fill continues from the last filled row of the previous chunk
+            frame = chunk if context is None else pd.concat([context, chunk], ignore_index=True)
+            filled = imputer.transform(frame)[0].iloc[len(frame) - len(chunk):]
+            # The report only counts the cells of this chunk
+            _, before = numeric_block(chunk, imputer.columns_)
+            _, after = numeric_block(filled, imputer.columns_)
+            missing = np.isnan(before)
+            counts = imputer.report(missing, missing & ~np.isnan(after))
+            for column, count in counts["filled"].items():
+                report["filled"][column] = report["filled"].get(column, 0) + count
+            report["total_filled"] += counts["total_filled"]
+            report["remaining_missing"] += counts["remaining_missing"]
+            if "ffill" in methods:
+                context = filled.iloc[-1:]
+            yield filled
+
+    written = run.write("imputed", transform())
+    return {**params, **report, "model_id": model_id, "refit": refit}, written
+
+
+def _fit_bounds(run, source, detector):
+    summary = run.summary(source)
+    deviations = None
+    if detector.method == "mad":
+        # One more pass for the absolute deviations from the medians
+        (median,) = summary.quantiles((0.5,))
+        deviations = ColumnSummary(summary.columns, summary.compression)
+        for chunk in run.read(source):
+            _, values = numeric_block(chunk, summary.columns)
+            if len(values):
+                deviations.update(np.abs(values - median))
+    return detector.fit_summary(summary, deviations)
+
+
+def detect_outliers(run, source, method="iqr", fold=None, tail="both", action="cap", reuse=False):
+    detector = OutlierDetector(method, fold, tail)
+    if action not in outlier_actions:
+        raise ValueError(f"Invalid action. Only {choices(outlier_actions)} are supported.")
+    params = {"method": detector.method, "fold": detector.fold, "tail": detector.tail}
+    detector, model_id, refit = model_registry.fit("detect_outliers", params, None, lambda _: _fit_bounds(run, source, detector),
+                                                   reuse, content_key(source))
+    counts = dict.fromkeys(detector.columns_, 0)
+    rows = 0
+
+    def transform():
+        nonlocal rows
+        for chunk in run.read(source):
+            result, report = detector.transform(chunk, action)
+            for column, count in report["outlier_counts"].items():
+                counts[column] += count
+            rows += len(chunk)
+            yield result
+
+    written = run.write("transformed", transform())
+    report = detector.report(np.array(list(counts.values()), dtype=np.int64), rows)
+    return {**report, "action": action, "model_id": model_id, "refit": refit}, written
+
+
+def feature_extraction(run, source, top_x=100, scorer="variance", target=None, seed=None):
+    columns = list(read_tail(source, 0, run.schema).columns)
+    check_scorer(scorer, target, columns)
+    summary = run.summary(source)
+    features = [column for column in summary.columns if column != target]
+    if scorer == "variance":
+        # Exact variances over the whole history, from the summary
+        if not features or not summary.count.any():
+            raise ValueError("No rows or numeric features left to score.")
+        scores = summary.variance()[features].sort_values(ascending=False, kind="stable")
+    else:
+        # The model-based scorers sample rows in memory anyway
+        sample = run.sample(source, features + [target] if target else features, scorers[scorer][2], seed)
+        scores = rank_features(sample, scorer, target, seed, sample_rows=0)
+    selected_columns = top_features(scores, top_x)
+    extra_columns = [column for column in ('timestamp', target) if column and column in columns]
+    written = run.write("selected", (chunk[selected_columns + extra_columns] for chunk in run.read(source)))
+    return {
+        "selected_features": selected_columns,
+        "scorer": scorer,
+        "target": target,
+        "scores": {column: float(score) for column, score in scores.items()},
+    }, written
+
+
+# Stage name -> (function, input stage, output stage), like core.stages.stages
+chunked_stages = {
+    "fill_missing": (fill_missing, "raw", "imputed"),
+    "detect_outliers": (detect_outliers, "imputed", "transformed"),
+    "feature_extraction": (feature_extraction, "transformed", "selected"),
+}
+
+
+def run_stage(name, params=None, store=dataset_store, path=None):
+    function, source, _ = chunked_stages[name]
+    run = ChunkedRun(store)
+    with workspace.lock():
+        result, written = function(run, path or stage_path(source), **(params or {}))
+    return {"stage": name, **written, **result, **run.report()}
@@ -0,0 +1,112 @@
+import os
+
+
+def choices(values):
+    # The accepted values of a parameter, for error messages
+    return ", ".join(f"\"{value}\"" for value in values)
+
+
+data_dir = os.environ.get("FEATURE_ENGINE_DATA_DIR", "data")
+default_dataset = os.environ.get("FEATURE_ENGINE_DEFAULT_DATASET", "default")
+
+# Memory budget (in MB) for parsed DataFrames kept by the dataset store
+store_memory_budget = int(os.environ.get("FEATURE_ENGINE_STORE_MEMORY_MB", "512")) * 1024 * 1024
+
+# Storage format of pipeline stage outputs: "feather" (default), "parquet" or "csv"
+storage_format = os.environ.get("FEATURE_ENGINE_STORAGE_FORMAT", "feather").lower()
+
+# Number of CSV rows parsed per chunk by the streaming upload
+ingest_chunk_rows = int(os.environ.get("FEATURE_ENGINE_INGEST_CHUNK_ROWS", "100000"))
+
+# Background jobs: worker processes for CPU-heavy stages, pending job limit and finished jobs kept
+job_workers = int(os.environ.get("FEATURE_ENGINE_JOB_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+job_max_pending = int(os.environ.get("FEATURE_ENGINE_JOB_MAX_PENDING", "32"))
+job_history = int(os.environ.get("FEATURE_ENGINE_JOB_HISTORY", "100"))
+job_start_method = os.environ.get("FEATURE_ENGINE_JOB_START_METHOD", "spawn")
+
+# Fitted transformers kept in memory and as joblib files under <data_dir>/models
+model_memory_entries = int(os.environ.get("FEATURE_ENGINE_MODEL_MEMORY_ENTRIES", "32"))
+model_disk_entries = int(os.environ.get("FEATURE_ENGINE_MODEL_DISK_ENTRIES", "256"))
+
+# Feature selection: seed for every random step, rows sampled for the model-based scorers,
+# parallel jobs (-1 uses all cores) and forest size for the "tree" scorer
+random_seed = int(os.environ.get("FEATURE_ENGINE_RANDOM_SEED", "42"))
+selection_sample_rows = int(os.environ.get("FEATURE_ENGINE_SELECTION_SAMPLE_ROWS", "100000"))
+selection_n_jobs = int(os.environ.get("FEATURE_ENGINE_SELECTION_N_JOBS", "-1"))
+selection_n_estimators = int(os.environ.get("FEATURE_ENGINE_SELECTION_N_ESTIMATORS", "100"))
+
+# Rows serialized per chunk by streamed data responses
+response_chunk_rows = int(os.environ.get("FEATURE_ENGINE_RESPONSE_CHUNK_ROWS", "10000"))
+
+# Response compression, in order of preference, used for Accept-Encoding negotiation
+compress_algorithms = [name.strip() for name in os.environ.get("FEATURE_ENGINE_COMPRESS_ALGORITHMS", "zstd,br,gzip").split(",") if name.strip()]
+compress_zstd_level = int(os.environ.get("FEATURE_ENGINE_COMPRESS_ZSTD_LEVEL", "3"))
+compress_br_level = int(os.environ.get("FEATURE_ENGINE_COMPRESS_BR_LEVEL", "4"))
+compress_gzip_level = int(os.environ.get("FEATURE_ENGINE_COMPRESS_GZIP_LEVEL", "6"))
+
+# t-digest compression of the cached /describe summaries; higher is more accurate (about 1/compression
+# quantile error in the middle of the distribution, much less in the tails) and uses more memory
+stats_compression = int(os.environ.get("FEATURE_ENGINE_STATS_COMPRESSION", "200"))
+
+# Upper bound on the points per time-series trace sent to the dashboard
+plot_points = int(os.environ.get("FEATURE_ENGINE_PLOT_POINTS", "1000"))
+
+# Datasets other than the default one are deleted after this many seconds without access (0 keeps them)
+dataset_ttl = float(os.environ.get("FEATURE_ENGINE_DATASET_TTL", str(7 * 24 * 3600)))
+
+# Stage artifact versions kept per stage, for readers that pin a version
+artifact_versions = int(os.environ.get("FEATURE_ENGINE_ARTIFACT_VERSIONS", "5"))
+
+# fill_missing defaults: rolling median window (rows, or a duration like "1h") and the period of
+# the seasonal profile (a duration like "1D", or rows when the data has no timestamp column)
+fill_window = os.environ.get("FEATURE_ENGINE_FILL_WINDOW", "5")
+fill_period = os.environ.get("FEATURE_ENGINE_FILL_PERIOD", "1D")
+
+# Dtype of numeric columns of new uploads ("float64" or "float32", which halves their memory), and
+# the largest share of distinct values for which a string column is loaded as a categorical
+float_dtype = os.environ.get("FEATURE_ENGINE_FLOAT_DTYPE", "float64").lower()
+category_max_ratio = float(os.environ.get("FEATURE_ENGINE_CATEGORY_MAX_RATIO", "0.5"))
+
+# Logging: level of the API's loggers ("DEBUG" also logs the head of each frame an endpoint
+# processes) and format, "json" for one structured record per line or "text"
+log_level = os.environ.get("FEATURE_ENGINE_LOG_LEVEL", "INFO").upper()
+log_format = os.environ.get("FEATURE_ENGINE_LOG_FORMAT", "json").lower()
+
+# Request metrics: trace the allocation peak of every request with tracemalloc (slows requests
+# down, so off by default; ?profile=1 always traces), and the functions listed by ?profile=1
+metrics_trace_memory = os.environ.get("FEATURE_ENGINE_METRICS_TRACE_MEMORY", "false").lower() in ("1", "true", "yes")
+profile_rows = int(os.environ.get("FEATURE_ENGINE_PROFILE_ROWS", "40"))
+
+# What the app serves: "api", "dashboard" or both ("api,dashboard"). API-only workers start faster
+# since they never import Dash, and scikit-learn is only imported when a model-based scorer runs
+app_components = os.environ.get("FEATURE_ENGINE_COMPONENTS", "api,dashboard")
+
+# Appends: rows of the previous stage output put before a new batch, so interpolation and rolling
+# windows continue across the boundary, and the segments an appended stage can have before it is
+# written again as one file
+append_context_rows = int(os.environ.get("FEATURE_ENGINE_APPEND_CONTEXT_ROWS", "100"))
+append_max_segments = int(os.environ.get("FEATURE_ENGINE_APPEND_MAX_SEGMENTS", "64"))
+
+# Execution of the stages: "memory" loads the input stage as one DataFrame, "chunked" streams it
+# through in chunks (two passes: fit, then transform) and "auto" picks chunked when the input
+# would not fit under the per-job memory limit (in MB, 0 for no limit). Chunks have
+# FEATURE_ENGINE_CHUNK_ROWS rows, or as many as fit the limit when it is 0.
+execution_mode = os.environ.get("FEATURE_ENGINE_EXECUTION_MODE", "auto").lower()
+job_memory_limit = int(os.environ.get("FEATURE_ENGINE_JOB_MEMORY_MB", "2048")) * 1024 * 1024
+chunk_rows = int(os.environ.get("FEATURE_ENGINE_CHUNK_ROWS", "0"))
+
+# Column-parallel fills, outlier bounds and column summaries: worker processes (1 runs them in
+# the request thread) and the smallest block, in cells, that is split across them
+column_workers = int(os.environ.get("FEATURE_ENGINE_COLUMN_WORKERS", str(os.cpu_count() or 1)))
+column_min_cells = int(os.environ.get("FEATURE_ENGINE_COLUMN_MIN_CELLS", "4000000"))
+
+# Cached responses of /describe and /get_dataframe (serialized and compressed) and dashboard views:
+# memory and disk budgets in MB (0 turns the disk tier off), and the largest body kept, in MB before
+# compression; larger bodies are streamed as they are built
+response_cache_memory = int(os.environ.get("FEATURE_ENGINE_RESPONSE_CACHE_MEMORY_MB", "64")) * 1024 * 1024
+response_cache_disk = int(os.environ.get("FEATURE_ENGINE_RESPONSE_CACHE_DISK_MB", "256")) * 1024 * 1024
+response_cache_max_entry = int(os.environ.get("FEATURE_ENGINE_RESPONSE_CACHE_MAX_ENTRY_MB", "16")) * 1024 * 1024
+
+# Index of missing and flagged cells (core.masks): rows per block of the counts behind the
+# missingness matrix, its finest resolution (a multiple of 8)
+mask_block_rows = int(os.environ.get("FEATURE_ENGINE_MASK_BLOCK_ROWS", "1024"))
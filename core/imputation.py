@@ -0,0 +1,292 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from core import config
+from core.config import choices
+from core.outliers import numeric_block, replace_block
+from core.parallel import map_columns
+
+fill_methods = ("mean", "constant", "linear", "time", "ffill", "bfill", "rolling_median", "seasonal")
+
+# Numeric columns are filled in blocks of this many, which bounds the temporary index arrays
+column_block = 64
+
+
+def parse_overrides(value):
+    # Per-column methods, as {"column": "method"} or "column:method,column:method"
+    if not value:
+        return {}
+    if isinstance(value, dict):
+        items = value.items()
+    else:
+        items = [item.split(":", 1) for item in str(value).split(",") if item.strip()]
+        if any(len(item) != 2 for item in items):
+            raise ValueError("Invalid overrides. Use \"column:method,column:method\".")
+    return {str(column).strip(): str(method).strip().lower() for column, method in items}
+
+
+def timestamps(df):
+    # Timestamp column as int64 nanoseconds, or None without one
+    if "timestamp" not in df.columns:
+        return None
+    return pd.to_datetime(df["timestamp"]).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+
+
+def _neighbours(valid):
+    # Row of the previous and the next valid value of every cell (-1 and len when there is none)
+    size = valid.shape[0]
+    rows = np.arange(size)[:, np.newaxis]
+    previous = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+    following = np.minimum.accumulate(np.where(valid, rows, size)[::-1], axis=0)[::-1]
+    return previous, following
+
+
+def _gaps(values):
+    # Missing cells as (rows, columns) with the rows of their previous and next valid values;
+    # the fills below only compute on these cells
+    missing = np.isnan(values)
+    rows, columns = np.nonzero(missing)
+    previous, following = _neighbours(~missing)
+    return rows, columns, previous[rows, columns], following[rows, columns]
+
+
+def _columns(positions):
+    # A slice for a contiguous run of columns, which indexes without copying
+    if positions and positions[-1] - positions[0] == len(positions) - 1:
+        return slice(positions[0], positions[-1] + 1)
+    return positions
+
+
+def _at(positions, rows):
+    return positions[np.clip(rows, 0, len(positions) - 1)]
+
+
+def _filled(values, rows, columns, fill, fill_values):
+    result = values.copy(order="F")
+    result[rows[fill], columns[fill]] = fill_values
+    return result
+
+
+def interpolate(values, positions, gaps=None, max_gap=None):
+    # Linear interpolation between the surrounding valid values, weighted by position: row number
+    # for "linear", time for "time". Like pandas, values after the last valid one repeat it and
+    # leading gaps stay. With max_gap a gap is only filled if all of it lies within max_gap of
+    # the previous valid value, measured on the gaps positions.
+    rows, columns, previous, following = _gaps(values)
+    size = len(values)
+    inside = (previous >= 0) & (following < size)
+    trailing = (previous >= 0) & (following == size)
+    if max_gap is not None:
+        start = _at(gaps, previous)
+        inside &= _at(gaps, following - 1) - start <= max_gap
+        trailing &= gaps[rows] - start <= max_gap
+    fill = inside | trailing
+    previous, following, columns, rows = previous[fill], following[fill], columns[fill], rows[fill]
+    # Cells after the last valid value repeat it
+    following = np.where(following < size, following, previous)
+    x_previous, x_following = positions[previous], positions[following]
+    y_previous, y_following = values[previous, columns], values[following, columns]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight = np.where(following > previous, (positions[rows] - x_previous) / (x_following - x_previous), 0.0)
+    result = values.copy(order="F")
+    result[rows, columns] = y_previous + weight * (y_following - y_previous)
+    return result
+
+
+def forward_fill(values, gaps=None, max_gap=None):
+    rows, columns, previous, _ = _gaps(values)
+    fill = previous >= 0
+    if max_gap is not None:
+        fill &= gaps[rows] - _at(gaps, previous) <= max_gap
+    return _filled(values, rows, columns, fill, values[previous[fill], columns[fill]])
+
+
+def backward_fill(values, gaps=None, max_gap=None):
+    rows, columns, _, following = _gaps(values)
+    fill = following < len(values)
+    if max_gap is not None:
+        fill &= _at(gaps, following) - gaps[rows] <= max_gap
+    return _filled(values, rows, columns, fill, values[following[fill], columns[fill]])
+
+
+class Imputer:
+    # Fills the missing values of the numeric columns with one method, or a per-column override.
+    # Fitting learns what a new batch cannot provide (means and seasonal profiles); the
+    # interpolating methods use the neighbouring rows of the frame being transformed.
+    def __init__(self, method="mean", overrides=None, max_gap=None, window=None, period=None, value=0.0):
+        self.method = method
+        self.overrides = parse_overrides(overrides)
+        for name in [method, *self.overrides.values()]:
+            if name not in fill_methods:
+                raise ValueError(f"Invalid method. Only {choices(fill_methods)} are supported.")
+        self.max_gap = max_gap
+        self.window = window or config.fill_window
+        self.period = period or config.fill_period
+        self.value = float(value)
+
+    def _groups(self):
+        groups = {}
+        for position, column in enumerate(self.columns_):
+            groups.setdefault(self.overrides.get(column, self.method), []).append(position)
+        return groups
+
+    def _set_columns(self, columns):
+        unknown = [column for column in self.overrides if column not in columns]
+        if unknown:
+            raise ValueError(f"Overrides for unknown or non-numeric columns: {', '.join(unknown)}")
+        self.columns_ = columns
+        self.fill_values_ = np.full(len(columns), np.nan)
+        self.fill_values_[self._groups().get("constant", [])] = self.value
+        self.resolution_, self.profile_ = None, None
+
+    def fit(self, df):
+        columns, values = numeric_block(df)
+        self._set_columns(columns)
+        groups = self._groups()
+        if "mean" in groups:
+            columns = _columns(groups["mean"])
+            with warnings.catch_warnings():
+                # All-NaN columns keep their missing values
+                warnings.simplefilter("ignore", RuntimeWarning)
+                self.fill_values_[columns] = np.nanmean(values[:, columns], axis=0)
+        if "seasonal" in groups:
+            self._fit_profile(df, values)
+        return self
+
+    def fit_chunks(self, chunks):
+        # Same fit one chunk at a time, from column totals and counts. The seasonal profile needs
+        # the sampling interval of the whole history and is only fitted by fit.
+        if "seasonal" in [self.method, *self.overrides.values()]:
+            raise ValueError("The seasonal fill cannot be fitted in chunks.")
+        totals = counts = None
+        for chunk in chunks:
+            columns, values = numeric_block(chunk)
+            if totals is None:
+                self._set_columns(columns)
+                totals, counts = np.zeros(len(columns)), np.zeros(len(columns), dtype=np.int64)
+            totals += np.nansum(values, axis=0)
+            counts += np.count_nonzero(~np.isnan(values), axis=0)
+        if totals is None:
+            raise ValueError("No rows to fit on.")
+        positions = self._groups().get("mean", [])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.fill_values_[positions] = (totals / counts)[positions]
+        return self
+
+    def _fit_profile(self, df, values):
+        # Mean of every column per phase of the period, e.g. per time of day for "1D". The phases
+        # are as fine as the median sampling interval; without timestamps the period is in rows.
+        stamps = timestamps(df)
+        if stamps is not None:
+            period = pd.Timedelta(self.period).value
+            steps = np.diff(stamps)
+            steps = steps[steps > 0]
+            self.resolution_ = int(np.median(steps)) if len(steps) else period
+        phase, phases = self._phase(len(df), stamps)
+        present = ~np.isnan(values)
+        width = values.shape[1]
+        cells = (phase[:, np.newaxis] * width + np.arange(width)).ravel()
+        totals = np.bincount(cells, weights=np.where(present, values, 0.0).ravel(), minlength=phases * width)
+        counts = np.bincount(cells, weights=present.ravel(), minlength=phases * width)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.profile_ = (totals / counts).reshape(phases, width)
+
+    def _phase(self, rows, stamps):
+        if self.resolution_ is None:
+            try:
+                period = int(self.period)
+            except (TypeError, ValueError):
+                raise ValueError("Seasonal fill needs a timestamp column, or a period given in rows.")
+            if period < 1:
+                raise ValueError("The seasonal period must be at least one row.")
+            return np.arange(rows) % period, period
+        if stamps is None:
+            raise ValueError("The seasonal profile was fitted on timestamps; the data has no timestamp column.")
+        period = pd.Timedelta(self.period).value
+        return stamps % period // self.resolution_, -(-period // self.resolution_)
+
+    def _gaps(self, rows, stamps):
+        # max_gap is a number of rows, or a duration like "2h" measured on the timestamps
+        if self.max_gap in (None, ""):
+            return None, None
+        try:
+            return np.arange(rows, dtype=np.float64), float(self.max_gap)
+        except (TypeError, ValueError):
+            pass
+        try:
+            max_gap = pd.Timedelta(self.max_gap).value
+        except ValueError:
+            raise ValueError("max_gap must be a number of rows or a duration like \"2h\".")
+        if stamps is None:
+            raise ValueError("A max_gap duration needs a timestamp column.")
+        return stamps, max_gap
+
+    def transform(self, df):
+        missing_columns = [column for column in self.columns_ if column not in df.columns]
+        if missing_columns:
+            raise ValueError(f"Columns not seen during fit are missing: {', '.join(missing_columns)}")
+        _, values = numeric_block(df, self.columns_)
+        # Column-major, so the column blocks are contiguous
+        values = np.asfortranarray(values)
+        stamps = timestamps(df)
+        missing = np.isnan(values)
+        # Large blocks are filled by column shards in parallel
+        _, result = map_columns(self._fill_columns, values, stamps, output=True)
+        filled = missing & ~np.isnan(result)
+        return replace_block(df, self.columns_, result), self.report(missing, filled)
+
+    def _fill_columns(self, start, stop, values, result, stamps):
+        # Fills the columns start:stop of values into result
+        for method, positions in self._groups().items():
+            positions = [position for position in positions if start <= position < stop]
+            for first in range(0, len(positions), column_block):
+                block = _columns(positions[first:first + column_block])
+                result[:, block] = self._fill(method, values[:, block], block, stamps)
+
+    def _fill(self, method, values, block, stamps):
+        if method in ("mean", "constant"):
+            return np.where(np.isnan(values), self.fill_values_[block], values)
+        if method == "seasonal":
+            phase, phases = self._phase(len(values), stamps)
+            profile = self.profile_[:, block][np.minimum(phase, len(self.profile_) - 1)]
+            return np.where(np.isnan(values), profile, values)
+        if method == "rolling_median":
+            return self._rolling_median(values, stamps)
+        gaps, max_gap = self._gaps(len(values), stamps)
+        if method == "ffill":
+            return forward_fill(values, gaps, max_gap)
+        if method == "bfill":
+            return backward_fill(values, gaps, max_gap)
+        if method == "time":
+            if stamps is None:
+                raise ValueError("Time interpolation needs a timestamp column.")
+            positions = stamps.astype(np.float64)
+        else:
+            positions = np.arange(len(values), dtype=np.float64)
+        return interpolate(values, positions, gaps, max_gap)
+
+    def _rolling_median(self, values, stamps):
+        # Centred median over a number of rows, or over a duration like "1h" of the timestamps
+        frame = pd.DataFrame(values)
+        try:
+            window = int(self.window)
+        except (TypeError, ValueError):
+            if stamps is None:
+                raise ValueError("A rolling window duration needs a timestamp column.")
+            window = self.window
+            frame.index = pd.DatetimeIndex(stamps)
+        medians = frame.rolling(window, center=True, min_periods=1).median().to_numpy()
+        return np.where(np.isnan(values), medians, values)
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    def report(self, missing, filled):
+        counts = np.count_nonzero(filled, axis=0)
+        return {
+            "filled": {column: int(count) for column, count, gaps in zip(self.columns_, counts, missing.any(axis=0)) if gaps},
+            "total_filled": int(counts.sum()),
+            "remaining_missing": int(np.count_nonzero(missing) - counts.sum()),
+        }
@@ -0,0 +1,94 @@
+import os
+
+import pandas as pd
+
+from core import artifacts, config
+from core.backends import backend_for_path
+from core.masks import MaskBuilder, mask_store
+from core.metrics import processed, timed, timed_chunks
+from core.outliers import numeric_block
+from core.schema import infer_schema, save_schema, storage_dtypes
+from core.stats import ColumnSummary, summary_store
+
+
+class IngestError(ValueError):
+    pass
+
+
+def _validate_chunk(chunk, schema, first_row):
+    dtypes = storage_dtypes(schema)
+    if list(chunk.columns) != list(dtypes):
+        raise IngestError(f"Column mismatch at row {first_row}.")
+    try:
+        dates = [column for column, dtype in dtypes.items() if dtype.startswith("datetime64")]
+        for column in dates:
+            # The format found in the first chunk, so every chunk is parsed the same way and fast
+            chunk[column] = pd.to_datetime(chunk[column], format=schema.get("timestamp_format")).astype(dtypes[column])
+        return chunk.astype({column: dtype for column, dtype in dtypes.items() if column not in dates})
+    except (TypeError, ValueError) as e:
+        last_row = first_row + len(chunk) - 1
+        raise IngestError(f"Rows {first_row}-{last_row} do not match the schema inferred from the first chunk: {e}")
+
+
+def ingest_csv(stream, path, chunk_rows=None, float_dtype=None, columns=None):
+    chunk_rows = chunk_rows or config.ingest_chunk_rows
+    # Chunks are written to a temporary file so a rejected upload leaves the previous data in place
+    temp_path = artifacts.temp_path(path)
+    writer = backend_for_path(path).open_writer(temp_path)
+    schema = None
+    summary = None
+    masks = MaskBuilder()
+    rows = 0
+    try:
+        try:
+            # Chunked reading needs pandas' C parser; only the listed columns are parsed
+            reader = pd.read_csv(stream, chunksize=chunk_rows, usecols=columns or None)
+            # Parsing and writing are timed separately from validation and the summary
+            for chunk in timed_chunks(reader, "read"):
+                if schema is None:
+                    try:
+                        schema = infer_schema(chunk, float_dtype)
+                    except ValueError as e:
+                        raise IngestError(str(e))
+                chunk = _validate_chunk(chunk, schema, rows)
+                with timed("write"):
+                    writer.write(chunk)
+                # The /describe summary is built along the way, so the new data is never rescanned
+                numeric_columns, values = numeric_block(chunk)
+                summary = summary or ColumnSummary(numeric_columns)
+                summary.update(values)
+                # So is the index of the missing cells
+                masks.add(chunk)
+                rows += len(chunk)
+        except pd.errors.EmptyDataError:
+            raise IngestError("The uploaded file is empty.")
+        except pd.errors.ParserError as e:
+            raise IngestError(f"Could not parse CSV after row {rows}: {e}")
+        except IngestError:
+            raise
+        except ValueError as e:
+            # usecols naming columns the file does not have
+            if not columns:
+                raise
+            raise IngestError(str(e))
+        with timed("write"):
+            writer.close()
+            version = artifacts.commit(temp_path, path)
+    except BaseException:
+        writer.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    processed(rows, len(schema["dtypes"]))
+    summary_store.put(path, summary)
+    mask_store.put(path, masks.finish())
+    # Readers of every stage of the dataset use this schema from now on
+    save_schema(schema)
+    return {
+        "rows": rows,
+        "columns": len(schema["dtypes"]),
+        "schema": schema["dtypes"],
+        "file_path": path,
+        "version": version,
+    }
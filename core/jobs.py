@@ -0,0 +1,143 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from core import config
+from core.config import choices
+from core.chunked import execution_modes
+from core.stages import run_stage, stages
+from core.store import dataset_store
+from core.workspace import current_dataset, dataset_id
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+def _execute_stage(name, params, data_dir, dataset, mode=None):
+    # Runs inside a pool worker, which keeps its own dataset store
+    config.data_dir = data_dir
+    current_dataset.set(dataset)
+    return run_stage(name, params, mode=mode)
+
+
+class JobManager:
+    def __init__(self, max_workers=None, max_pending=None, history=None):
+        self.max_workers = max_workers or config.job_workers
+        self.max_pending = max_pending or config.job_max_pending
+        self.history = history or config.job_history
+        self._jobs = OrderedDict()
+        self._lock = threading.RLock()
+        self._executor = None
+
+    def submit(self, pipeline, dataset=None):
+        for step in pipeline:
+            if step["stage"] not in stages:
+                raise ValueError(f"Unknown stage \"{step['stage']}\". Supported stages: {', '.join(stages)}.")
+            if step.get("mode") and str(step["mode"]).lower() not in execution_modes:
+                raise ValueError(f"Invalid mode. Only {choices(execution_modes)} are supported.")
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "dataset": dataset or dataset_id(),
+            "status": "queued",
+            "progress": 0.0,
+            "pipeline": pipeline,
+            "current_stage": None,
+            "result": [],
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        with self._lock:
+            pending = sum(1 for other in self._jobs.values() if other["status"] in ("queued", "running"))
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"Too many pending jobs ({pending}). Try again later.")
+            self._jobs[job["id"]] = job
+            self._trim()
+
+        threading.Thread(target=self._run, args=(job,), daemon=True).start()
+        return self.get(job["id"])
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return None if job is None else {key: value for key, value in job.items() if key != "_future"}
+
+    def list(self, dataset=None):
+        with self._lock:
+            jobs = [self.get(job_id) for job_id in reversed(self._jobs)]
+        return [job for job in jobs if dataset is None or job["dataset"] == dataset]
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] in ("queued", "running"):
+                # A stage already running in a worker finishes, but no further stage is started
+                job["status"] = "cancelled"
+                job["finished_at"] = time.time()
+                future = job.get("_future")
+                if future is not None:
+                    future.cancel()
+        return self.get(job_id)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context(config.job_start_method)
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            return self._executor
+
+    def _run(self, job):
+        pipeline = job["pipeline"]
+        for index, step in enumerate(pipeline):
+            with self._lock:
+                if job["status"] == "cancelled":
+                    return
+                job["status"] = "running"
+                job["current_stage"] = step["stage"]
+                job["started_at"] = job["started_at"] or time.time()
+            try:
+                future = self._pool().submit(_execute_stage, step["stage"], step.get("params") or {}, config.data_dir,
+                                             job["dataset"], step.get("mode"))
+                with self._lock:
+                    job["_future"] = future
+                result = future.result()
+            except Exception as e:
+                with self._lock:
+                    if job["status"] != "cancelled":
+                        job["status"] = "failed"
+                        job["error"] = str(e) or type(e).__name__
+                        job["finished_at"] = time.time()
+                return
+
+            # The worker wrote the stage output; drop the parent's cached copy
+            dataset_store.invalidate(job["dataset"], stages[step["stage"]][2])
+            with self._lock:
+                job["result"].append(result)
+                job["progress"] = (index + 1) / len(pipeline)
+
+        with self._lock:
+            if job["status"] != "cancelled":
+                job["status"] = "succeeded"
+                job["current_stage"] = None
+                job["finished_at"] = time.time()
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] not in ("queued", "running")]
+        while len(self._jobs) > self.history and finished:
+            del self._jobs[finished.pop(0)]
+
+
+job_manager = JobManager()
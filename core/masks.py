@@ -0,0 +1,282 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core import config
+from core.artifacts import artifact_path, iter_artifact
+from core.backends import resolve_path
+from core.outliers import flagged
+
+# Index of where the missing cells and the flagged outliers of a stage file are, so queries about
+# them never read the data: one bit per row and column, packed along the rows (np.packbits, eight
+# rows per byte, about 1/64 of the float64 data), with counts per column and per block of
+# config.mask_block_rows rows, and the row timestamps. Outlier bits are the cells flagged by the
+# outlier detection that wrote the file (both actions); other files have none.
+
+kinds = ("missing", "outliers")
+
+# Set bits of every byte value
+_popcount = np.unpackbits(np.arange(256, dtype=np.uint8)[:, np.newaxis], axis=1).sum(axis=1).astype(np.uint8)
+
+
+class MaskIndex:
+    def __init__(self, columns, rows, bits, timestamps=None):
+        self.columns = list(columns)
+        self.rows = rows
+        # kind -> (ceil(rows / 8) x columns) uint8, or None when the file has no such information
+        self.bits = bits
+        self.timestamps = timestamps
+        self.sorted = timestamps is not None and bool(np.all(timestamps[1:] >= timestamps[:-1]))
+        self.counts, self.blocks = {}, {}
+        step = max(config.mask_block_rows // 8, 1)
+        for kind, packed in bits.items():
+            if packed is None:
+                continue
+            # Cells per column, and per block of rows for the matrix
+            per_byte = _popcount[packed]
+            self.blocks[kind] = np.add.reduceat(per_byte, np.arange(0, len(packed), step), axis=0, dtype=np.int64) if len(packed) else np.zeros((0, len(self.columns)), dtype=np.int64)
+            self.counts[kind] = self.blocks[kind].sum(axis=0)
+        self.block_rows = step * 8
+
+    def kind(self, kind):
+        if kind not in kinds:
+            raise ValueError(f"Invalid kind. Only {', '.join(kinds)} are supported.")
+        if self.bits.get(kind) is None:
+            raise ValueError(f"The stage has no {kind} index; outliers are indexed for the output of outlier detection.")
+        return self.bits[kind]
+
+    def positions(self, columns=None):
+        if not columns:
+            return np.arange(len(self.columns))
+        unknown = [column for column in columns if column not in self.columns]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+        return np.array([self.columns.index(column) for column in columns], dtype=np.intp)
+
+    def columns_over(self, kind="missing", percent=0.0):
+        # Columns with more than percent % of their cells missing (or flagged), most first
+        self.kind(kind)
+        counts = self.counts[kind]
+        shares = counts / self.rows * 100 if self.rows else np.zeros(len(counts))
+        order = [position for position in np.argsort(-shares, kind="stable") if shares[position] > percent]
+        return [{"column": self.columns[position], "count": int(counts[position]), "percent": float(shares[position])} for position in order]
+
+    def window(self, start=None, end=None):
+        # First and last row (exclusive) and a mask of the rows, or None when they are contiguous
+        if start is None and end is None:
+            return 0, self.rows, None
+        if self.timestamps is None:
+            raise ValueError("The dataset has no timestamp column to filter on.")
+        low = np.iinfo(np.int64).min if start is None else pd.Timestamp(start).value
+        high = np.iinfo(np.int64).max if end is None else pd.Timestamp(end).value
+        if self.sorted:
+            return int(np.searchsorted(self.timestamps, low, "left")), int(np.searchsorted(self.timestamps, high, "right")), None
+        inside = (self.timestamps >= low) & (self.timestamps <= high)
+        return 0, self.rows, inside
+
+    def flagged_rows(self, kind="outliers", start=None, end=None, columns=None, limit=100):
+        # Rows in the time window with a flagged (or missing) cell in any of the columns, and the
+        # columns flagged in the first limit of them
+        packed = self.kind(kind)
+        positions = self.positions(columns)
+        first, stop, inside = self.window(start, end)
+        # Only the bytes of the window are unpacked
+        low, high = first // 8, -(-stop // 8)
+        block = packed[low:high][:, positions]
+        rows = np.unpackbits(np.bitwise_or.reduce(block, axis=1) if len(positions) else np.zeros(high - low, np.uint8))
+        rows = low * 8 + np.flatnonzero(rows)
+        rows = rows[(rows >= first) & (rows < stop)]
+        if inside is not None:
+            rows = rows[inside[rows]]
+        shown = rows[:limit]
+        cells = (block[shown // 8 - low] >> (7 - shown % 8)[:, np.newaxis]) & 1
+        result = []
+        for row, bits in zip(shown, cells):
+            entry = {"row": int(row), "columns": [self.columns[positions[position]] for position in np.flatnonzero(bits)]}
+            if self.timestamps is not None:
+                entry["timestamp"] = str(pd.Timestamp(self.timestamps[row]))
+            result.append(entry)
+        return {"total": len(rows), "rows": result}
+
+    def matrix(self, kind="missing", bins=100, columns=None):
+        # Share of missing (or flagged) cells per column in bins of consecutive rows, from the
+        # block counts: a missingness matrix at the resolution of a plot
+        self.kind(kind)
+        positions = self.positions(columns)
+        blocks = self.blocks[kind][:, positions]
+        edges = np.unique(np.linspace(0, len(blocks), min(max(bins, 1), len(blocks)) + 1).astype(np.intp))
+        counts = np.add.reduceat(blocks, edges[:-1], axis=0) if len(blocks) else np.zeros((0, len(positions)))
+        starts = edges[:-1] * self.block_rows
+        stops = np.minimum(edges[1:] * self.block_rows, self.rows)
+        result = {
+            "columns": [self.columns[position] for position in positions],
+            "rows": [[int(first), int(stop)] for first, stop in zip(starts, stops)],
+            "share": np.round(counts / (stops - starts)[:, np.newaxis], 6).tolist(),
+        }
+        if self.timestamps is not None:
+            result["timestamps"] = [[str(pd.Timestamp(self.timestamps[first])), str(pd.Timestamp(self.timestamps[stop - 1]))]
+                                    for first, stop in zip(starts, stops)]
+        return result
+
+    def report(self):
+        return {
+            "rows": self.rows,
+            "columns": len(self.columns),
+            **{f"total_{kind}": int(counts.sum()) for kind, counts in self.counts.items()},
+            "bytes": sum(packed.nbytes for packed in self.bits.values() if packed is not None),
+        }
+
+    def save(self, path, signature):
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as file:
+            np.savez(
+                file,
+                columns=np.array(json.dumps(self.columns)),
+                signature=np.array(signature, dtype=np.int64),
+                rows=np.array(self.rows),
+                **{kind: packed for kind, packed in self.bits.items() if packed is not None},
+                **({"timestamps": self.timestamps} if self.timestamps is not None else {}),
+            )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            bits = {kind: data[kind] if kind in data else None for kind in kinds}
+            timestamps = data["timestamps"] if "timestamps" in data else None
+            index = cls(json.loads(str(data["columns"])), int(data["rows"]), bits, timestamps)
+            return index, tuple(int(value) for value in data["signature"])
+
+
+class MaskBuilder:
+    # Builds the index of a file from its rows in order, chunk by chunk. Rows are packed eight at
+    # a time; the last few are kept unpacked until more arrive.
+    def __init__(self, index=None):
+        self.columns, self.rows = None, 0
+        self.packed = {kind: [] for kind in kinds}
+        self.pending = {kind: None for kind in kinds}
+        self.flagged = False
+        self.timestamps = []
+        if index is not None:
+            # Appending to an indexed file
+            self.columns, self.rows = index.columns, index.rows
+            self.flagged = index.bits["outliers"] is not None
+            for kind in kinds:
+                packed = index.bits[kind]
+                if packed is None:
+                    packed = np.zeros((-(-index.rows // 8), len(index.columns)), dtype=np.uint8)
+                whole = index.rows // 8
+                self.packed[kind].append(packed[:whole])
+                self.pending[kind] = np.unpackbits(packed[whole:], axis=0)[:index.rows % 8].astype(bool)
+            if index.timestamps is not None:
+                self.timestamps.append(index.timestamps)
+
+    def add(self, df, flags=None):
+        # flags: (columns, packed bits) of the outliers flagged in df, see core.outliers.flagged
+        if self.columns is None:
+            self.columns = [str(column) for column in df.columns]
+        missing = df.isna().to_numpy()
+        outliers = np.zeros_like(missing)
+        if flags is not None:
+            flag_columns, bits = flags
+            positions = [self.columns.index(str(column)) for column in flag_columns if str(column) in self.columns]
+            kept = [offset for offset, column in enumerate(flag_columns) if str(column) in self.columns]
+            outliers[:, positions] = np.unpackbits(bits, axis=0, count=len(df))[:, kept].astype(bool)
+            self.flagged = True
+        for kind, mask in (("missing", missing), ("outliers", outliers)):
+            if self.pending[kind] is not None and len(self.pending[kind]):
+                mask = np.concatenate([self.pending[kind], mask])
+            whole = len(mask) // 8 * 8
+            self.packed[kind].append(np.packbits(mask[:whole], axis=0))
+            self.pending[kind] = mask[whole:]
+        if "timestamp" in df.columns and pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
+            # Missing timestamps sort first
+            self.timestamps.append(df["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64))
+        self.rows += len(df)
+        return self
+
+    def finish(self):
+        bits = {}
+        for kind in kinds:
+            parts = self.packed[kind] + ([np.packbits(self.pending[kind], axis=0)] if self.pending[kind] is not None and len(self.pending[kind]) else [])
+            bits[kind] = np.concatenate(parts) if parts else np.zeros((0, len(self.columns or [])), dtype=np.uint8)
+        if not self.flagged:
+            bits["outliers"] = None
+        timestamps = np.concatenate(self.timestamps) if self.timestamps and sum(map(len, self.timestamps)) == self.rows else None
+        return MaskIndex(self.columns or [], self.rows, bits, timestamps)
+
+
+def mask_path(path):
+    return path + ".masks.npz"
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class MaskStore:
+    # Indexes of stage files, in memory and next to the file on disk, tied to the file's
+    # inode/mtime/size like the /describe summaries (core.stats.SummaryStore)
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        # The index of the file as it is now, if one was built; never reads the file
+        path = resolve_path(path)
+        signature = _signature(path)
+        with self._lock:
+            cached = self._indexes.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        try:
+            index, stored_signature = MaskIndex.load(mask_path(path))
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+        if stored_signature != signature:
+            return None
+        with self._lock:
+            self._indexes[path] = (signature, index)
+        return index
+
+    def load(self, path, schema=None):
+        # Files written before they were indexed are indexed in one chunked pass
+        index = self.get(path)
+        if index is None:
+            builder = MaskBuilder()
+            for chunk in iter_artifact(path, config.ingest_chunk_rows, schema):
+                builder.add(chunk)
+            index = builder.finish()
+            self.put(artifact_path(path), index)
+        return index
+
+    def put(self, path, index):
+        path = resolve_path(path)
+        signature = _signature(path)
+        index.save(mask_path(path), signature)
+        with self._lock:
+            self._indexes[path] = (signature, index)
+
+    def build(self, path, df, flags=None):
+        self.put(path, MaskBuilder().add(df, flags).finish())
+
+    def extend(self, index, path, df, flags=None):
+        # Index of a file that got the rows of df appended, from the index it had before
+        self.put(path, MaskBuilder(index).add(df, flags).finish())
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+
+mask_store = MaskStore()
+
+
+def index_frame(path, df, original=None):
+    # Indexes a stage file just written from df, with the outliers flagged in the frame it came
+    # from (df before the dataset dtypes were applied)
+    mask_store.build(path, df, flagged(df if original is None else original))
@@ -0,0 +1,279 @@
+import cProfile
+import logging
+import pstats
+import resource
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, jsonify, request
+
+from core import config
+from core.workspace import dataset_id
+
+logger = logging.getLogger(__name__)
+
+# Request latency histogram buckets, in seconds
+buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Phases timed inside a request; the rest of its wall time is compute
+io_phases = ("read", "write", "serialize")
+
+current_request = ContextVar("current_request", default=None)
+
+
+class RequestRecord:
+    __slots__ = ("endpoint", "started", "phases", "rows", "columns", "profiler", "tracing")
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(io_phases, 0.0)
+        self.rows = 0
+        self.columns = 0
+        self.profiler = None
+        self.tracing = False
+
+
+class Registry:
+    # Counters, gauges and histograms keyed by (name, labels), rendered in the Prometheus text format
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._types = {}
+        self._values = {}
+        self._histograms = {}
+
+    def _declare(self, name, kind, description):
+        self._types.setdefault(name, kind)
+        self._help.setdefault(name, description)
+
+    def inc(self, name, labels, amount=1, description=""):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, "counter", description)
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, name, labels, value, description="", keep_max=False):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, "gauge", description)
+            self._values[key] = max(value, self._values.get(key, value)) if keep_max else value
+
+    def total(self, name, labels, value, description=""):
+        # A counter kept by someone else (the kernel, the dataset store), read as its running total
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, "counter", description)
+            self._values[key] = value
+
+    def observe(self, name, labels, value, description=""):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, "histogram", description)
+            histogram = self._histograms.setdefault(key, [[0] * len(buckets), 0, 0.0])
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[0][index] += 1
+            histogram[1] += 1
+            histogram[2] += value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._histograms.clear()
+
+    def value(self, name, **labels):
+        with self._lock:
+            return self._values.get((name, tuple(sorted(labels.items()))))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name in sorted(self._types):
+                lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {self._types[name]}")
+                for (key_name, labels), value in sorted(self._values.items()):
+                    if key_name == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                for (key_name, labels), (counts, count, total) in sorted(self._histograms.items()):
+                    if key_name != name:
+                        continue
+                    for bound, bucket_count in zip(buckets, counts):
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {bucket_count}")
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+                    lines.append(f"{name}_count{_labels(labels)} {count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+
+@contextmanager
+def timed(phase):
+    # Adds the time spent in the block to a phase ("read", "write", "serialize") of the current request
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = current_request.get()
+        if record is not None:
+            record.phases[phase] = record.phases.get(phase, 0.0) + time.perf_counter() - started
+
+
+def timed_chunks(chunks, phase="serialize"):
+    # Times the production of each chunk of a streamed body
+    chunks = iter(chunks)
+    while True:
+        with timed(phase):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def processed(rows, columns):
+    # The largest frame a request worked on is what it processed
+    record = current_request.get()
+    if record is not None:
+        record.rows = max(record.rows, rows)
+        record.columns = max(record.columns, columns)
+
+
+def observe_stage(stage, seconds, rows, columns):
+    labels = {"stage": stage}
+    registry.observe("feature_engine_stage_seconds", labels, seconds, "Wall time of pipeline stages.")
+    registry.inc("feature_engine_stage_rows_total", labels, rows, "Rows processed by pipeline stages.")
+    registry.inc("feature_engine_stage_cells_total", labels, rows * columns, "Cells (rows x columns) processed by pipeline stages.")
+
+
+def _profile_requested():
+    return request.args.get("profile", "").lower() in ("1", "true", "yes")
+
+
+def start_request():
+    record = RequestRecord(request.endpoint.rsplit(".", 1)[-1] if request.endpoint else "unknown")
+    if _profile_requested():
+        record.profiler = cProfile.Profile()
+    if (record.profiler is not None or config.metrics_trace_memory) and not tracemalloc.is_tracing():
+        # Traces allocations of this request only; with concurrent requests the peak is shared
+        tracemalloc.start()
+        record.tracing = True
+    elif tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    g.metrics_record = record
+    current_request.set(record)
+    if record.profiler is not None:
+        record.profiler.enable()
+
+
+def finish_request(response):
+    record = g.pop("metrics_record", None)
+    if record is None:
+        return response
+    if record.profiler is None:
+        if response.is_streamed:
+            # Streamed bodies are produced after this hook, so the request is measured once it is closed
+            response.call_on_close(lambda: _finish(record, response.status_code))
+        else:
+            _finish(record, response.status_code)
+        return response
+    # A profiled request returns its breakdown instead of its body, which is produced here to be profiled
+    body = response.get_data()
+    record.profiler.disable()
+    summary = _finish(record, response.status_code)
+    return jsonify({**summary, "bytes": len(body), "profile": _profile_rows(record.profiler)})
+
+
+def _finish(record, status):
+    seconds = time.perf_counter() - record.started
+    io_seconds = sum(record.phases.values())
+    peak = None
+    if tracemalloc.is_tracing():
+        peak = tracemalloc.get_traced_memory()[1]
+        if record.tracing:
+            tracemalloc.stop()
+    if current_request.get() is record:
+        current_request.set(None)
+
+    labels = {"endpoint": record.endpoint}
+    registry.inc("feature_engine_requests_total", {**labels, "status": str(status)}, 1, "Requests handled, by endpoint and status.")
+    registry.observe("feature_engine_request_seconds", labels, seconds, "Wall time of requests, including streamed bodies.")
+    for phase, phase_seconds in record.phases.items():
+        registry.inc("feature_engine_request_phase_seconds_total", {**labels, "phase": phase}, phase_seconds,
+                     "Request time by phase: reading and writing stage files, serializing bodies, and compute.")
+    registry.inc("feature_engine_request_phase_seconds_total", {**labels, "phase": "compute"}, max(seconds - io_seconds, 0.0))
+    registry.inc("feature_engine_rows_processed_total", labels, record.rows, "Rows of the frames requests worked on.")
+    registry.inc("feature_engine_cells_processed_total", labels, record.rows * record.columns,
+                 "Cells (rows x columns) of the frames requests worked on.")
+    if peak is not None:
+        registry.set("feature_engine_request_peak_memory_bytes", labels, peak,
+                     "Largest traced allocation peak of a request (needs memory tracing).", keep_max=True)
+
+    summary = {
+        "endpoint": record.endpoint,
+        "dataset": dataset_id(),
+        "status": status,
+        "seconds": round(seconds, 6),
+        "phases": {**{phase: round(value, 6) for phase, value in record.phases.items()},
+                   "compute": round(max(seconds - io_seconds, 0.0), 6)},
+        "rows": record.rows,
+        "columns": record.columns,
+        "peak_memory_bytes": peak,
+    }
+    logger.info("request", extra={"fields": summary})
+    return summary
+
+
+def _profile_rows(profiler, limit=None):
+    # The functions with the most cumulative time, like "python -m cProfile -s cumulative"
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({function})",
+            "calls": calls,
+            "total_seconds": round(total, 6),
+            "cumulative_seconds": round(cumulative, 6),
+        })
+    rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+    return rows[:limit or config.profile_rows]
+
+
+def instrument(app, blueprint_names):
+    # Hooks for the requests of these blueprint registrations, after the app's own before_request hooks
+    for name in blueprint_names:
+        app.before_request_funcs.setdefault(name, []).append(start_request)
+        app.after_request_funcs.setdefault(name, []).append(finish_request)
+
+
+def process_metrics(store=None):
+    # Gauges and counters read when /metrics is scraped
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    registry.set("process_max_resident_memory_bytes", {}, usage.ru_maxrss * 1024, "Peak resident set size of the API process.")
+    registry.total("process_cpu_seconds_total", {}, usage.ru_utime + usage.ru_stime, "User and system CPU time of the API process.")
+    try:
+        with open("/proc/self/statm") as file:
+            resident = int(file.read().split()[1]) * resource.getpagesize()
+        registry.set("process_resident_memory_bytes", {}, resident, "Resident set size of the API process.")
+    except (OSError, IndexError, ValueError):
+        pass
+    if store is not None:
+        stats = store.stats()
+        registry.set("feature_engine_store_memory_bytes", {}, stats["memory_usage"], "Memory used by DataFrames cached by the dataset store.")
+        registry.total("feature_engine_store_hits_total", {}, stats["hits"], "Dataset store cache hits.")
+        registry.total("feature_engine_store_misses_total", {}, stats["misses"], "Dataset store cache misses.")
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from core import config
+from core.workspace import dataset_id
+
+_fingerprints = {}
+
+
+def fingerprint(df):
+    # Content hash of a DataFrame, memoized per frame object since stored frames are never modified
+    cached = _fingerprints.get(id(df))
+    if cached is not None and cached[0]() is df:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    digest.update(repr((list(df.columns), [str(dtype) for dtype in df.dtypes], df.shape)).encode())
+    numeric = df.select_dtypes(include=['number'])
+    if numeric.shape[1]:
+        digest.update(np.ascontiguousarray(numeric.to_numpy()).data)
+    others = [column for column in df.columns if column not in set(numeric.columns)]
+    if others:
+        digest.update(pd.util.hash_pandas_object(df[others], index=False).to_numpy().data)
+    value = digest.hexdigest()
+
+    key = id(df)
+    _fingerprints[key] = (weakref.ref(df, lambda _: _fingerprints.pop(key, None)), value)
+    return value
+
+
+def _params_key(stage, params):
+    return f"{stage}|{json.dumps(params, sort_keys=True)}"
+
+
+def _scoped(key):
+    # Models are shared by content, but "latest" pointers belong to the dataset they were fitted for
+    dataset = dataset_id()
+    return key if dataset == config.default_dataset else f"{dataset}/{key}"
+
+
+class ModelRegistry:
+    def __init__(self, directory=None, max_memory_entries=None, max_disk_entries=None):
+        self._directory = directory
+        self.max_memory_entries = max_memory_entries or config.model_memory_entries
+        self.max_disk_entries = max_disk_entries or config.model_disk_entries
+        self._models = OrderedDict()
+        self._lock = threading.RLock()
+
+    @property
+    def directory(self):
+        return self._directory or os.path.join(config.data_dir, "models")
+
+    def fit(self, stage, params, df, fit_function, reuse=False, key=None):
+        # Returns (model, model_id, refit). With reuse=True the latest model fitted for the same
+        # stage and parameters is applied even if the data changed; otherwise the model must
+        # have been fitted on identical content. Data that is not in memory is identified by a
+        # key instead of the frame's fingerprint, e.g. core.chunked.content_key.
+        if reuse:
+            model_id = self._index().get(_scoped(_params_key(stage, params)))
+        else:
+            model_id = self.model_id(stage, params, df, key)
+        model = self.get(model_id) if model_id else None
+        if model is not None:
+            self._set_latest(stage, params, model_id)
+            return model, model_id, False
+
+        model = fit_function(df)
+        model_id = self.model_id(stage, params, df, key)
+        self.put(model_id, model)
+        self._set_latest(stage, params, model_id)
+        return model, model_id, True
+
+    def model_id(self, stage, params, df, key=None):
+        return hashlib.sha256(f"{_params_key(stage, params)}|{key or fingerprint(df)}".encode()).hexdigest()[:32]
+
+    def latest(self, stage):
+        return self._index().get(_scoped(stage))
+
+    def get(self, model_id):
+        if not model_id or not re.fullmatch(r"[0-9a-f]{32}", model_id):
+            return None
+        with self._lock:
+            if model_id in self._models:
+                self._models.move_to_end(model_id)
+                return self._models[model_id]
+
+        # Imported on first use, which keeps it out of the app's startup
+        import joblib
+
+        path = self._path(model_id)
+        try:
+            model = joblib.load(path)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        self._remember(model_id, model)
+        return model
+
+    def put(self, model_id, model):
+        import joblib
+
+        self._remember(model_id, model)
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = self._path(model_id) + ".tmp"
+        joblib.dump(model, temp_path)
+        os.replace(temp_path, self._path(model_id))
+        self._evict_disk()
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def _remember(self, model_id, model):
+        with self._lock:
+            self._models[model_id] = model
+            self._models.move_to_end(model_id)
+            while len(self._models) > self.max_memory_entries:
+                self._models.popitem(last=False)
+
+    def _path(self, model_id):
+        return os.path.join(self.directory, f"{model_id}.joblib")
+
+    def _evict_disk(self):
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".joblib")]
+        if len(paths) <= self.max_disk_entries:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:len(paths) - self.max_disk_entries]:
+            os.remove(path)
+
+    def _index(self):
+        try:
+            with open(os.path.join(self.directory, "index.json")) as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _set_latest(self, stage, params, model_id):
+        # The index maps each stage, and each stage + parameters, to the most recently used model
+        with self._lock:
+            index = self._index()
+            stage_key, params_key = _scoped(stage), _scoped(_params_key(stage, params))
+            if index.get(stage_key) == model_id and index.get(params_key) == model_id:
+                return
+            index[stage_key] = model_id
+            index[params_key] = model_id
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = os.path.join(self.directory, "index.json.tmp")
+            with open(temp_path, "w") as file:
+                json.dump(index, file)
+            os.replace(temp_path, os.path.join(self.directory, "index.json"))
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,193 @@
+import warnings
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from core.config import choices
+from core.parallel import map_columns
+
+outlier_methods = ("iqr", "gaussian", "mad", "quantile")
+outlier_actions = ("cap", "flag")
+outlier_tails = ("both", "right", "left")
+
+# Same defaults as feature-engine's Winsorizer; for "quantile" the fold is the tail fraction
+default_folds = {"iqr": 1.5, "gaussian": 3.0, "mad": 3.29, "quantile": 0.05}
+
+
+def nanquantiles(values, quantiles, sorted_values=None):
+    # Column-wise quantiles of a 2-D array ignoring NaNs, using linear interpolation like
+    # np.nanquantile but without its per-column Python loop: one sort, then index arithmetic.
+    if sorted_values is None:
+        sorted_values = np.sort(values, axis=0)  # NaNs sort last
+    counts = np.count_nonzero(~np.isnan(values), axis=0)
+    last = np.maximum(counts - 1, 0)
+    result = []
+    for q in quantiles:
+        position = q * last
+        below = np.floor(position).astype(np.intp)
+        above = np.minimum(below + 1, last)
+        weight = position - below
+        low = np.take_along_axis(sorted_values, below[np.newaxis, :], axis=0)[0]
+        high = np.take_along_axis(sorted_values, above[np.newaxis, :], axis=0)[0]
+        quantile = low + (high - low) * weight
+        quantile[counts == 0] = np.nan
+        result.append(quantile)
+    return result
+
+
+def numeric_block(df, columns=None):
+    columns = list(df.select_dtypes(include=['number']).columns) if columns is None else list(columns)
+    return columns, df[columns].to_numpy(dtype=np.float64)
+
+
+# The cells flagged by the last transform that produced each frame, as (columns, bits packed
+# along the rows), kept while the frame lives so the stage writing it can index them (core.masks)
+_flags = {}
+
+
+def flagged(df):
+    cached = _flags.get(id(df))
+    if cached is not None and cached[0]() is df:
+        return cached[1]
+    return None
+
+
+def _remember_flags(df, columns, bits):
+    key = id(df)
+
+    def forget(reference):
+        if _flags.get(key, (None,))[0] is reference:
+            del _flags[key]
+    _flags[key] = (weakref.ref(df, forget), (list(columns), bits))
+
+
+def replace_block(df, columns, values):
+    # Builds the result around the new numeric block instead of assigning it column by column
+    result = pd.DataFrame(values, columns=columns, index=df.index)
+    for position, column in enumerate(df.columns):
+        if column not in result.columns:
+            result.insert(position, column, df[column])
+    return result
+
+
+class OutlierDetector:
+    def __init__(self, method="iqr", fold=None, tail="both"):
+        if method not in outlier_methods:
+            raise ValueError(f"Invalid method. Only {choices(outlier_methods)} are supported.")
+        if tail not in outlier_tails:
+            raise ValueError(f"Invalid tail. Only {choices(outlier_tails)} are supported.")
+        self.method = method
+        self.fold = default_folds[method] if fold is None else float(fold)
+        # Other folds invert or collapse the bounds, so every value would be an outlier
+        if not self.fold > 0:
+            raise ValueError("Invalid fold. It must be positive.")
+        if method == "quantile" and self.fold >= 0.5:
+            raise ValueError("Invalid fold. For quantile it is the tail fraction, below 0.5.")
+        self.tail = tail
+
+    def fit(self, df):
+        self.columns_, values = numeric_block(df)
+        # Large blocks are fitted by column shards in parallel
+        bounds, _ = map_columns(self._fit_columns, values)
+        return self._set_bounds(np.concatenate([lower for lower, _ in bounds]), np.concatenate([upper for _, upper in bounds]))
+
+    def _fit_columns(self, start, stop, values, output):
+        values = values[:, start:stop]
+        if self.method == "iqr":
+            q1, q3 = nanquantiles(values, (0.25, 0.75))
+            lower, upper = q1 - self.fold * (q3 - q1), q3 + self.fold * (q3 - q1)
+        elif self.method == "gaussian":
+            with warnings.catch_warnings():
+                # All-NaN columns get NaN bounds and are left untouched
+                warnings.simplefilter("ignore", RuntimeWarning)
+                mean, std = np.nanmean(values, axis=0), np.nanstd(values, axis=0)
+            lower, upper = mean - self.fold * std, mean + self.fold * std
+        elif self.method == "mad":
+            (median,) = nanquantiles(values, (0.5,))
+            (mad,) = nanquantiles(np.abs(values - median), (0.5,))
+            mad = mad / 0.67449
+            lower, upper = median - self.fold * mad, median + self.fold * mad
+        else:
+            lower, upper = nanquantiles(values, (self.fold, 1 - self.fold))
+        return lower, upper
+
+    def fit_summary(self, summary, deviations=None):
+        # Bounds from mergeable column statistics (core.stats.ColumnSummary) instead of the data.
+        # Quantiles come from the t-digests, so "iqr", "mad" and "quantile" bounds are approximate;
+        # "mad" also needs the summary of the absolute deviations from the medians.
+        self.columns_ = list(summary.columns)
+        if self.method == "iqr":
+            q1, q3 = summary.quantiles((0.25, 0.75))
+            lower, upper = q1 - self.fold * (q3 - q1), q3 + self.fold * (q3 - q1)
+        elif self.method == "gaussian":
+            # Population standard deviation, like np.nanstd
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mean = np.where(summary.count > 0, summary.mean, np.nan)
+                std = np.sqrt(summary.m2 / summary.count)
+            lower, upper = mean - self.fold * std, mean + self.fold * std
+        elif self.method == "mad":
+            if deviations is None:
+                raise ValueError("The \"mad\" bounds need the summary of the deviations from the median.")
+            (median,) = summary.quantiles((0.5,))
+            (mad,) = deviations.quantiles((0.5,))
+            mad = mad / 0.67449
+            lower, upper = median - self.fold * mad, median + self.fold * mad
+        else:
+            lower, upper = summary.quantiles((self.fold, 1 - self.fold))
+        return self._set_bounds(lower, upper)
+
+    def _set_bounds(self, lower, upper):
+        if self.tail == "right":
+            lower = np.full_like(lower, -np.inf)
+        elif self.tail == "left":
+            upper = np.full_like(upper, np.inf)
+        self.lower_, self.upper_ = lower, upper
+        return self
+
+    def transform(self, df, action="cap"):
+        if action not in outlier_actions:
+            raise ValueError(f"Invalid action. Only {choices(outlier_actions)} are supported.")
+        missing = [column for column in self.columns_ if column not in df.columns]
+        if missing:
+            raise ValueError(f"Columns not seen during fit are missing: {', '.join(missing)}")
+
+        _, values = numeric_block(df, self.columns_)
+        # Large blocks are counted and capped by column shards in parallel
+        shards, capped = map_columns(self._transform_columns, values, output=action == "cap")
+        counts = np.concatenate([counts for counts, _ in shards])
+
+        result = df
+        if action == "cap":
+            result = replace_block(df, self.columns_, capped)
+        _remember_flags(result, self.columns_, np.hstack([bits for _, bits in shards]))
+        return result, self.report(counts, len(df))
+
+    def _transform_columns(self, start, stop, values, output):
+        values, lower, upper = values[:, start:stop], self.lower_[start:stop], self.upper_[start:stop]
+        if output is not None:
+            output[:, start:stop] = np.clip(values, lower, upper)
+        flags = (values < lower) | (values > upper)
+        return np.count_nonzero(flags, axis=0), np.packbits(flags, axis=0)
+
+    def fit_transform(self, df, action="cap"):
+        return self.fit(df).transform(df, action)
+
+    def bounds(self):
+        def bound(value):
+            return None if np.isnan(value) or np.isinf(value) else float(value)
+        return {
+            column: {"lower": bound(lower), "upper": bound(upper)}
+            for column, lower, upper in zip(self.columns_, self.lower_, self.upper_)
+        }
+
+    def report(self, counts, rows):
+        return {
+            "method": self.method,
+            "fold": self.fold,
+            "tail": self.tail,
+            "rows": rows,
+            "total_outliers": int(counts.sum()),
+            "outlier_counts": {column: int(count) for column, count in zip(self.columns_, counts)},
+            "bounds": self.bounds(),
+        }
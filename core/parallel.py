@@ -0,0 +1,131 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from core import config
+
+# Column-sharded execution of per-column work: fills, outlier bounds and capping, column
+# summaries. The arrays are copied once into shared memory, column-major so that every shard of
+# columns is one contiguous run, and the workers attach to them by name instead of receiving
+# pickled copies. Shards write their columns of a shared output block and/or return small
+# per-column results, which are joined in column order.
+
+_executor = None
+_lock = threading.Lock()
+
+# Set in the pool workers, which run their shard serially
+_in_worker = False
+
+
+def _init_worker():
+    global _in_worker
+    _in_worker = True
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            context = multiprocessing.get_context(config.job_start_method)
+            _executor = ProcessPoolExecutor(max_workers=config.column_workers, mp_context=context, initializer=_init_worker)
+        return _executor
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def workers_for(shape):
+    # Worker processes for a (rows, columns) block; 1 runs it in the calling thread. Blocks
+    # below config.column_min_cells cost less than shipping them to the pool.
+    rows, columns = shape
+    if _in_worker or config.column_workers <= 1 or rows * columns < config.column_min_cells:
+        return 1
+    return min(config.column_workers, columns)
+
+
+def shards(columns, workers):
+    # Contiguous column ranges of (almost) equal width
+    bounds = np.linspace(0, columns, workers + 1).astype(int)
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+
+def _share(array, copy=True):
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    if copy:
+        np.ndarray(array.shape, array.dtype, buffer=block.buf, order="F")[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _attach(spec):
+    if spec is None:
+        return None, None
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype, buffer=block.buf, order="F")
+
+
+def _run_shard(function, start, stop, specs, args):
+    # Runs in a pool worker
+    blocks, arrays = zip(*(_attach(spec) for spec in specs))
+    try:
+        return function(start, stop, *arrays, *args)
+    finally:
+        # The views must be gone before the blocks can be closed; a traceback can still hold some
+        del arrays
+        for block in blocks:
+            if block is not None:
+                try:
+                    block.close()
+                except BufferError:
+                    pass
+
+
+def map_columns(function, values, *arrays, output=False, args=()):
+    # Runs function(start, stop, values, output, *arrays, *args) on column shards of the 2-D
+    # values. It works on the columns start:stop and, with output=True, writes them to output, a
+    # block shaped like values (None otherwise). Other arrays (e.g. timestamps) are shared whole.
+    # Returns the shard results in column order and the output block.
+    workers = workers_for(values.shape)
+    if workers > 1:
+        try:
+            return _map_shared(function, values, arrays, output, args, workers)
+        except BrokenProcessPool:
+            # A worker died, e.g. killed for memory; the pool is started again on the next call
+            shutdown()
+    result = np.empty(values.shape, dtype=values.dtype, order="F") if output else None
+    return [function(0, values.shape[1], values, result, *arrays, *args)], result
+
+
+def _map_shared(function, values, arrays, output, args, workers):
+    blocks = []
+
+    def share(array, copy=True):
+        if array is None:
+            return None
+        block, spec = _share(np.asarray(array), copy)
+        blocks.append(block)
+        return spec
+
+    try:
+        # The output block starts out empty; the shards fill all of it
+        specs = [share(values), share(values, copy=False) if output else None, *(share(array) for array in arrays)]
+        futures = [_pool().submit(_run_shard, function, start, stop, specs, args) for start, stop in shards(values.shape[1], workers)]
+        results = [future.result() for future in futures]
+        result = None
+        if output:
+            # Copied out, since the shared block is released below
+            result = np.array(np.ndarray(values.shape, values.dtype, buffer=blocks[1].buf, order="F"), order="F")
+        return results, result
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
@@ -0,0 +1,106 @@
+import time
+
+from core.artifacts import current_version
+from core.backends import stage_path
+from core.chunked import ChunkedRun, chunked_stages
+from core.config import choices
+from core.imputation import fill_methods, parse_overrides
+from core.metrics import observe_stage
+from core.outliers import outlier_methods
+from core.selection import scorers
+from core.stages import stages
+from core.store import dataset_store
+
+# Pipeline stage -> (spec key that enables the stage, {stage parameter: spec key})
+pipeline_steps = (
+    ("fill_missing", "fill_method", {"method": "fill_method", "overrides": "fill_overrides", "max_gap": "fill_max_gap",
+                                     "window": "fill_window", "period": "fill_period", "value": "fill_value"}),
+    ("detect_outliers", "outlier_method", {"method": "outlier_method"}),
+    ("feature_extraction", "top_x", {"top_x": "top_x", "scorer": "scorer", "target": "target"}),
+)
+
+
+def parse_spec(values):
+    spec = {}
+    fill_method = values.get("fill_method")
+    if fill_method:
+        if str(fill_method).lower() not in fill_methods:
+            raise ValueError(f"Invalid fill_method. Only {choices(fill_methods)} are supported.")
+        spec["fill_method"] = str(fill_method).lower()
+        overrides = parse_overrides(values.get("fill_overrides"))
+        invalid = [method for method in overrides.values() if method not in fill_methods]
+        if invalid:
+            raise ValueError(f"Invalid fill_overrides method \"{invalid[0]}\". Only {choices(fill_methods)} are supported.")
+        if overrides:
+            spec["fill_overrides"] = overrides
+        for key in ("fill_max_gap", "fill_window", "fill_period"):
+            if values.get(key) not in (None, ""):
+                spec[key] = values.get(key)
+        if values.get("fill_value") not in (None, ""):
+            try:
+                spec["fill_value"] = float(values.get("fill_value"))
+            except (TypeError, ValueError):
+                raise ValueError("fill_value must be a number.")
+    outlier_method = values.get("outlier_method")
+    if outlier_method:
+        if str(outlier_method).lower() not in outlier_methods:
+            raise ValueError(f"Invalid outlier_method. Only {choices(outlier_methods)} are supported.")
+        spec["outlier_method"] = str(outlier_method).lower()
+    top_x = values.get("top_x")
+    if top_x not in (None, ""):
+        try:
+            top_x = int(top_x)
+        except (TypeError, ValueError):
+            raise ValueError("top_x must be an integer between 1 and 100.")
+        if not 1 <= top_x <= 100:
+            raise ValueError("top_x must be an integer between 1 and 100.")
+        spec["top_x"] = top_x
+    scorer = values.get("scorer")
+    if scorer:
+        if str(scorer).lower() not in scorers:
+            raise ValueError(f"Invalid scorer. Only {choices(scorers)} are supported.")
+        spec["scorer"] = str(scorer).lower()
+    if values.get("target"):
+        spec["target"] = str(values.get("target"))
+    return spec
+
+
+def run_pipeline(df, spec, store=dataset_store):
+    # Runs fill -> cap -> select on one in-memory DataFrame. Skipped stages pass the frame
+    # through unchanged, and every stage output is persisted so the views stay consistent.
+    results = []
+    for name, key, params in pipeline_steps:
+        function, _, target = stages[name]
+        started = time.perf_counter()
+        if key in spec:
+            df, result = function(df, **{param: spec[spec_key] for param, spec_key in params.items() if spec_key in spec})
+            result = {"stage": name, "skipped": False, **result}
+            observe_stage(name, time.perf_counter() - started, len(df), len(df.columns))
+        else:
+            result = {"stage": name, "skipped": True}
+        save_path = stage_path(target)
+        df = store.save(target, df, save_path)
+        result.update({"file_path": save_path, "version": current_version(save_path), "rows": len(df), "seconds": round(time.perf_counter() - started, 4)})
+        results.append(result)
+    return df, results
+
+
+def run_chunked(spec, path, store=dataset_store):
+    # The same pipeline out of core: every stage streams the output file of the one before it,
+    # starting from the raw file at path. Returns the stage results and how the run went.
+    run = ChunkedRun(store)
+    results = []
+    for name, key, params in pipeline_steps:
+        function, _, target = chunked_stages[name]
+        started = time.perf_counter()
+        if key in spec:
+            result, written = function(run, path, **{param: spec[spec_key] for param, spec_key in params.items() if spec_key in spec})
+            result = {"stage": name, "skipped": False, **result}
+            observe_stage(name, time.perf_counter() - started, written["rows"], run.columns)
+        else:
+            result = {"stage": name, "skipped": True}
+            written = run.write(target, run.read(path))
+        path = written["file_path"]
+        result.update({**written, "seconds": round(time.perf_counter() - started, 4)})
+        results.append(result)
+    return results, run.report()
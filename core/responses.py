@@ -0,0 +1,208 @@
+import io
+import json
+import zlib
+
+import brotli
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import zstandard
+from flask import Response, request, stream_with_context
+
+from core import config
+from core.metrics import timed_chunks
+
+orients = ("records", "split", "columns")
+
+# Response format -> MIME type. JSON comes first so "Accept: */*" keeps getting JSON.
+mimetypes = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class SelectionError(ValueError):
+    pass
+
+
+def select_frame(df, columns=None, start=None, end=None, offset=0, limit=None):
+    # Row filters and slices only create views; the projection copies just the rows and columns returned
+    if columns:
+        missing = [column for column in columns if column not in df.columns]
+        if missing:
+            raise SelectionError(f"Unknown columns: {', '.join(missing)}")
+
+    if start is not None or end is not None:
+        if "timestamp" not in df.columns:
+            raise SelectionError("The dataset has no timestamp column to filter on.")
+        timestamps = df["timestamp"]
+        if not pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = pd.to_datetime(timestamps)
+        try:
+            start, end = (None if bound is None else pd.Timestamp(bound) for bound in (start, end))
+        except ValueError as e:
+            raise SelectionError(f"Invalid start or end: {e}")
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= timestamps >= start
+        if end is not None:
+            mask &= timestamps <= end
+        df = df[mask.to_numpy()]
+
+    total = len(df)
+    stop = total if limit is None else offset + limit
+    df = df.iloc[offset:stop]
+    if columns:
+        df = df[columns]
+    return df, total
+
+
+def _chunks(df, chunk_rows):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def plain_dates(df):
+    # Timestamps parsed at upload are written as "2021-05-15 00:00:00", like the uploaded CSV
+    # (and not as ISO strings with milliseconds); missing ones become null
+    dates = [column for column in df.columns if pd.api.types.is_datetime64_any_dtype(df[column])]
+    if not dates:
+        return df
+    return df.assign(**{column: _format_dates(df[column]) for column in dates})
+
+
+def _format_dates(values):
+    fractional = (values.dt.microsecond.fillna(0) != 0).any()
+    return values.dt.strftime("%Y-%m-%d %H:%M:%S.%f" if fractional else "%Y-%m-%d %H:%M:%S").where(values.notna(), None)
+
+
+def iter_json(df, orient="records", chunk_rows=None):
+    # Streams the frame as JSON using pandas' C serializer one chunk at a time, so the full
+    # body never exists in memory as Python objects or as one string. Floats are written with
+    # 15 significant digits, the most the serializer supports (its default is 10).
+    chunk_rows = chunk_rows or config.response_chunk_rows
+    if orient == "records":
+        yield "["
+        for index, chunk in enumerate(_chunks(df, chunk_rows)):
+            yield ("," if index else "") + plain_dates(chunk).to_json(orient="records", date_format="iso", double_precision=15)[1:-1]
+        yield "]"
+    elif orient == "split":
+        yield '{"columns":' + json.dumps([str(column) for column in df.columns]) + ',"data":['
+        for index, chunk in enumerate(_chunks(df, chunk_rows)):
+            yield ("," if index else "") + plain_dates(chunk).to_json(orient="values", date_format="iso", double_precision=15)[1:-1]
+        yield "]}"
+    elif orient == "columns":
+        # Column-oriented: one array of values per column
+        yield "{"
+        for index, column in enumerate(df.columns):
+            values = plain_dates(df[[column]])[column].to_json(orient="values", date_format="iso", double_precision=15)
+            yield ("," if index else "") + json.dumps(str(column)) + ":" + values
+        yield "}"
+    else:
+        raise ValueError(f"Invalid orient. Only {', '.join(orients)} are supported.")
+
+
+def iter_ndjson(df, chunk_rows=None):
+    chunk_rows = chunk_rows or config.response_chunk_rows
+    for chunk in _chunks(df, chunk_rows):
+        yield plain_dates(chunk).to_json(orient="records", lines=True, date_format="iso", double_precision=15).rstrip("\n") + "\n"
+
+
+def _record_batches(df, chunk_rows, metadata):
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    if metadata is not None:
+        # Stage results travel in the schema metadata next to the data
+        schema = schema.with_metadata({**(schema.metadata or {}), b"feature_engine": json.dumps(metadata, default=str)})
+    batches = (pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False) for chunk in _chunks(df, chunk_rows))
+    return schema, batches
+
+
+def _drain(sink):
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+def iter_arrow(df, chunk_rows=None, metadata=None):
+    # Arrow IPC stream format: the schema, then one record batch per chunk
+    schema, batches = _record_batches(df, chunk_rows or config.response_chunk_rows, metadata)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            yield _drain(sink)
+    yield _drain(sink)
+
+
+def iter_parquet(df, chunk_rows=None, metadata=None):
+    # One row group per chunk; the footer is written when the writer closes
+    schema, batches = _record_batches(df, chunk_rows or config.response_chunk_rows, metadata)
+    sink = io.BytesIO()
+    with pq.ParquetWriter(sink, schema, compression="snappy") as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            yield _drain(sink)
+    yield _drain(sink)
+
+
+def negotiate_format(allowed=tuple(mimetypes), default="json"):
+    # An explicit ?format= wins over the Accept header
+    requested = request.args.get("format", "").lower()
+    if requested:
+        if requested not in allowed:
+            raise ValueError(f"Invalid format. Only {', '.join(allowed)} are supported.")
+        return requested
+    best = request.accept_mimetypes.best_match([mimetypes[name] for name in allowed])
+    return next((name for name in allowed if mimetypes[name] == best), default)
+
+
+def compress(chunks, encoding):
+    # Chunks compressed one by one with encoding (zstd, br or gzip), for streams and cached bodies
+    if encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(level=config.compress_zstd_level).compressobj()
+        process, finish = compressor.compress, compressor.flush
+    elif encoding == "br":
+        compressor = brotli.Compressor(quality=config.compress_br_level)
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(config.compress_gzip_level, zlib.DEFLATED, 31)
+        process, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        data = process(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+def stream_response(chunks, mimetype, status=200):
+    # Flask-Compress buffers streamed bodies before compressing them, so streams are
+    # compressed here chunk by chunk with the best encoding the client accepts.
+    encoding = request.accept_encodings.best_match(config.compress_algorithms)
+    if encoding:
+        chunks = compress(chunks, encoding)
+    # Serializing and compressing the body is timed as it is streamed
+    response = Response(stream_with_context(timed_chunks(chunks)), status=status, mimetype=mimetype)
+    response.headers["Vary"] = "Accept, Accept-Encoding"
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def frame_chunks(df, output_format="json", orient="records", metadata=None):
+    # The body of a frame in the format, as a lazy sequence of chunks, and its MIME type
+    if output_format == "arrow":
+        chunks = iter_arrow(df, metadata=metadata)
+    elif output_format == "parquet":
+        chunks = iter_parquet(df, metadata=metadata)
+    elif output_format == "ndjson":
+        chunks = iter_ndjson(df)
+    else:
+        chunks = iter_json(df, orient)
+    return chunks, mimetypes[output_format]
+
+
+def frame_response(df, output_format="json", orient="records", metadata=None):
+    return stream_response(*frame_chunks(df, output_format, orient, metadata))
@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from core import config
+from core.workspace import dataset_dir
+
+try:
+    import pyarrow.csv  # noqa: F401  (pd.read_csv(engine="pyarrow") needs it)
+    csv_engine = "pyarrow"
+except ImportError:
+    csv_engine = "c"
+
+float_dtypes = ("float64", "float32")
+
+# Schema of a dataset, inferred from the first chunk of its upload and stored in
+# <dataset dir>/schema.json: {"dtypes": {column: dtype}, "timestamp_format": ...}. Numeric columns
+# use the dataset's float dtype, "timestamp" is parsed once into datetime64[ns], and string
+# columns with few distinct values (tags, units, states) are categorical in memory.
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def schema_path(dataset=None):
+    return os.path.join(dataset_dir(dataset), "schema.json")
+
+
+def infer_schema(chunk, float_dtype=None):
+    float_dtype = (float_dtype or config.float_dtype).lower()
+    if float_dtype not in float_dtypes:
+        raise ValueError(f"Invalid float dtype. Only {', '.join(float_dtypes)} are supported.")
+    dtypes = {}
+    timestamp_format = None
+    for column, dtype in chunk.dtypes.items():
+        if pd.api.types.is_numeric_dtype(dtype):
+            # Integer and boolean columns are widened too, so later chunks with gaps still fit
+            dtypes[column] = float_dtype
+        elif column == "timestamp":
+            values = chunk[column].dropna()
+            if pd.api.types.is_datetime64_any_dtype(dtype):
+                dtypes[column] = "datetime64[ns]"
+            elif len(values):
+                timestamp_format = guess_datetime_format(str(values.iloc[0]))
+                try:
+                    pd.to_datetime(values, format=timestamp_format)
+                    dtypes[column] = "datetime64[ns]"
+                except (TypeError, ValueError):
+                    dtypes[column] = "object"
+            else:
+                dtypes[column] = "object"
+        elif dtype == object and chunk[column].nunique() <= len(chunk) * config.category_max_ratio:
+            dtypes[column] = "category"
+        else:
+            dtypes[column] = str(dtype)
+    return {"dtypes": dtypes, "timestamp_format": timestamp_format}
+
+
+def storage_dtypes(schema):
+    # Categories are only known per chunk while streaming, so they are stored as strings
+    return {column: "object" if dtype == "category" else dtype for column, dtype in schema["dtypes"].items()}
+
+
+def categories(schema):
+    return [column for column, dtype in (schema or {}).get("dtypes", {}).items() if dtype == "category"]
+
+
+def apply_schema(df, schema, storage=False):
+    # Casts the columns the schema knows to their dtype. Only what differs is converted, and
+    # columns that do not fit (e.g. a stage that replaced them) are left as they are.
+    if not schema:
+        return df
+    dtypes = storage_dtypes(schema) if storage else schema["dtypes"]
+    changes = {}
+    for column, dtype in dtypes.items():
+        if column not in df.columns or str(df[column].dtype) == dtype:
+            continue
+        values = df[column]
+        try:
+            if dtype.startswith("datetime64"):
+                if pd.api.types.is_datetime64_any_dtype(values) or values.dtype == object:
+                    changes[column] = pd.to_datetime(values, format=schema.get("timestamp_format")).astype(dtype)
+            elif dtype in float_dtypes:
+                if pd.api.types.is_numeric_dtype(values):
+                    changes[column] = values.astype(dtype)
+            elif dtype == "category" and values.dtype == object:
+                changes[column] = values.astype("category")
+        except (TypeError, ValueError):
+            continue
+    return df.assign(**changes) if changes else df
+
+
+def save_schema(schema, dataset=None):
+    path = schema_path(dataset)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(schema, file)
+    os.replace(temp_path, path)
+
+
+def load_schema(dataset=None):
+    # None for datasets uploaded before schemas were stored; their files are read as they are
+    path = schema_path(dataset)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _cache_lock:
+        cached = _cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(path) as file:
+            schema = json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+    with _cache_lock:
+        _cache[path] = (mtime, schema)
+    return schema
+
+
+def read_csv(source, schema=None, **options):
+    # Reads with the dataset's dtypes, so nothing is inferred, using the pyarrow engine
+    # (multithreaded) when it is installed. Without a schema pandas infers the dtypes.
+    if not schema:
+        return pd.read_csv(source, **options)
+    dtypes = {column: dtype for column, dtype in storage_dtypes(schema).items() if not dtype.startswith("datetime64")}
+    return apply_schema(pd.read_csv(source, engine=csv_engine, dtype=dtypes, **options), schema)
+
+
+def iter_csv(source, chunk_rows, schema=None):
+    # The same in chunks; chunked reading needs pandas' C parser
+    dtypes = {column: dtype for column, dtype in storage_dtypes(schema).items() if not dtype.startswith("datetime64")} if schema else None
+    with pd.read_csv(source, chunksize=chunk_rows, dtype=dtypes) as reader:
+        for chunk in reader:
+            yield apply_schema(chunk, schema)
+
+
+def memory_report(df):
+    usage = df.memory_usage(index=False, deep=True)
+    by_dtype = {}
+    for column, nbytes in usage.items():
+        dtype = str(df[column].dtype)
+        by_dtype[dtype] = by_dtype.get(dtype, 0) + int(nbytes)
+    numeric = df.select_dtypes(include=["number"]).shape[1]
+    return {
+        "rows": len(df),
+        "bytes": int(usage.sum()),
+        "dtypes": by_dtype,
+        # What the numeric columns would take as float64, for comparison with float32 datasets
+        "float64_bytes": int(numeric * len(df) * np.dtype("float64").itemsize),
+        "columns": {str(column): int(nbytes) for column, nbytes in usage.items()},
+    }
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from core import config
+from core.config import choices
+
+
+def score_variance(X, y=None, **options):
+    return X.var().to_numpy()
+
+
+def score_correlation(X, y, **options):
+    # Absolute Pearson correlation of every column with the target in one matrix-vector product.
+    # Missing feature values are centred to zero, so they don't contribute to the covariance.
+    values, target = X.to_numpy(dtype=np.float64), y.to_numpy(dtype=np.float64)
+    keep = ~np.isnan(target)
+    values, target = values[keep], target[keep]
+    centred = values - np.nanmean(values, axis=0)
+    centred[np.isnan(centred)] = 0.0
+    target = target - target.mean()
+    denominator = np.sqrt((centred ** 2).sum(axis=0)) * np.sqrt((target ** 2).sum())
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.abs(centred.T @ target) / denominator
+    return np.nan_to_num(scores)
+
+
+def score_mutual_info(X, y, seed=None, n_jobs=None, **options):
+    # scikit-learn takes about a second to import, so it is only imported by the scorers that use it
+    from sklearn.feature_selection import mutual_info_regression
+
+    return mutual_info_regression(X, y, random_state=seed, n_jobs=n_jobs)
+
+
+def score_tree(X, y, seed=None, n_jobs=None, n_estimators=None, **options):
+    from sklearn.ensemble import RandomForestRegressor
+
+    model = RandomForestRegressor(
+        n_estimators=n_estimators or config.selection_n_estimators,
+        n_jobs=n_jobs,
+        random_state=seed,
+    )
+    model.fit(X, y)
+    return model.feature_importances_
+
+
+# Scorer name -> (function, needs a target column, needs rows without missing values)
+scorers = {
+    "variance": (score_variance, False, False),
+    "correlation": (score_correlation, True, False),
+    "mutual_info": (score_mutual_info, True, True),
+    "tree": (score_tree, True, True),
+}
+
+
+def check_scorer(scorer, target, columns):
+    if scorer not in scorers:
+        raise ValueError(f"Invalid scorer. Only {choices(scorers)} are supported.")
+    if scorers[scorer][1] and not target:
+        raise ValueError(f"The \"{scorer}\" scorer needs a target column.")
+    if target and target not in columns:
+        raise ValueError(f"Target column \"{target}\" not found.")
+
+
+def top_features(scores, top_x):
+    # The top X% of the ranked features, at least one
+    return scores.index[:max(1, int(len(scores) * (top_x / 100)))].tolist()
+
+
+def rank_features(df, scorer="variance", target=None, seed=None, sample_rows=None, n_jobs=None, n_estimators=None):
+    check_scorer(scorer, target, df.columns)
+    function, _, needs_complete_rows = scorers[scorer]
+
+    seed = config.random_seed if seed is None else seed
+    sample_rows = config.selection_sample_rows if sample_rows is None else sample_rows
+    n_jobs = config.selection_n_jobs if n_jobs is None else n_jobs
+
+    features = [column for column in df.select_dtypes(include=['number']).columns if column != target]
+    columns = features + [target] if target else features
+    data = df[columns]
+    if needs_complete_rows:
+        data = data.dropna()
+    # Fixed-seed row subsample keeps the expensive scorers bounded on long histories
+    if sample_rows and len(data) > sample_rows:
+        data = data.sample(n=sample_rows, random_state=seed)
+
+    X = data[features]
+    y = data[target] if target else None
+    if X.empty:
+        raise ValueError("No rows or numeric features left to score.")
+
+    scores = pd.Series(function(X, y, seed=seed, n_jobs=n_jobs, n_estimators=n_estimators), index=features)
+    # Stable sort keeps the column order between ties
+    return scores.sort_values(ascending=False, kind="stable")
@@ -0,0 +1,61 @@
+import os
+import uuid
+
+from core.backends import stage_path
+from core.ingest import ingest_csv
+from core.chunked import resolve_mode
+from core.pipeline import run_chunked, run_pipeline
+from core.stats import summary_store
+from core.store import dataset_store
+from core.workspace import dataset_id, workspace
+
+# Operations shared by the REST endpoints and the Dash callbacks. Both call these in-process,
+# so the dashboard never goes through HTTP to its own server. They work on the current dataset.
+
+
+def upload_csv(stream, path=None, store=dataset_store, float_dtype=None, columns=None):
+    path = path or stage_path("raw")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with workspace.lock():
+        # Parse the CSV in chunks and write them to the raw stage storage
+        summary = ingest_csv(stream, path, float_dtype=float_dtype, columns=columns)
+        # Cached stages of this dataset are stale once new raw data arrives
+        store.invalidate()
+        workspace.record(stage="raw", path=path, rows=summary["rows"])
+    workspace.cleanup()
+    return {"dataset": dataset_id(), **summary}
+
+
+def analyze(spec, path=None, store=dataset_store, mode=None):
+    # Runs the pipeline on the raw stage and returns (selected frame, summary). The summary
+    # holds everything the dashboard shows after an analysis. A chunked run never holds the
+    # selected frame and returns None for it.
+    path = path or stage_path("raw")
+    chunked = resolve_mode(mode, path) == "chunked"
+    with workspace.lock():
+        if chunked:
+            selected_df = None
+            results, execution = run_chunked(spec, path, store)
+        else:
+            selected_df, results = run_pipeline(store.load("raw", path), spec, store)
+            execution = {"mode": "memory"}
+        run_id = uuid.uuid4().hex
+        workspace.record(run={"id": run_id, "spec": spec, "stages": [result["stage"] for result in results if not result["skipped"]]})
+    # Summarizing the saved output here also means the next /describe is answered from the cache;
+    # chunked runs summarize their outputs while writing them
+    summary = summary_store.load(results[-1]["file_path"], lambda: selected_df)
+    return selected_df, {
+        "message": "Pipeline completed successfully",
+        "dataset": dataset_id(),
+        "run_id": run_id,
+        "spec": spec,
+        "execution": execution,
+        "stages": results,
+        "selected_features": results[-1].get("selected_features", summary.columns),
+        "description": summary.describe().to_dict(),
+        "variance": summary.variance().to_dict(),
+    }
+
+
+def stage_frame(stage, path=None, store=dataset_store):
+    return store.load(stage, path or stage_path(stage))
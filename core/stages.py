@@ -0,0 +1,66 @@
+from core import chunked
+from core.artifacts import current_version
+from core.backends import stage_path
+from core.chunked import resolve_mode
+from core.imputation import Imputer
+from core.models import model_registry
+from core.outliers import OutlierDetector
+from core.selection import rank_features, top_features
+from core.store import dataset_store
+from core.workspace import workspace
+
+
+def fill_missing(df, method="mean", overrides=None, max_gap=None, window=None, period=None, value=0.0, reuse=False):
+    imputer = Imputer(method.lower(), overrides, max_gap, window, period, value)
+    params = {"method": imputer.method, "overrides": imputer.overrides, "max_gap": imputer.max_gap,
+              "window": imputer.window, "period": imputer.period, "value": imputer.value}
+    imputer, model_id, refit = model_registry.fit("fill_missing", params, df, imputer.fit, reuse)
+    imputed_df, report = imputer.transform(df)
+    return imputed_df, {**params, **report, "model_id": model_id, "refit": refit}
+
+
+def detect_outliers(df, method="iqr", fold=None, tail="both", action="cap", reuse=False):
+    detector = OutlierDetector(method, fold, tail)
+    params = {"method": detector.method, "fold": detector.fold, "tail": detector.tail}
+    detector, model_id, refit = model_registry.fit("detect_outliers", params, df, detector.fit, reuse)
+    transformed_df, report = detector.transform(df, action)
+    return transformed_df, {**report, "action": action, "model_id": model_id, "refit": refit}
+
+
+def feature_extraction(df, top_x=100, scorer="variance", target=None, seed=None):
+    # Rank the numeric features by score and keep the top X% of them
+    scores = rank_features(df, scorer, target, seed)
+    selected_columns = top_features(scores, top_x)
+    # Keep the timestamp (and the target, if any) next to the selected features
+    extra_columns = [column for column in ('timestamp', target) if column and column in df.columns]
+    selected_df = df[selected_columns + extra_columns]
+    return selected_df, {
+        "selected_features": selected_columns,
+        "scorer": scorer,
+        "target": target,
+        "scores": {column: float(score) for column, score in scores.items()},
+    }
+
+
+# Stage name -> (function, input stage, output stage)
+stages = {
+    "fill_missing": (fill_missing, "raw", "imputed"),
+    "detect_outliers": (detect_outliers, "imputed", "transformed"),
+    "feature_extraction": (feature_extraction, "transformed", "selected"),
+}
+
+
+def run_stage(name, params=None, store=dataset_store, mode=None):
+    if name not in stages:
+        raise ValueError(f"Unknown stage \"{name}\". Supported stages: {', '.join(stages)}.")
+    function, source, target = stages[name]
+    # Inputs that would not fit under the job memory limit are streamed through in chunks
+    if resolve_mode(mode, stage_path(source)) == "chunked":
+        return chunked.run_stage(name, params, store)
+    with workspace.lock():
+        df = store.load(source, stage_path(source))
+        result_df, result = function(df, **(params or {}))
+        save_path = stage_path(target)
+        store.save(target, result_df, save_path)
+        version = current_version(save_path)
+    return {"stage": name, "file_path": save_path, "version": version, "rows": len(result_df), **result, "mode": "memory"}
@@ -0,0 +1,256 @@
+import json
+import os
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from core import config
+from core.backends import resolve_path
+from core.outliers import numeric_block
+from core.parallel import map_columns, workers_for
+
+
+class ColumnSummary:
+    # Mergeable statistics for a block of numeric columns: count, mean and M2 (Welford/Chan),
+    # min/max and a t-digest per column. The digests of all columns are kept as two
+    # (slots x columns) arrays so updates and queries are vectorized across columns.
+    def __init__(self, columns, compression=None):
+        self.columns = list(columns)
+        self.compression = compression or config.stats_compression
+        size = len(self.columns)
+        self.count = np.zeros(size, dtype=np.int64)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.min = np.full(size, np.nan)
+        self.max = np.full(size, np.nan)
+        self.centroid_means = np.zeros((0, size))
+        self.centroid_weights = np.zeros((0, size))
+
+    @classmethod
+    def from_frame(cls, df, compression=None):
+        columns, values = numeric_block(df)
+        return cls(columns, compression).update(values)
+
+    @classmethod
+    def join(cls, summaries):
+        # The summaries of consecutive column ranges, side by side as one summary
+        summary = cls([column for part in summaries for column in part.columns], summaries[0].compression)
+        for name in ("count", "mean", "m2", "min", "max"):
+            setattr(summary, name, np.concatenate([getattr(part, name) for part in summaries]))
+        # Digests may have different numbers of slots; empty slots have zero weight
+        slots = max(len(part.centroid_means) for part in summaries)
+        pad = lambda array: np.pad(array, ((0, slots - len(array)), (0, 0)))
+        summary.centroid_means = np.hstack([pad(part.centroid_means) for part in summaries])
+        summary.centroid_weights = np.hstack([pad(part.centroid_weights) for part in summaries])
+        return summary
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if workers_for(values.shape) > 1:
+            # Large blocks are summarized by column shards in parallel
+            parts, _ = map_columns(_summarize, values, args=(self.columns, self.compression))
+            batch = ColumnSummary.join(parts)
+            self._merge_moments(batch.count, batch.mean, batch.m2, batch.min, batch.max)
+            if len(self.centroid_means):
+                self._merge_digest(batch.centroid_means, batch.centroid_weights)
+            else:
+                self.centroid_means, self.centroid_weights = batch.centroid_means, batch.centroid_weights
+            return self
+        present = ~np.isnan(values)
+        count = present.sum(axis=0)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            mean = np.nan_to_num(np.nanmean(values, axis=0))
+            m2 = np.nansum((values - mean) ** 2, axis=0)
+            minimum, maximum = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+        self._merge_moments(count, mean, m2, minimum, maximum)
+        # A batch is compressed on its own first (one plain sort, NaNs last) and then merged
+        values = np.sort(values, axis=0)
+        weights = (~np.isnan(values)).astype(np.float64)
+        batch = self._compress(np.nan_to_num(values), weights)
+        self._merge_digest(*batch)
+        return self
+
+    def merge(self, other):
+        if other.columns != self.columns:
+            raise ValueError("Summaries cover different columns.")
+        self._merge_moments(other.count, other.mean, other.m2, other.min, other.max)
+        self._merge_digest(other.centroid_means, other.centroid_weights)
+        return self
+
+    def _merge_moments(self, count, mean, m2, minimum, maximum):
+        # Chan et al. parallel update of the Welford accumulators
+        total = self.count + count
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta = mean - self.mean
+            self.mean = np.where(total > 0, self.mean + delta * count / total, 0.0)
+            self.m2 = np.where(total > 0, self.m2 + m2 + delta ** 2 * self.count * count / total, 0.0)
+        self.count = total
+        self.min = np.fmin(self.min, minimum)
+        self.max = np.fmax(self.max, maximum)
+
+    def _merge_digest(self, means, weights):
+        means = np.concatenate([self.centroid_means, means])
+        weights = np.concatenate([self.centroid_weights, weights])
+        means = np.where(weights > 0, means, np.inf)
+        order = np.argsort(means, axis=0, kind="stable")
+        means = np.take_along_axis(means, order, axis=0)
+        weights = np.take_along_axis(weights, order, axis=0)
+        means[weights == 0] = 0.0
+        self.centroid_means, self.centroid_weights = self._compress(means, weights)
+
+    def _compress(self, means, weights):
+        # Merging t-digest with the k1 scale function: points sorted per column (empty ones last)
+        # are assigned to the bucket floor(k(q)) of their quantile midpoint q.
+        total = weights.sum(axis=0)
+        midpoint = (np.cumsum(weights, axis=0) - weights / 2) / np.where(total > 0, total, 1)
+        k = self.compression / (2 * np.pi) * np.arcsin(np.clip(2 * midpoint - 1, -1, 1))
+        slots = self.compression // 2 + 1
+        bucket = np.clip(np.floor(k + self.compression / 4).astype(np.intp), 0, slots - 1)
+
+        size = len(self.columns)
+        flat = (bucket * size + np.arange(size)).ravel()
+        bucket_weights = np.bincount(flat, weights=weights.ravel(), minlength=slots * size).reshape(slots, size)
+        bucket_sums = np.bincount(flat, weights=(means * weights).ravel(), minlength=slots * size).reshape(slots, size)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bucket_means = np.where(bucket_weights > 0, bucket_sums / bucket_weights, 0.0)
+
+        # Non-empty centroids first, still in increasing order of their means
+        order = np.argsort(bucket_weights == 0, axis=0, kind="stable")
+        return np.take_along_axis(bucket_means, order, axis=0), np.take_along_axis(bucket_weights, order, axis=0)
+
+    def quantiles(self, quantiles):
+        means, weights = self.centroid_means, self.centroid_weights
+        total = weights.sum(axis=0)
+        centroids = (weights > 0).sum(axis=0)
+        positions = np.cumsum(weights, axis=0) - weights / 2
+        positions[weights == 0] = np.inf
+
+        result = []
+        for q in quantiles:
+            # Same convention as linear interpolation in pandas when every centroid is a single value
+            target = q * np.maximum(total - 1, 0) + 0.5
+            above = (positions < target).sum(axis=0)
+            low = np.clip(above - 1, 0, None)
+            high = np.clip(np.minimum(above, centroids - 1), 0, None)
+            low_position = np.take_along_axis(positions, low[np.newaxis, :], axis=0)[0]
+            high_position = np.take_along_axis(positions, high[np.newaxis, :], axis=0)[0]
+            low_mean = np.take_along_axis(means, low[np.newaxis, :], axis=0)[0]
+            high_mean = np.take_along_axis(means, high[np.newaxis, :], axis=0)[0]
+
+            # Below the first centroid interpolate from the minimum, above the last one towards the maximum
+            before, after = above == 0, above >= centroids
+            low_position, low_mean = np.where(before, 0.5, low_position), np.where(before, self.min, low_mean)
+            high_position, high_mean = np.where(after, total - 0.5, high_position), np.where(after, self.max, high_mean)
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                span = high_position - low_position
+                fraction = np.where(span > 0, (target - low_position) / span, 0.0)
+            value = low_mean + np.clip(fraction, 0, 1) * (high_mean - low_mean)
+            value[total == 0] = np.nan
+            result.append(value)
+        return result
+
+    def variance(self):
+        # Sample variance (ddof=1) like pandas
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return pd.Series(np.where(self.count > 1, self.m2 / (self.count - 1), np.nan), index=self.columns)
+
+    def describe(self, percentiles=(0.25, 0.5, 0.75)):
+        std = np.sqrt(self.variance().to_numpy())
+        rows = {"count": self.count.astype(np.float64), "mean": np.where(self.count > 0, self.mean, np.nan), "std": std, "min": self.min}
+        for q, values in zip(percentiles, self.quantiles(percentiles)):
+            rows[f"{q * 100:g}%"] = values
+        rows["max"] = self.max
+        return pd.DataFrame(rows, index=self.columns).T
+
+    def save(self, path, signature):
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as file:
+            np.savez(
+                file,
+                columns=np.array(json.dumps(self.columns)),
+                signature=np.array(signature, dtype=np.int64),
+                compression=np.array(self.compression),
+                count=self.count, mean=self.mean, m2=self.m2, min=self.min, max=self.max,
+                centroid_means=self.centroid_means, centroid_weights=self.centroid_weights,
+            )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            summary = cls(json.loads(str(data["columns"])), int(data["compression"]))
+            for name in ("count", "mean", "m2", "min", "max", "centroid_means", "centroid_weights"):
+                setattr(summary, name, data[name])
+            return summary, tuple(int(value) for value in data["signature"])
+
+
+def _summarize(start, stop, values, output, columns, compression):
+    return ColumnSummary(columns[start:stop], compression).update(values[:, start:stop])
+
+
+def summary_path(path):
+    return path + ".stats.npz"
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class SummaryStore:
+    # Summaries of stage files, cached in memory and next to the file on disk. Both copies
+    # are tied to the file's mtime/size, so a rewritten file gets a fresh summary.
+    def __init__(self):
+        self._summaries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        # The summary of the file as it is now, if one was computed; never reads the file
+        path = resolve_path(path)
+        signature = _signature(path)
+        with self._lock:
+            cached = self._summaries.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        try:
+            summary, stored_signature = ColumnSummary.load(summary_path(path))
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+        if stored_signature != signature or summary.compression != config.stats_compression:
+            return None
+        with self._lock:
+            self._summaries[path] = (signature, summary)
+        return summary
+
+    def load(self, path, load_frame):
+        summary = self.get(path)
+        if summary is None:
+            path = resolve_path(path)
+            signature = _signature(path)
+            summary = ColumnSummary.from_frame(load_frame())
+            summary.save(summary_path(path), signature)
+            with self._lock:
+                self._summaries[path] = (signature, summary)
+        return summary
+
+    def put(self, path, summary):
+        signature = _signature(path)
+        summary.save(summary_path(path), signature)
+        with self._lock:
+            self._summaries[path] = (signature, summary)
+
+    def extend(self, summary, path, df):
+        # Summary of a file that got the rows of df appended, from the summary it had before
+        columns, values = numeric_block(df, summary.columns)
+        self.put(path, ColumnSummary(columns, summary.compression).merge(summary).update(values))
+
+    def clear(self):
+        with self._lock:
+            self._summaries.clear()
+
+
+summary_store = SummaryStore()
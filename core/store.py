@@ -0,0 +1,151 @@
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from core import config
+from core.artifacts import append_artifact, artifact_path, read_artifact, read_lock, read_tail, write_artifact
+from core.backends import resolve_path
+from core.masks import index_frame, mask_store
+from core.metrics import processed, timed
+from core.outliers import flagged
+from core.schema import apply_schema, load_schema, memory_report
+from core.workspace import dataset_id, workspace
+
+
+def _signature(path):
+    # Raises FileNotFoundError when the file is missing, like pd.read_csv would
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class DatasetStore:
+    def __init__(self, memory_budget=config.store_memory_budget):
+        self.memory_budget = memory_budget
+        self.memory_usage = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def load(self, stage, path, dataset=None, version=None):
+        # Returned DataFrames are shared between requests and must not be modified in place.
+        # A version pins that artifact version instead of the current stage file.
+        dataset = dataset or dataset_id()
+        workspace.touch(dataset)
+        key = (dataset, stage) if version is None else (dataset, stage, version)
+        with read_lock(path):
+            stage_file, path = path, artifact_path(path, version)
+            signature = _signature(path)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry["path"] == path and entry["signature"] == signature:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    processed(*entry["df"].shape)
+                    return entry["df"]
+                self.misses += 1
+            # With the dtypes of the dataset schema: float32, datetime timestamps, categorical tags
+            with timed("read"):
+                df = read_artifact(stage_file, version, load_schema(dataset))
+        processed(*df.shape)
+        self._put(key, path, signature, df)
+        return df
+
+    def save(self, stage, df, path, dataset=None):
+        dataset = dataset or dataset_id()
+        original = df
+        if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+            df = df.reset_index(drop=True)
+        # Stage outputs keep the dataset dtypes, e.g. float32 after float64 computations
+        df = apply_schema(df, load_schema(dataset))
+        with timed("write"):
+            version = write_artifact(df, path)
+        processed(*df.shape)
+        # Where the missing and flagged cells are, for queries that should not read the data
+        index_frame(path, df, original)
+        self._put((dataset, stage), path, _signature(path), df)
+        workspace.record(dataset, stage, path, len(df), version=version)
+        return df
+
+    def append(self, stage, df, path, dataset=None):
+        # Adds rows to a stage output without rewriting it; the cached frame of the stage is dropped
+        dataset = dataset or dataset_id()
+        flags = flagged(df)
+        index = mask_store.get(path) if os.path.exists(resolve_path(path)) else None
+        df = apply_schema(df.reset_index(drop=True), load_schema(dataset))
+        with timed("write"):
+            version = append_artifact(df, path, load_schema(dataset))
+        processed(*df.shape)
+        # The index is extended with the new rows; files without one are indexed when queried
+        if index is not None:
+            mask_store.extend(index, path, df, flags)
+        self.invalidate(dataset, stage)
+        rows = ((workspace.get(dataset) or {}).get("stages", {}).get(stage) or {}).get("rows")
+        workspace.record(dataset, stage, path, None if rows is None else rows + len(df), version=version)
+        return df
+
+    def tail(self, stage, path, rows, dataset=None):
+        # The last rows of a stage output, from the cached frame or the last segments of the file
+        dataset = dataset or dataset_id()
+        with self._lock:
+            entry = self._entries.get((dataset, stage))
+        with read_lock(path):
+            if entry is not None and entry["signature"] == _signature(artifact_path(path)):
+                return entry["df"].iloc[len(entry["df"]) - min(rows, len(entry["df"])):]
+            with timed("read"):
+                return read_tail(path, rows, load_schema(dataset))
+
+    def invalidate(self, dataset=None, stage=None):
+        dataset = dataset or dataset_id()
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == dataset and (stage is None or key[1] == stage):
+                    self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.memory_usage = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": [
+                    {"dataset": key[0], "stage": key[1], "path": entry["path"], "nbytes": entry["nbytes"]}
+                    for key, entry in self._entries.items()
+                ],
+                "memory_usage": self.memory_usage,
+                "memory_budget": self.memory_budget,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def memory(self, dataset=None):
+        # Memory of the frames of one dataset held in the cache, per stage and column
+        dataset = dataset or dataset_id()
+        with self._lock:
+            frames = [(key, entry["df"]) for key, entry in self._entries.items() if key[0] == dataset]
+        stages = {"@".join(str(part) for part in key[1:]): memory_report(df) for key, df in frames}
+        return {"dataset": dataset, "bytes": sum(report["bytes"] for report in stages.values()), "stages": stages}
+
+    def _put(self, key, path, signature, df):
+        nbytes = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            self._drop(key)
+            # Frames larger than the whole budget are served but never cached
+            if nbytes > self.memory_budget:
+                return
+            while self._entries and self.memory_usage + nbytes > self.memory_budget:
+                self._drop(next(iter(self._entries)))
+            self._entries[key] = {"path": path, "signature": signature, "nbytes": nbytes, "df": df}
+            self.memory_usage += nbytes
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.memory_usage -= entry["nbytes"]
+
+
+dataset_store = DatasetStore()
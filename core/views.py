@@ -0,0 +1,214 @@
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from core import config
+from core.outliers import nanquantiles, numeric_block
+
+# Server-side preparation of the dashboard's tables and figures, so the browser only receives
+# the rows on screen and a bounded number of points per plot.
+
+# Dash filter_query operators, by name and by symbol
+filter_operators = {
+    "ge": "ge", ">=": "ge", "le": "le", "<=": "le", "lt": "lt", "<": "lt", "gt": "gt", ">": "gt",
+    "ne": "ne", "!=": "ne", "eq": "eq", "=": "eq", "contains": "contains", "datestartswith": "datestartswith",
+}
+
+
+def box_stats(df, summary=None, whisker=1.5):
+    # Quartiles and Tukey whiskers of every numeric column: the whiskers end at the most extreme
+    # values inside q1 - whisker * IQR and q3 + whisker * IQR. With a cached ColumnSummary the
+    # quartiles come from its digest, and the data is only scanned once per column for the whiskers.
+    if summary is not None:
+        columns = summary.columns
+        q1, median, q3 = summary.quantiles((0.25, 0.5, 0.75))
+        mean = np.where(summary.count > 0, summary.mean, np.nan)
+    else:
+        columns, values = numeric_block(df)
+        q1, median, q3 = nanquantiles(values, (0.25, 0.5, 0.75))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            mean = np.nanmean(values, axis=0)
+    low, high = q1 - whisker * (q3 - q1), q3 + whisker * (q3 - q1)
+
+    lower_fence, upper_fence = np.full(len(columns), np.nan), np.full(len(columns), np.nan)
+    outliers = np.zeros(len(columns), dtype=np.int64)
+    for position, column in enumerate(columns):
+        values = np.ascontiguousarray(df[column].to_numpy(dtype=np.float64))
+        inside = (values >= low[position]) & (values <= high[position])
+        if inside.any():
+            lower_fence[position], upper_fence[position] = values[inside].min(), values[inside].max()
+        outliers[position] = np.count_nonzero(~inside & ~np.isnan(values))
+    return pd.DataFrame({
+        "q1": q1, "median": median, "q3": q3, "lowerfence": lower_fence, "upperfence": upper_fence,
+        "mean": mean, "outliers": outliers,
+    }, index=columns)
+
+
+def box_figure(df, summary=None):
+    stats = box_stats(df, summary)
+    if stats.empty:
+        return {'data': [], 'layout': {'title': 'No numeric data available for Box Plot'}}
+    # One precomputed box trace: a handful of numbers per column instead of every value
+    trace = {'type': 'box', 'x': list(stats.index), 'name': 'Features', 'boxpoints': False}
+    for name in ("q1", "median", "q3", "lowerfence", "upperfence", "mean"):
+        trace[name] = [None if np.isnan(value) else float(value) for value in stats[name]]
+    trace['text'] = [f"{count} outliers" for count in stats["outliers"]]
+    return {
+        'data': [trace],
+        'layout': {
+            'title': 'Box Plot of Numeric Features',
+            'yaxis': {'title': 'Values'},
+            'xaxis': {'title': 'Features'},
+        }
+    }
+
+
+def missingness_figure(matrix):
+    # Heatmap of the share of missing cells per column (rows) and bin of consecutive rows
+    # (columns), from core.masks.MaskIndex.matrix
+    if not matrix["columns"] or not matrix["rows"]:
+        return {'data': [], 'layout': {'title': 'No data available for the missingness matrix'}}
+    labels = [start for start, _ in matrix["timestamps"]] if "timestamps" in matrix else [f"{start}-{stop}" for start, stop in matrix["rows"]]
+    return {
+        'data': [{
+            'type': 'heatmap',
+            'z': np.asarray(matrix["share"]).T.tolist(),
+            'x': labels,
+            'y': matrix["columns"],
+            'zmin': 0, 'zmax': 1,
+            'colorscale': 'Greys',
+            'colorbar': {'title': 'Missing'},
+        }],
+        'layout': {
+            'title': 'Missing Values by Column',
+            'xaxis': {'title': 'timestamp' if "timestamps" in matrix else 'rows'},
+            'height': min(max(300, 20 * len(matrix["columns"])), 1200),
+        }
+    }
+
+
+def lttb(x, y, points):
+    # Largest-Triangle-Three-Buckets: keeps the first and last point and, from every bucket in
+    # between, the point forming the largest triangle with the previously kept point and the
+    # average of the next bucket. Returns the indices of the kept points.
+    size = len(x)
+    if points >= size or points < 3:
+        return np.arange(size)
+    edges = np.linspace(1, size - 1, points - 1).astype(np.intp)
+    selected = np.empty(points, dtype=np.intp)
+    selected[0], selected[-1] = 0, size - 1
+    for bucket in range(points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_x, next_y = x[stop:edges[bucket + 2]].mean(), y[stop:edges[bucket + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        previous = selected[bucket]
+        area = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous]) - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        selected[bucket + 1] = start + np.argmax(area)
+    return selected
+
+
+def minmax(y, points):
+    # Keeps the minimum and maximum of each of points / 2 equal-width buckets, which preserves spikes
+    size = len(y)
+    buckets = max(points // 2, 1)
+    if points >= size:
+        return np.arange(size)
+    width = -(-size // buckets)
+    padded = np.full(buckets * width, np.nan)
+    padded[:size] = y
+    padded = padded.reshape(buckets, width)
+    offsets = np.arange(buckets) * width
+    low = offsets + np.argmin(np.where(np.isnan(padded), np.inf, padded), axis=1)
+    high = offsets + np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis=1)
+    indices = np.unique(np.concatenate([low, high]))
+    return indices[indices < size]
+
+
+downsamplers = ("lttb", "minmax")
+
+
+def series_figure(df, column, points=None, method="lttb"):
+    if method not in downsamplers:
+        raise ValueError(f"Invalid downsampling method. Only {', '.join(downsamplers)} are supported.")
+    points = points or config.plot_points
+    series = df[column]
+    if "timestamp" in df.columns:
+        x = pd.to_datetime(df["timestamp"])
+    else:
+        x = pd.Series(df.index, index=df.index)
+    keep = series.notna().to_numpy()
+    x, y = x[keep], series.to_numpy(dtype=np.float64)[keep]
+    dates = pd.api.types.is_datetime64_any_dtype(x)
+    if method == "lttb":
+        positions = x.to_numpy(dtype=np.int64) if dates else x.to_numpy(dtype=np.float64)
+        indices = lttb(positions.astype(np.float64), y, points)
+    else:
+        indices = minmax(y, points)
+    x_values = x.iloc[indices].astype(str) if dates else x.iloc[indices]
+    return {
+        'data': [{'x': x_values.tolist(), 'y': y[indices].tolist(), 'type': 'scattergl', 'mode': 'lines', 'name': column}],
+        'layout': {'title': f'{column} ({len(indices)} of {len(y)} points)', 'xaxis': {'title': x.name or 'index'}}
+    }
+
+
+def _parse_filter(part):
+    # "{column} operator value"; the case-sensitivity prefixes ("s=", "icontains") are ignored
+    match = re.match(r"\s*\{(.+?)\}\s+(\S+)\s*(.*)$", part)
+    operator = match and match.group(2)
+    if operator and operator not in filter_operators and operator[:1] in ("s", "i"):
+        operator = operator[1:]
+    if operator not in filter_operators:
+        raise ValueError(f"Unsupported filter: {part}")
+    value = match.group(3).strip()
+    if value[:1] in ("'", '"', "`") and value[-1:] == value[:1]:
+        value = value[1:-1]
+    else:
+        try:
+            value = float(value)
+        except ValueError:
+            pass
+    return match.group(1), filter_operators[operator], value
+
+
+def filter_frame(df, filter_query):
+    if not filter_query:
+        return df
+    mask = np.ones(len(df), dtype=bool)
+    for part in filter_query.split(" && "):
+        column, operator, value = _parse_filter(part)
+        if column not in df.columns:
+            raise ValueError(f"Unknown column: {column}")
+        values = df[column]
+        if operator == "contains":
+            matches = values.astype(str).str.contains(str(value), regex=False)
+        elif operator == "datestartswith":
+            matches = values.astype(str).str.startswith(str(value))
+        else:
+            matches = {"ge": values.__ge__, "le": values.__le__, "lt": values.__lt__, "gt": values.__gt__,
+                       "ne": values.__ne__, "eq": values.__eq__}[operator](value)
+        mask &= matches.fillna(False).to_numpy(dtype=bool)
+    return df[mask]
+
+
+def table_page(df, page_current=0, page_size=10, sort_by=None, filter_query=None):
+    # Rows for one page of a DataTable with page_action/sort_action/filter_action="custom".
+    # Returns (records, page count).
+    df = filter_frame(df, filter_query)
+    if sort_by:
+        df = df.sort_values(
+            [item["column_id"] for item in sort_by],
+            ascending=[item["direction"] == "asc" for item in sort_by],
+            kind="stable",
+        )
+    page_current, page_size = page_current or 0, page_size or 10
+    page = df.iloc[page_current * page_size:(page_current + 1) * page_size]
+    page_count = max(-(-len(df) // page_size), 1)
+    # JSON-ready records: missing values become None and timestamps ISO strings
+    present = page.notna()
+    page = page.astype({column: str for column in page.select_dtypes(include=["datetime", "datetimetz"]).columns})
+    return page.astype(object).where(present, None).to_dict("records"), page_count
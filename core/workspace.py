@@ -0,0 +1,188 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from core import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks only apply within one process
+    fcntl = None
+
+# Dataset of the current request or job; None means the default dataset
+current_dataset = ContextVar("current_dataset", default=None)
+
+
+def dataset_id():
+    return current_dataset.get() or config.default_dataset
+
+
+def valid_dataset_id(dataset):
+    return re.fullmatch(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}", dataset or "") is not None
+
+
+def dataset_dir(dataset=None):
+    dataset = dataset or dataset_id()
+    # The default dataset keeps the original flat layout directly under the data directory
+    if dataset == config.default_dataset:
+        return config.data_dir
+    # Never a path outside the datasets directory, whatever the id
+    root = os.path.realpath(os.path.join(config.data_dir, "datasets"))
+    path = os.path.join(root, dataset)
+    if os.path.dirname(os.path.realpath(path)) != root:
+        raise ValueError(f"Invalid dataset id: {dataset}")
+    return path
+
+
+class FileLock:
+    # Cross-process reader/writer lock on a lock file (flock): shared holders run in parallel,
+    # an exclusive holder excludes everyone, in this and in other processes. Reentrant within a
+    # thread; a shared acquisition inside an exclusive one reuses the exclusive lock.
+    _held = threading.local()
+
+    def __init__(self, path):
+        self.path = path
+
+    def shared(self):
+        return self._acquire(False)
+
+    def exclusive(self):
+        return self._acquire(True)
+
+    @contextmanager
+    def _acquire(self, exclusive):
+        held = self._held.__dict__.setdefault("locks", {})
+        if self.path in held:
+            if exclusive and not held[self.path][0]:
+                raise RuntimeError(f"Cannot upgrade a shared lock on {self.path} to exclusive.")
+            held[self.path][1] += 1
+            try:
+                yield
+            finally:
+                held[self.path][1] -= 1
+            return
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a+") as file:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            held[self.path] = [exclusive, 1]
+            try:
+                yield
+            finally:
+                # Closing the file releases the flock
+                del held[self.path]
+
+
+class Workspace:
+    # Index of datasets (stage artifacts and pipeline runs), per-dataset locks and TTL cleanup.
+    # The index lives in data/datasets/index.json.
+    def __init__(self, ttl=None, max_runs=None):
+        self._ttl = ttl
+        self.max_runs = max_runs or config.job_history
+        self._locks = {}
+        self._touched = {}
+        self._lock = threading.RLock()
+
+    @property
+    def ttl(self):
+        return config.dataset_ttl if self._ttl is None else self._ttl
+
+    @contextmanager
+    def lock(self, dataset=None):
+        # Serializes writes to one dataset across threads and processes; other datasets are
+        # processed concurrently. Readers are not blocked, see core.artifacts.
+        dataset = dataset or dataset_id()
+        with self._lock:
+            thread_lock = self._locks.setdefault(dataset, threading.RLock())
+        with thread_lock, FileLock(os.path.join(dataset_dir(dataset), ".write.lock")).exclusive():
+            yield
+
+    def list(self):
+        return [{"id": name, **entry} for name, entry in sorted(self._index().items())]
+
+    def get(self, dataset):
+        entry = self._index().get(dataset)
+        return None if entry is None else {"id": dataset, **entry}
+
+    def record(self, dataset=None, stage=None, path=None, rows=None, run=None, version=None):
+        dataset = dataset or dataset_id()
+        now = time.time()
+        with self._lock:
+            index = self._index()
+            entry = index.setdefault(dataset, {"created_at": now, "stages": {}, "runs": []})
+            entry["updated_at"] = entry["accessed_at"] = now
+            if stage is not None:
+                entry["stages"][stage] = {"path": path, "rows": rows, "version": version, "updated_at": now}
+            if run is not None:
+                entry["runs"] = (entry["runs"] + [{**run, "created_at": now}])[-self.max_runs:]
+            self._write(index)
+
+    def touch(self, dataset=None):
+        # Access times only need to be precise enough for the TTL, so they are written at most once a minute
+        dataset = dataset or dataset_id()
+        now = time.time()
+        with self._lock:
+            if now - self._touched.get(dataset, 0) < 60:
+                return
+            self._touched[dataset] = now
+            index = self._index()
+            entry = index.get(dataset)
+            if entry is not None and now - entry.get("accessed_at", 0) > 60:
+                entry["accessed_at"] = now
+                self._write(index)
+
+    def delete(self, dataset):
+        if dataset != config.default_dataset and not valid_dataset_id(dataset):
+            raise ValueError(f"Invalid dataset id: {dataset}")
+        with self._lock:
+            index = self._index()
+            if dataset not in index and not os.path.isdir(dataset_dir(dataset)):
+                return False
+            index.pop(dataset, None)
+            self._write(index)
+        if dataset != config.default_dataset:
+            shutil.rmtree(dataset_dir(dataset), ignore_errors=True)
+        return True
+
+    def cleanup(self, now=None):
+        # Removes datasets not accessed within the TTL, and runs older than it. The default dataset is kept.
+        if not self.ttl:
+            return []
+        cutoff = (now or time.time()) - self.ttl
+        expired = [name for name, entry in self._index().items()
+                   if name != config.default_dataset and entry.get("accessed_at", 0) < cutoff]
+        for name in expired:
+            with self.lock(name):
+                self.delete(name)
+        with self._lock:
+            index = self._index()
+            for entry in index.values():
+                entry["runs"] = [run for run in entry.get("runs", []) if run["created_at"] >= cutoff]
+            self._write(index)
+        return expired
+
+    def _index_path(self):
+        return os.path.join(config.data_dir, "datasets", "index.json")
+
+    def _index(self):
+        try:
+            with open(self._index_path()) as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write(self, index):
+        os.makedirs(os.path.dirname(self._index_path()), exist_ok=True)
+        temp_path = self._index_path() + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(index, file)
+        os.replace(temp_path, self._index_path())
+
+
+workspace = Workspace()
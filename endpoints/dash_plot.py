@@ -4,13 +4,20 @@ from dash import dcc, html, Input, Output, State
 import dash_bootstrap_components as dbc
 from dash.dash_table import DataTable
 import pandas as pd
-import requests
 import base64
 import io
+from core.backends import stage_path
+from core.cache import cached_view
+from core.masks import mask_store
+from core.pipeline import parse_spec
+from core.schema import load_schema
+from core.service import analyze, stage_frame, upload_csv
+from core.stats import summary_store
+from core.views import box_figure, missingness_figure, series_figure, table_page
 
-file_path = "data/selected_features.csv"
-original_data_path = "data/dummy_data_with_outliers.csv"
-transformed_data_path = "data/transformed_data.csv"
+file_path = stage_path("selected")
+original_data_path = stage_path("raw")
+transformed_data_path = stage_path("transformed")
 dash_plot_bp = Blueprint('dash_plot', __name__)
 
 def create_dash_app(flask_app):
@@ -50,7 +57,12 @@ def create_dash_app(flask_app):
                     options=[
                         {'label': 'Mean', 'value': 'mean'},
                         {'label': 'Constant', 'value': 'constant'},
-                        {'label': 'Linear', 'value': 'linear'}
+                        {'label': 'Linear', 'value': 'linear'},
+                        {'label': 'Time-weighted', 'value': 'time'},
+                        {'label': 'Forward fill', 'value': 'ffill'},
+                        {'label': 'Backward fill', 'value': 'bfill'},
+                        {'label': 'Rolling median', 'value': 'rolling_median'},
+                        {'label': 'Seasonal profile', 'value': 'seasonal'}
                     ],
                     placeholder="Select a method",
                     className="mb-3"
@@ -59,8 +71,10 @@ def create_dash_app(flask_app):
                 dcc.Dropdown(
                     id='detect-outliers-method',
                     options=[
-                        {'label': 'Mean', 'value': 'mean'},
-                        {'label': 'Median', 'value': 'median'}
+                        {'label': 'IQR', 'value': 'iqr'},
+                        {'label': 'Gaussian', 'value': 'gaussian'},
+                        {'label': 'MAD', 'value': 'mad'},
+                        {'label': 'Quantile', 'value': 'quantile'}
                     ],
                     placeholder="Select a method",
                     className="mb-3"
@@ -74,6 +88,24 @@ def create_dash_app(flask_app):
                     placeholder="Enter a percentage (1-100)",
                     className="mb-3"
                 ),
+                html.Label("Feature Scorer:", className="mt-2"),
+                dcc.Dropdown(
+                    id='feature-extraction-scorer',
+                    options=[
+                        {'label': 'Variance', 'value': 'variance'},
+                        {'label': 'Correlation to target', 'value': 'correlation'},
+                        {'label': 'Mutual information', 'value': 'mutual_info'},
+                        {'label': 'Tree importance', 'value': 'tree'}
+                    ],
+                    value='variance',
+                    className="mb-3"
+                ),
+                dcc.Input(
+                    id='feature-extraction-target',
+                    type='text',
+                    placeholder="Target column (for correlation, mutual information and tree)",
+                    className="mb-3"
+                ),
                 dbc.Button("Analyze Data", id='analyze-button', color="success", className="mt-2"),
                 html.Div(id='analysis-status', className="mt-2 text-info")
             ], width=12)
@@ -84,11 +116,19 @@ def create_dash_app(flask_app):
             dbc.Col([
                 html.H3("Original Data", className="text-secondary"),
                 dcc.Loading(
+                    # Paging, sorting and filtering run on the server; only the visible page is sent
                     DataTable(
                         id='original-data-table',
                         style_table={'overflowX': 'auto'},
                         style_cell={'textAlign': 'left', 'minWidth': '100px', 'maxWidth': '200px', 'whiteSpace': 'normal'},
-                        page_size=10
+                        page_current=0,
+                        page_size=10,
+                        page_action='custom',
+                        sort_action='custom',
+                        sort_mode='multi',
+                        sort_by=[],
+                        filter_action='custom',
+                        filter_query=''
                     ),
                     type='circle'
                 )
@@ -96,11 +136,19 @@ def create_dash_app(flask_app):
             dbc.Col([
                 html.H3("Transformed Data", className="text-secondary"),
                 dcc.Loading(
+                    # Paging, sorting and filtering run on the server; only the visible page is sent
                     DataTable(
                         id='transformed-data-table',
                         style_table={'overflowX': 'auto'},
                         style_cell={'textAlign': 'left', 'minWidth': '100px', 'maxWidth': '200px', 'whiteSpace': 'normal'},
-                        page_size=10
+                        page_current=0,
+                        page_size=10,
+                        page_action='custom',
+                        sort_action='custom',
+                        sort_mode='multi',
+                        sort_by=[],
+                        filter_action='custom',
+                        filter_query=''
                     ),
                     type='circle'
                 )
@@ -131,6 +179,28 @@ def create_dash_app(flask_app):
             ], width=12)
         ]),
 
+        # Time Series Section
+        dbc.Row([
+            dbc.Col([
+                html.H3("Time Series", className="text-secondary"),
+                dcc.Dropdown(id='time-series-column', placeholder="Select a feature", className="mb-2"),
+                dcc.RadioItems(
+                    id='time-series-method',
+                    options=[
+                        {'label': ' LTTB', 'value': 'lttb'},
+                        {'label': ' Min/Max', 'value': 'minmax'}
+                    ],
+                    value='lttb',
+                    inline=True,
+                    inputStyle={'margin-left': '10px'}
+                ),
+                dcc.Loading(
+                    dcc.Graph(id='time-series-graph'),
+                    type='circle'
+                )
+            ], width=12)
+        ]),
+
         # Box Plot Section
         dbc.Row([
             dbc.Col([
@@ -140,7 +210,21 @@ def create_dash_app(flask_app):
                     type='circle'
                 )
             ], width=12)
-        ])
+        ]),
+
+        # Missingness Matrix Section
+        dbc.Row([
+            dbc.Col([
+                html.H3("Missing Values", className="text-secondary"),
+                dcc.Loading(
+                    dcc.Graph(id='missingness-graph'),
+                    type='circle'
+                )
+            ], width=12)
+        ]),
+
+        # Result of the last pipeline run, shared by the table and graph callbacks
+        dcc.Store(id='analysis-result')
     ], fluid=True)
 
     @app_dash.callback(
@@ -151,179 +235,145 @@ def create_dash_app(flask_app):
     def upload_file(contents, filename):
         if contents is not None:
             try:
-                # Decode the uploaded file
+                # Decode the uploaded file and stream it through the same ingest as the upload API
                 content_type, content_string = contents.split(',')
                 decoded = base64.b64decode(content_string)
-                df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-
-                # Send file to the upload API
-                response = requests.post(
-                    'http://localhost:5000/api/v1/upload',
-                    files={'file': (filename, decoded, 'text/csv')}
-                )
-                if response.status_code == 200:
-                    return "File uploaded successfully!"
-                else:
-                    return f"Upload failed: {response.json().get('error', 'Unknown error')}"
+                summary = upload_csv(io.BytesIO(decoded), original_data_path)
+                return f"File uploaded successfully! ({summary['rows']} rows, {summary['columns']} columns)"
             except Exception as e:
                 return f"Error: {str(e)}"
         return ""
 
     @app_dash.callback(
-        Output('analysis-status', 'children'),
+        [Output('analysis-status', 'children'),
+         Output('analysis-result', 'data')],
         Input('analyze-button', 'n_clicks'),
         State('fill-missing-method', 'value'),
         State('detect-outliers-method', 'value'),
-        State('feature-extraction-top-x', 'value')
+        State('feature-extraction-top-x', 'value'),
+        State('feature-extraction-scorer', 'value'),
+        State('feature-extraction-target', 'value')
     )
-    def analyze_data(n_clicks, fill_method, outlier_method, top_x):
-        if n_clicks > 0:
+    def analyze_data(n_clicks, fill_method, outlier_method, top_x, scorer, target):
+        if n_clicks:
             try:
-                # Step 1: Call fill_missing API
-                if fill_method:
-                    response = requests.get(
-                        f'http://localhost:5000/api/v1/fill_missing?method={fill_method}'
-                    )
-                    if response.status_code != 200:
-                        return f"Fill Missing API failed: {response.json().get('error', 'Unknown error')}"
-
-                # Step 2: Call detect_outliers API
-                if outlier_method:
-                    response = requests.get(
-                        f'http://localhost:5000/api/v1/detect_outliers?method={outlier_method}'
-                    )
-                    if response.status_code != 200:
-                        return f"Detect Outliers API failed: {response.json().get('error', 'Unknown error')}"
+                # Run fill -> cap -> select in-process through the same service as /api/v1/pipeline;
+                # the other callbacks read the result from the store and the cached stage frames
+                spec = parse_spec({
+                    "fill_method": fill_method,
+                    "outlier_method": outlier_method,
+                    "top_x": top_x,
+                    "scorer": scorer,
+                    "target": target
+                })
+                selected_df, result = analyze(spec, original_data_path)
+                return "Data analysis completed successfully!", result
+            except Exception as e:
+                return f"Error: {str(e)}", None
+        return "", None
 
-                # Step 3: Call feature_extraction API
-                if top_x:
-                    response = requests.get(
-                        f'http://localhost:5000/api/v1/feature_extraction?top_x={top_x}'
-                    )
-                    if response.status_code != 200:
-                        return f"Feature Extraction API failed: {response.json().get('error', 'Unknown error')}"
+    def table_callback(table_id, stage, path):
+        @app_dash.callback(
+            [Output(table_id, 'data'),
+             Output(table_id, 'columns'),
+             Output(table_id, 'page_count')],
+            Input('analysis-result', 'data'),
+            Input(table_id, 'page_current'),
+            Input(table_id, 'page_size'),
+            Input(table_id, 'sort_by'),
+            Input(table_id, 'filter_query')
+        )
+        def display_page(result, page_current, page_size, sort_by, filter_query):
+            if result:
+                try:
+                    # Pages are kept until the stage output changes; paging back is a lookup
+                    def page():
+                        df = stage_frame(stage, path())
+                        records, page_count = table_page(df, page_current, page_size, sort_by, filter_query)
+                        return records, [{"name": i, "id": i} for i in df.columns], page_count
+                    return cached_view(table_id, path(), page, page_current, page_size, sort_by, filter_query)
+                except Exception:
+                    return [], [], 1
+            return [], [], 1
+        return display_page
 
-                return "Data analysis completed successfully!"
-            except Exception as e:
-                return f"Error: {str(e)}"
-        return ""
+    # The paths are looked up on every call so they follow the module settings
+    table_callback('original-data-table', "raw", lambda: original_data_path)
+    table_callback('transformed-data-table', "transformed", lambda: transformed_data_path)
 
     @app_dash.callback(
-        [Output('original-data-table', 'data'),
-         Output('original-data-table', 'columns')],
-        Input('analyze-button', 'n_clicks')
+        [Output('data-description-table', 'data'),
+         Output('data-description-table', 'columns')],
+        Input('analysis-result', 'data')
     )
-    def display_original_data(n_clicks):
-        if n_clicks > 0:
+    def update_data_description(result):
+        if result:
             try:
-                df = pd.read_csv(original_data_path)
-                return df.to_dict('records'), [{"name": i, "id": i} for i in df.columns]
+                # The pipeline response already carries the description of the selected features
+                df_description = pd.DataFrame(result["description"])
+                df_description.reset_index(inplace=True)
+                df_description.rename(columns={'index': 'Statistic'}, inplace=True)
+                return df_description.to_dict('records'), [{"name": i, "id": i} for i in df_description.columns]
             except Exception as e:
                 return [], []
         return [], []
 
     @app_dash.callback(
-        [Output('transformed-data-table', 'data'),
-         Output('transformed-data-table', 'columns')],
-        Input('analyze-button', 'n_clicks')
+        Output('data-graph', 'figure'),
+        Input('analysis-result', 'data')
     )
-    def display_transformed_data(n_clicks):
-        if n_clicks > 0:
+    def update_graph(result):
+        if result:
             try:
-                df = pd.read_csv(transformed_data_path)
-                return df.to_dict('records'), [{"name": i, "id": i} for i in df.columns]
+                # Create a bar chart for variance
+                variance = result["variance"]
+                return {
+                    'data': [{'x': list(variance), 'y': list(variance.values()), 'type': 'bar'}],
+                    'layout': {'title': 'Variance Analysis'}
+                }
             except Exception as e:
-                return [], []
-        return [], []
+                return {'data': [], 'layout': {'title': f'Error: {str(e)}'}}
+        return {'data': [], 'layout': {'title': 'No Data Available'}}
 
     @app_dash.callback(
-        [Output('data-description-table', 'data'),
-         Output('data-description-table', 'columns')],
-        Input('analyze-button', 'n_clicks')
+        [Output('time-series-column', 'options'),
+         Output('time-series-column', 'value')],
+        Input('analysis-result', 'data')
     )
-    def update_data_description(n_clicks):
-        if n_clicks > 0:
-            try:
-                # Gọi API /describe
-                response = requests.get('http://localhost:5000/api/v1/describe')
-                if response.status_code == 200:
-                    description = response.json()
-                    # Chuyển đổi dữ liệu mô tả thành định dạng phù hợp cho DataTable
-                    df_description = pd.DataFrame(description)
-                    df_description.reset_index(inplace=True)
-                    df_description.rename(columns={'index': 'Statistic'}, inplace=True)
-                    return df_description.to_dict('records'), [{"name": i, "id": i} for i in df_description.columns]
-                else:
-                    return [], []
-            except Exception as e:
-                return [], []
-        return [], []
+    def update_time_series_options(result):
+        if result:
+            features = [feature for feature in result["selected_features"] if feature not in ("timestamp", result["spec"].get("target"))]
+            return [{'label': feature, 'value': feature} for feature in features], (features[0] if features else None)
+        return [], None
 
     @app_dash.callback(
-        Output('data-graph', 'figure'),
-        Input('analyze-button', 'n_clicks')
+        Output('time-series-graph', 'figure'),
+        Input('time-series-column', 'value'),
+        Input('time-series-method', 'value')
     )
-    def update_graph(n_clicks):
-        if n_clicks > 0:
+    def update_time_series(column, method):
+        if column:
             try:
-                # Fetch data using get_dataframe API
-                response = requests.get('http://localhost:5000/api/v1/get_dataframe')
-                if response.status_code == 200:
-                    df = pd.DataFrame(response.json())
-
-                    # Create a bar chart for variance
-                    numeric_df = df.select_dtypes(include=['number'])
-                    return {
-                        'data': [{'x': numeric_df.columns, 'y': numeric_df.var(), 'type': 'bar'}],
-                        'layout': {'title': 'Variance Analysis'}
-                    }
-                else:
-                    return {'data': [], 'layout': {'title': 'Error fetching data'}}
+                # Downsampled to at most FEATURE_ENGINE_PLOT_POINTS points on the server
+                figure = lambda: series_figure(stage_frame("selected", file_path), column, method=method)
+                return cached_view("time-series-graph", file_path, figure, column, method)
             except Exception as e:
                 return {'data': [], 'layout': {'title': f'Error: {str(e)}'}}
         return {'data': [], 'layout': {'title': 'No Data Available'}}
 
     @app_dash.callback(
         Output('box-plot-graph', 'figure'),
-        Input('analyze-button', 'n_clicks')
+        Input('analysis-result', 'data')
     )
-    def update_box_plot(n_clicks):
-        if n_clicks > 0:
+    def update_box_plot(result):
+        if result:
             try:
-                # Gọi API /get_dataframe để lấy dữ liệu
-                response = requests.get('http://localhost:5000/api/v1/get_dataframe')
-                if response.status_code == 200:
-                    df = pd.DataFrame(response.json())
-
-                    # Tạo Box Plot
-                    numeric_columns = df.select_dtypes(include=['number']).columns
-                    if numeric_columns.empty:
-                        return {
-                            'data': [],
-                            'layout': {'title': 'No numeric data available for Box Plot'}
-                        }
-
-                    fig = {
-                        'data': [
-                            {
-                                'y': df[col],
-                                'type': 'box',
-                                'name': col
-                            } for col in numeric_columns
-                        ],
-                        'layout': {
-                            'title': 'Box Plot of Numeric Features',
-                            'yaxis': {'title': 'Values'},
-                            'xaxis': {'title': 'Features'},
-                            'boxmode': 'group'
-                        }
-                    }
-                    return fig
-                else:
-                    return {
-                        'data': [],
-                        'layout': {'title': 'Error fetching data for Box Plot'}
-                    }
+                # Quartiles come from the cached summary of the selected features; only the
+                # precomputed box statistics are sent to the browser
+                def figure():
+                    df = stage_frame("selected", file_path)
+                    return box_figure(df, summary_store.load(file_path, lambda: df))
+                return cached_view("box-plot-graph", file_path, figure)
             except Exception as e:
                 return {
                     'data': [],
@@ -334,4 +384,19 @@ def create_dash_app(flask_app):
             'layout': {'title': 'No Data Available'}
         }
 
+    @app_dash.callback(
+        Output('missingness-graph', 'figure'),
+        Input('upload-status', 'children'),
+        Input('analysis-result', 'data')
+    )
+    def update_missingness(status, result):
+        try:
+            # From the index of the raw data built at upload; the data itself is not read
+            matrix = mask_store.load(original_data_path, load_schema()).matrix("missing", bins=100)
+            return missingness_figure(matrix)
+        except FileNotFoundError:
+            return {'data': [], 'layout': {'title': 'No Data Available'}}
+        except Exception as e:
+            return {'data': [], 'layout': {'title': f'Error: {str(e)}'}}
+
     return app_dash
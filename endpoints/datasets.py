@@ -0,0 +1,45 @@
+from flask import Blueprint, jsonify
+import os
+from core import config
+from core.schema import load_schema
+from core.store import dataset_store
+from core.workspace import dataset_dir, valid_dataset_id, workspace
+
+datasets_bp = Blueprint('datasets', __name__)
+
+@datasets_bp.route('/datasets', methods=['GET'])
+def list_datasets():
+    return jsonify(workspace.list()), 200
+
+@datasets_bp.route('/datasets/<name>', methods=['GET'])
+def get_dataset(name):
+    if not valid_dataset_id(name):
+        return jsonify({"error": "Invalid dataset id."}), 400
+    entry = workspace.get(name)
+    if entry is None:
+        return jsonify({"error": "Dataset not found"}), 404
+    return jsonify(entry), 200
+
+@datasets_bp.route('/datasets/<name>/memory', methods=['GET'])
+def dataset_memory(name):
+    if not valid_dataset_id(name):
+        return jsonify({"error": "Invalid dataset id."}), 400
+    if workspace.get(name) is None:
+        return jsonify({"error": "Dataset not found"}), 404
+    return jsonify({**dataset_store.memory(name), "schema": load_schema(name)}), 200
+
+@datasets_bp.route('/datasets/<name>', methods=['DELETE'])
+def delete_dataset(name):
+    if not valid_dataset_id(name):
+        return jsonify({"error": "Invalid dataset id."}), 400
+    if name == config.default_dataset:
+        return jsonify({"error": "The default dataset cannot be deleted."}), 400
+    if workspace.get(name) is None and not os.path.isdir(dataset_dir(name)):
+        return jsonify({"error": "Dataset not found"}), 404
+    try:
+        with workspace.lock(name):
+            workspace.delete(name)
+            dataset_store.invalidate(name)
+        return jsonify({"message": f"Dataset {name} deleted."}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
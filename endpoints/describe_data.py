@@ -1,14 +1,62 @@
 from flask import Blueprint, request ,jsonify
-import pandas as pd
+from core.artifacts import artifact_path, current_version
+from core.backends import dataset_path, stage_path
+from core.cache import cached_response
+from core.chunked import ChunkedRun, MemoryLimitError, resolve_mode
+from core.responses import frame_chunks, negotiate_format
+from core.stats import summary_store
+from core.store import dataset_store
 
-file_path = "data/selected_features.csv"
+file_path = stage_path("selected")
 describe_data_bp = Blueprint('describe_data', __name__)
 
+def parse_percentiles(value):
+    try:
+        percentiles = [float(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        percentiles = []
+    if not percentiles or not all(0 <= q <= 1 for q in percentiles):
+        raise ValueError("Invalid percentiles. Use comma-separated values between 0 and 1.")
+    # Like pandas, the median is always reported
+    return sorted(set(percentiles) | {0.5})
+
 @describe_data_bp.route('/describe', methods=['GET'])
 def describe_data():
     try:
-        df = pd.read_csv(file_path)
-        description = df.describe().to_dict()
-        return jsonify(description)
+        output_format = negotiate_format(("json", "arrow", "parquet"))
+        percentiles = parse_percentiles(request.args.get('percentiles', '0.25,0.5,0.75'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        exact = request.args.get('exact', 'false').lower() == 'true'
+        version = request.args.get('version', default=None, type=int)
+        path = dataset_path("selected", file_path)
+
+        def build():
+            load = lambda: dataset_store.load("selected", path, version=version)
+            # The cached summary answers without scanning the data; exact=true describes the full frame.
+            # Files too large to load under the job memory limit are summarized in one chunked pass.
+            if version is None and resolve_mode(request.args.get('mode'), path, streamable=not exact) == "chunked":
+                summary = ChunkedRun().summary(path)
+            else:
+                summary = None if exact else summary_store.load(artifact_path(path, version), load)
+            if summary is not None and summary.columns:
+                description = summary.describe(percentiles)
+            else:
+                description = load().describe(percentiles=percentiles)
+            if output_format != "json":
+                # One row per statistic, one column per feature
+                description.index.name = "statistic"
+                chunks, mimetype = frame_chunks(description.reset_index(), output_format)
+            else:
+                chunks, mimetype = [jsonify(description.to_dict()).get_data()], "application/json"
+            artifact_version = current_version(path) if version is None else version
+            return chunks, mimetype, {} if artifact_version is None else {'X-Artifact-Version': str(artifact_version)}
+
+        # Served from the cache, or with 304 Not Modified, while the selected features are unchanged
+        return cached_response("describe", path, build, version, variant=(output_format,))
+    except MemoryLimitError as e:
+        return jsonify({"error": str(e)}), 507
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
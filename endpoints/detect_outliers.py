@@ -1,25 +1,60 @@
+import logging
 from flask import Blueprint, request ,jsonify
-import pandas as pd
-from feature_engine.imputation import MeanMedianImputer
+from core import chunked, stages
+from core.artifacts import current_version
+from core.chunked import MemoryLimitError, resolve_mode
+from core.backends import backends, dataset_path, export_frame, stage_path
+from core.responses import frame_response, negotiate_format
+from core.store import dataset_store
+from core.workspace import workspace
 
-file_path = "data/imputed_data.csv"
+file_path = stage_path("imputed")
 detect_outliers_bp = Blueprint('outlier', __name__)
+logger = logging.getLogger(__name__)
 
 @detect_outliers_bp.route('/detect_outliers', methods=['GET'])
 def detect_outliers():
     try:
-        df = pd.read_csv(file_path)
-        method = request.args.get('method', default='mean', type=str)
-        # Detect outliers using the specified method
-        outlier_detector = MeanMedianImputer(method)
-        outlier_detector.fit(df)
-        # Transform the data to cap the outliers
-        transformed_df = outlier_detector.transform(df)
-        print("Transformed Data:")
-        print(transformed_df.head())
-        # Save the transformed data to a new CSV file
-        save_path = "data/transformed_data.csv"
-        transformed_df.to_csv(save_path, index=False)
-        return jsonify({"message": "Outliers detected and data transformed successfully.", "file_path": save_path}), 200
+        path = dataset_path("imputed", file_path)
+        method = request.args.get('method', default='iqr', type=str).lower()
+        fold = request.args.get('fold', default=None, type=float)
+        tail = request.args.get('tail', default='both', type=str).lower()
+        action = request.args.get('action', default='cap', type=str).lower()
+        reuse = request.args.get('reuse', default='false', type=str).lower() in ('1', 'true', 'yes')
+        export = request.args.get('export', default='', type=str).lower()
+        if export and export not in backends:
+            return jsonify({"error": f"Invalid export format. Supported formats: {', '.join(backends)}."}), 400
+        try:
+            output_format = negotiate_format(("json", "arrow", "parquet"))
+            # Inputs that do not fit under the job memory limit are processed in chunks
+            mode = resolve_mode(request.args.get('mode'), path, streamable=not export and output_format == "json")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if mode == "chunked":
+            try:
+                report = chunked.run_stage("detect_outliers", {"method": method, "fold": fold, "tail": tail, "action": action, "reuse": reuse}, path=path)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return jsonify({"message": "Outliers detected and data transformed successfully.", **report}), 200
+        df = dataset_store.load("imputed", path)
+        # Compute per-column bounds and cap (or only count) the values outside them
+        with workspace.lock():
+            try:
+                transformed_df, report = stages.detect_outliers(df, method, fold, tail, action, reuse)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            logger.debug("Transformed data:\n%s", transformed_df.head())
+            # Save the transformed data to the stage storage
+            save_path = stage_path("transformed")
+            transformed_df = dataset_store.save("transformed", transformed_df, save_path)
+        response = {"message": "Outliers detected and data transformed successfully.", "file_path": save_path, "version": current_version(save_path), **report}
+        if export:
+            response["export_path"] = export_frame(transformed_df, save_path, export)
+        # Arrow or Parquet clients get the stage output itself, with this summary in the schema metadata
+        if output_format != "json":
+            return frame_response(transformed_df, output_format, metadata=response)
+        return jsonify(response), 200
+    except MemoryLimitError as e:
+        return jsonify({"error": str(e)}), 507
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
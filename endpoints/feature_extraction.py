@@ -1,48 +1,65 @@
+import logging
 from flask import Blueprint, request ,jsonify
-import pandas as pd
-from sklearn.feature_selection import SelectFromModel
-from sklearn.ensemble import RandomForestClassifier
+from core import chunked, stages
+from core.artifacts import current_version
+from core.chunked import MemoryLimitError, resolve_mode
+from core.backends import backends, dataset_path, export_frame, stage_path
+from core.responses import frame_response, negotiate_format
+from core.store import dataset_store
+from core.workspace import workspace
 
-file_path = "data/transformed_data.csv"
+file_path = stage_path("transformed")
 feature_extraction_bp = Blueprint('feature_extraction', __name__)
+logger = logging.getLogger(__name__)
 
 @feature_extraction_bp.route('/feature_extraction', methods=['GET'])
 def feature_extraction():
     try:
-        df = pd.read_csv(file_path)
-        print("Original Data (with missing values):")
-        print(df.head())  # Print the first few rows of the original data
-
-        top_x = request.args.get("top_x", 100) 
+        path = dataset_path("transformed", file_path)
+        top_x = request.args.get("top_x", "100")
         top_x = int(top_x) if top_x.isdigit() else 100
-        print(f"Top X: {top_x}")
-        # Drop rows with missing values
-        df = df.dropna()
-        print("Data after dropping missing values:")
-        print(df.head())  # Print the first few rows after dropping missing values
-        # Separate features and target variable
-        X = df.drop(columns=['timestamp'])
-        y = df['timestamp']  # Assuming 'timestamp' is the target variable
-        # Feature extraction using SelectFromModel
-        model = SelectFromModel(estimator=RandomForestClassifier(n_estimators=100))
-        model.fit(X, y)
-        selected_features = model.get_support(indices=True)
-        selected_columns = X.columns[selected_features]
-        print("Selected Features:")
-        print(selected_columns)  # Print the selected features
-        # Select top X% features
-        x_percent = int(len(selected_columns) * (top_x / 100))
-        selected_columns = selected_columns[:x_percent]
-        print(f"Top {top_x} Features:")
-        print(selected_columns)  # Print the top X features
-        # Create a new DataFrame with the selected features
-        selected_df = df[selected_columns]
-        selected_df['timestamp'] = df['timestamp']  # Add the timestamp column back
-        # Save the new DataFrame to a CSV file
-        selected_df.to_csv("data/selected_features.csv", index=False)
-        print("Selected features saved to 'selected_features.csv'")
-        return jsonify({"message": "Feature extraction completed successfully", "selected_features": selected_columns.tolist()}), 200
+        scorer = request.args.get("scorer", "variance").lower()
+        target = request.args.get("target") or None
+        seed = request.args.get("seed", default=None, type=int)
+        export = request.args.get("export", "").lower()
+        if export and export not in backends:
+            return jsonify({"error": f"Invalid export format. Supported formats: {', '.join(backends)}."}), 400
+        try:
+            output_format = negotiate_format(("json", "arrow", "parquet"))
+            # Inputs that do not fit under the job memory limit are processed in chunks
+            mode = resolve_mode(request.args.get("mode"), path, streamable=not export and output_format == "json")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        logger.debug("Top X: %s", top_x)
+        if mode == "chunked":
+            try:
+                result = chunked.run_stage("feature_extraction", {"top_x": top_x, "scorer": scorer, "target": target, "seed": seed}, path=path)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return jsonify({"message": "Feature extraction completed successfully", **result}), 200
+        df = dataset_store.load("transformed", path)
+        # Frames are only formatted when debug logging is on
+        logger.debug("Original data:\n%s", df.head())
+        with workspace.lock():
+            try:
+                selected_df, result = stages.feature_extraction(df, top_x, scorer, target, seed)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            logger.debug("Top %s features: %s", top_x, result["selected_features"])
+            # Save the new DataFrame to the stage storage
+            save_path = stage_path("selected")
+            selected_df = dataset_store.save("selected", selected_df, save_path)
+        logger.debug("Selected features saved to %s", save_path)
+        response = {"message": "Feature extraction completed successfully", "version": current_version(save_path), **result}
+        if export:
+            response["export_path"] = export_frame(selected_df, save_path, export)
+        # Arrow or Parquet clients get the stage output itself, with this summary in the schema metadata
+        if output_format != "json":
+            return frame_response(selected_df, output_format, metadata=response)
+        return jsonify(response), 200
     except FileNotFoundError:
         return jsonify({"error": "File not found"}), 404
+    except MemoryLimitError as e:
+        return jsonify({"error": str(e)}), 507
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
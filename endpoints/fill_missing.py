@@ -1,57 +1,92 @@
+import logging
 from flask import Blueprint, request, jsonify
-import pandas as pd
-from feature_engine.imputation import MeanMedianImputer
+from core import chunked, stages
+from core.chunked import MemoryLimitError, resolve_mode
+from core.imputation import fill_methods
+from core.config import choices
+from core.artifacts import current_version
+from core.backends import backends, dataset_path, export_frame, stage_path
+from core.responses import frame_response, negotiate_format
+from core.store import dataset_store
+from core.workspace import workspace
 
-file_path = "data/dummy_data_with_outliers.csv"
+file_path = stage_path("raw")
 fill_missing_bp = Blueprint('fill_missing', __name__)
+logger = logging.getLogger(__name__)
 
 @fill_missing_bp.route('/fill_missing', methods=['GET'])
 def fill_missing():
+    path = dataset_path("raw", file_path)
+    export = request.args.get("export", "").lower()
     try:
-        # Load the data
-        df = pd.read_csv(file_path)
-        print("Original Data (with missing values):")
-        print(df.head())
+        # Load the data, unless it does not fit under the job memory limit and is processed in chunks
+        mode = resolve_mode(request.args.get("mode"), path,
+                            streamable=not export and negotiate_format(("json", "arrow", "parquet")) == "json")
+        df = dataset_store.load("raw", path) if mode == "memory" else None
+        if df is not None:
+            logger.debug("Original data (with missing values):\n%s", df.head())
     except FileNotFoundError:
         return jsonify({"error": "File not found"}), 404
+    except MemoryLimitError as e:
+        return jsonify({"error": str(e)}), 507
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
     # Get the imputation method from the request
     method = request.args.get("method", "").lower()
-    df_imputed = None
+    reuse = request.args.get("reuse", "false").lower() in ("1", "true", "yes")
+    # Optional per-column methods ("column:method,...") and method settings
+    options = {name: request.args[name] for name in ("overrides", "max_gap", "window", "period", "value") if request.args.get(name)}
 
     try:
-        if method == "mean":
-            imputer = MeanMedianImputer(imputation_method='mean')
-            df_imputed = imputer.fit_transform(df)
-            print("Imputed Data (mean):")
-            print(df_imputed.head())
-
-        elif method == "constant":
-            df.fillna(value=0, inplace=True)
-            df_imputed = df
-            print("Imputed Data (constant):")
-            print(df.head())
-
-        elif method == "linear":
-            df_imputed = df.interpolate(method='linear')
-            print("Imputed Data (linear):")
-            print(df_imputed.head())
-
-        else:
-            return jsonify({"error": "Invalid method. Only \"mean\", \"constant\", \"linear\" are supported."}), 400
-
-        # Save the imputed DataFrame to a CSV file
-        save_path = "data/imputed_data.csv"
-        df_imputed.to_csv(save_path, index=False)
-        print(f"Imputed data saved to {save_path}")
+        if method not in fill_methods:
+            return jsonify({"error": f"Invalid method. Only {choices(fill_methods)} are supported."}), 400
+
+        if export and export not in backends:
+            return jsonify({"error": f"Invalid export format. Supported formats: {', '.join(backends)}."}), 400
+
+        try:
+            output_format = negotiate_format(("json", "arrow", "parquet"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if mode == "chunked":
+            try:
+                result = chunked.run_stage("fill_missing", {"method": method, "reuse": reuse, **options}, path=path)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return jsonify({"message": "Missing values filled successfully.", **result}), 200
+
+        # Writes to one dataset are serialized; other datasets are not blocked
+        with workspace.lock():
+            try:
+                df_imputed, result = stages.fill_missing(df, method, reuse=reuse, **options)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            logger.debug("Imputed data (%s):\n%s", method, df_imputed.head())
+
+            # Save the imputed DataFrame to the stage storage
+            save_path = stage_path("imputed")
+            df_imputed = dataset_store.save("imputed", df_imputed, save_path)
+        logger.debug("Imputed data saved to %s", save_path)
 
         # Return success response
-        return jsonify({
+        response = {
             "message": "Missing values filled successfully.",
-            "file_path": save_path
-        }), 200
+            "file_path": save_path,
+            "version": current_version(save_path),
+            **result
+        }
+        if export:
+            response["export_path"] = export_frame(df_imputed, save_path, export)
+        # Arrow or Parquet clients get the stage output itself, with this summary in the schema metadata
+        if output_format != "json":
+            return frame_response(df_imputed, output_format, metadata=response)
+        return jsonify(response), 200
 
+    except MemoryLimitError as e:
+        return jsonify({"error": str(e)}), 507
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
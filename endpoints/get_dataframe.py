@@ -1,15 +1,52 @@
-from flask import Blueprint, request ,jsonify
-import pandas as pd
+from flask import Blueprint, request, jsonify
+from core.artifacts import current_version
+from core.backends import dataset_path, stage_path
+from core.cache import cached_response
+from core.responses import SelectionError, frame_chunks, negotiate_format, orients, select_frame
+from core.store import dataset_store
 
-file_path = "data/selected_features.csv"
+file_path = stage_path("selected")
 get_dataframe_bp = Blueprint('get_dataframe', __name__)
 
 @get_dataframe_bp.route('/get_dataframe', methods=['GET'])
 def get_dataframe():
     try:
-        df = pd.read_csv(file_path)
-        return jsonify(df.to_dict(orient='records')), 200
+        offset = request.args.get('offset', default=0, type=int)
+        limit = request.args.get('limit', default=None, type=int)
+        # Pin a stage version to page through a consistent snapshot while new versions are written
+        version = request.args.get('version', default=None, type=int)
+        columns = [column for column in request.args.get('columns', '').split(',') if column]
+        orient = request.args.get('orient', default='records', type=str).lower()
+        if offset < 0 or (limit is not None and limit < 0):
+            return jsonify({"error": "offset and limit must not be negative."}), 400
+        if orient not in orients:
+            return jsonify({"error": f"Invalid orient. Only {', '.join(orients)} are supported."}), 400
+        # JSON, NDJSON, Arrow IPC stream or Parquet, from ?format= or the Accept header
+        try:
+            output_format = negotiate_format()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        path = dataset_path("selected", file_path)
+
+        def build():
+            df = dataset_store.load("selected", path, version=version)
+            df, total = select_frame(df, columns, request.args.get('start'), request.args.get('end'), offset, limit)
+            headers = {'X-Total-Count': str(total), 'X-Offset': str(offset)}
+            artifact_version = current_version(path) if version is None else version
+            if artifact_version is not None:
+                headers['X-Artifact-Version'] = str(artifact_version)
+            if limit is not None:
+                headers['X-Limit'] = str(limit)
+            # Streamed chunk by chunk, or served from the cache while the output is unchanged
+            chunks, mimetype = frame_chunks(df, output_format, orient)
+            return chunks, mimetype, headers
+
+        try:
+            return cached_response("get_dataframe", path, build, version, variant=(output_format,))
+        except SelectionError as e:
+            return jsonify({"error": str(e)}), 400
     except FileNotFoundError:
         return jsonify({"error": "File not found"}), 404
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,50 @@
+from flask import Blueprint, request, jsonify
+from core.jobs import JobQueueFull, job_manager
+from core.stages import stages
+from core.workspace import dataset_id
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route('/jobs', methods=['POST'])
+def submit_job():
+    body = request.get_json(silent=True) or {}
+
+    # Either a single stage or a whole pipeline of stages
+    if "pipeline" in body:
+        pipeline = body["pipeline"]
+    elif "stage" in body:
+        pipeline = [{"stage": body["stage"], "params": body.get("params", {})}]
+    else:
+        pipeline = [{"stage": name} for name in stages]
+
+    if not isinstance(pipeline, list) or not all(isinstance(step, dict) and "stage" in step for step in pipeline):
+        return jsonify({"error": "\"pipeline\" must be a list of {\"stage\": ..., \"params\": {...}} objects."}), 400
+
+    try:
+        job = job_manager.submit(pipeline)
+        return jsonify(job), 202
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 429
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Jobs are only visible through the dataset they were submitted for
+@jobs_bp.route('/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify(job_manager.list(dataset_id())), 200
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None or job["dataset"] != dataset_id():
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+@jobs_bp.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None or job["dataset"] != dataset_id():
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job_manager.cancel(job_id)), 200
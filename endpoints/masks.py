@@ -0,0 +1,73 @@
+from flask import Blueprint, request, jsonify
+from core.backends import stage_files, stage_path
+from core.masks import kinds, mask_store
+from core.schema import load_schema
+
+masks_bp = Blueprint('masks', __name__)
+
+# Missing values are looked up before any stage fills them, outliers where they were flagged
+default_stages = {"missing": "raw", "outliers": "transformed"}
+
+def index_for(kind):
+    # The index of the requested stage output; ValueError for invalid parameters
+    if kind not in kinds:
+        raise ValueError(f"Invalid kind. Only {', '.join(kinds)} are supported.")
+    stage = request.args.get('stage', default_stages[kind])
+    if stage not in stage_files:
+        raise ValueError(f"Invalid stage. Only {', '.join(stage_files)} are supported.")
+    return stage, mask_store.load(stage_path(stage), load_schema())
+
+def requested_columns():
+    return [column for column in request.args.get('columns', '').split(',') if column]
+
+def answer(query):
+    # Invalid parameters are 400 and stages without output 404, for every query
+    try:
+        return jsonify(query()), 200
+    except FileNotFoundError:
+        return jsonify({"error": "File not found"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@masks_bp.route('/masks', methods=['GET'])
+def mask_summary():
+    def query():
+        kind = request.args.get('kind', 'missing')
+        stage, index = index_for(kind)
+        return {"stage": stage, **index.report()}
+    return answer(query)
+
+@masks_bp.route('/masks/columns', methods=['GET'])
+def mask_columns():
+    # Columns with more than min_percent % of their cells missing (or flagged as outliers)
+    def query():
+        kind = request.args.get('kind', 'missing')
+        stage, index = index_for(kind)
+        min_percent = request.args.get('min_percent', default=0.0, type=float)
+        return {"stage": stage, "kind": kind, "rows": index.rows, "columns": index.columns_over(kind, min_percent)}
+    return answer(query)
+
+@masks_bp.route('/masks/rows', methods=['GET'])
+def mask_rows():
+    # Rows with a flagged (or missing) cell between start and end, and which of their cells
+    def query():
+        kind = request.args.get('kind', 'outliers')
+        stage, index = index_for(kind)
+        limit = request.args.get('limit', default=100, type=int)
+        if limit < 0:
+            raise ValueError("limit must not be negative.")
+        rows = index.flagged_rows(kind, request.args.get('start'), request.args.get('end'), requested_columns(), limit)
+        return {"stage": stage, "kind": kind, **rows}
+    return answer(query)
+
+@masks_bp.route('/masks/matrix', methods=['GET'])
+def mask_matrix():
+    # Share of missing (or flagged) cells per column in bins of consecutive rows
+    def query():
+        kind = request.args.get('kind', 'missing')
+        stage, index = index_for(kind)
+        bins = request.args.get('bins', default=100, type=int)
+        return {"stage": stage, "kind": kind, **index.matrix(kind, bins, requested_columns())}
+    return answer(query)
@@ -0,0 +1,11 @@
+from flask import Blueprint, Response
+from core.metrics import process_metrics, registry
+from core.store import dataset_store
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    # Prometheus text exposition format
+    process_metrics(dataset_store)
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
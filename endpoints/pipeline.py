@@ -0,0 +1,35 @@
+from flask import Blueprint, request, jsonify
+from core.backends import dataset_path, stage_path
+from core.chunked import MemoryLimitError, resolve_mode
+from core.pipeline import parse_spec
+from core.responses import frame_response, negotiate_format
+from core.service import analyze
+
+file_path = stage_path("raw")
+pipeline_bp = Blueprint('pipeline', __name__)
+
+@pipeline_bp.route('/pipeline', methods=['GET', 'POST'])
+def pipeline():
+    values = request.get_json(silent=True) or request.args
+    path = dataset_path("raw", file_path)
+    try:
+        spec = parse_spec(values)
+        output_format = negotiate_format(("json", "arrow", "parquet"))
+        # Inputs that do not fit under the job memory limit run in chunks and only return JSON
+        mode = resolve_mode(values.get("mode"), path, streamable=output_format == "json")
+    except FileNotFoundError:
+        return jsonify({"error": "File not found"}), 404
+    except MemoryLimitError as e:
+        return jsonify({"error": str(e)}), 507
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        selected_df, response = analyze(spec, path, mode=mode)
+        if output_format != "json":
+            return frame_response(selected_df, output_format, metadata=response)
+        return jsonify(response), 200
+    except FileNotFoundError:
+        return jsonify({"error": "File not found"}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
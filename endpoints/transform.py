@@ -0,0 +1,56 @@
+from flask import Blueprint, request, jsonify
+import pandas as pd
+from core.config import choices
+from core.models import model_registry
+from core.responses import plain_dates
+from core.schema import apply_schema, load_schema, read_csv
+
+transform_bp = Blueprint('transform', __name__)
+
+# Stages whose fitted parameters can be applied to new batches
+transform_stages = ("fill_missing", "detect_outliers")
+
+@transform_bp.route('/transform', methods=['POST'])
+def transform():
+    names = [name.strip() for name in request.args.get("stage", ",".join(transform_stages)).split(",") if name.strip()]
+    model_id = request.args.get("model_id")
+    action = request.args.get("action", "cap").lower()
+
+    invalid = [name for name in names if name not in transform_stages]
+    if invalid or not names:
+        return jsonify({"error": f"Invalid stage. Only {choices(transform_stages)} are supported."}), 400
+    if model_id and len(names) > 1:
+        return jsonify({"error": "model_id can only be given for a single stage."}), 400
+
+    try:
+        # The batch is either a raw CSV body or JSON records, read with the dtypes of the dataset
+        schema = load_schema()
+        if request.mimetype == 'text/csv':
+            df = read_csv(request.stream, schema)
+        else:
+            records = request.get_json(silent=True)
+            if not isinstance(records, list):
+                return jsonify({"error": "Send a text/csv body or a JSON list of records."}), 400
+            df = apply_schema(pd.DataFrame.from_records(records), schema)
+    except Exception as e:
+        return jsonify({"error": f"Could not read the batch: {e}"}), 400
+
+    try:
+        models = []
+        for name in names:
+            stage_model_id = model_id or model_registry.latest(name)
+            model = model_registry.get(stage_model_id)
+            if model is None:
+                return jsonify({"error": f"No fitted model for stage \"{name}\". Run the stage first."}), 404
+
+            # Apply the cached parameters without refitting
+            if name == "detect_outliers":
+                df, report = model.transform(df, action)
+                models.append({"stage": name, "model_id": stage_model_id, **report})
+            else:
+                df, report = model.transform(df)
+                models.append({"stage": name, "model_id": stage_model_id, **report})
+
+        return jsonify({"rows": len(df), "models": models, "data": plain_dates(df).to_dict(orient='records')}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,28 +1,65 @@
 from flask import Blueprint, request ,jsonify
 import pandas as pd
+from core.append import append_rows
+from core.backends import dataset_path, stage_path
+from core.ingest import IngestError
+from core.schema import load_schema, read_csv
+from core.service import upload_csv
 
-file_path = "data/dummy_data_with_outliers.csv"
+file_path = stage_path("raw")
 upload_data_bp = Blueprint('upload_data', __name__)
 
 @upload_data_bp.route('/upload', methods=['POST'])
 def upload_data():
     try:
-        # Check if the file is part of the request
-        if 'file' not in request.files:
-            return jsonify({"error": "No file part in the request"}), 400
-        
-        file = request.files['file']
-        
-        # Check if a file was actually uploaded
-        if file.filename == '':
-            return jsonify({"error": "No selected file"}), 400
-        
-        # Read the uploaded CSV file into a DataFrame
-        df = pd.read_csv(file)
-        
-        # Save the DataFrame to a CSV file
-        df.to_csv(file_path, index=False)
-        
-        return jsonify({"message": "File uploaded successfully", "file_path": file_path}), 200
+        # Raw CSV bodies (Content-Type: text/csv) are parsed straight from the request stream
+        if request.mimetype == 'text/csv':
+            stream = request.stream
+        else:
+            # Check if the file is part of the request
+            if 'file' not in request.files:
+                return jsonify({"error": "No file part in the request"}), 400
+
+            file = request.files['file']
+
+            # Check if a file was actually uploaded
+            if file.filename == '':
+                return jsonify({"error": "No selected file"}), 400
+
+            # Werkzeug spools large multipart files to disk, so this stream is not held in memory
+            stream = file.stream
+
+        # Optional float32 storage and a subset of the columns to keep
+        float_dtype = request.args.get("float_dtype") or None
+        columns = [column for column in request.args.get("columns", "").split(",") if column] or None
+        summary = upload_csv(stream, dataset_path("raw", file_path), float_dtype=float_dtype, columns=columns)
+        return jsonify({"message": "File uploaded successfully", **summary}), 200
+    except IngestError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@upload_data_bp.route('/append', methods=['POST'])
+def append_data():
+    # New rows as a text/csv body or a JSON list of records, read with the dtypes of the dataset
+    try:
+        schema = load_schema()
+        if request.mimetype == 'text/csv':
+            batch = read_csv(request.stream, schema)
+        else:
+            records = request.get_json(silent=True)
+            if not isinstance(records, list):
+                return jsonify({"error": "Send a text/csv body or a JSON list of records."}), 400
+            batch = pd.DataFrame.from_records(records)
+    except Exception as e:
+        return jsonify({"error": f"Could not read the batch: {e}"}), 400
+
+    try:
+        conflict = request.args.get("conflict", "skip").lower()
+        action = request.args.get("action", "cap").lower()
+        report = append_rows(batch, dataset_path("raw", file_path), conflict=conflict, action=action)
+        return jsonify({"message": "Rows appended successfully", **report}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
@@ -1,76 +1,131 @@
-import pandas as pd
+import argparse
+import os
+
 import numpy as np
-from datetime import datetime, timedelta
-import random
-import string
-
-# Configuration
-num_columns = 50  # Number of sensor columns
-periods = 96      # Number of rows (48 hours with 30-minute intervals)
-freq_minutes = 30
-start_time = datetime(2021, 5, 15, 0, 0, 0)
-
-# Function to generate random sensor tag names in an industrial format
-def generate_random_tag():
-    prefix = random.choice(['AI', 'TI', 'PI', 'FI', 'PDI', 'TIC', 'FIC', 'PIC', 'TY', 'RX', 'SN', 'CAT'])
-    section = f"{random.randint(1, 3)}{random.choice(string.ascii_uppercase)}{random.randint(1, 9)}"
-    suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=2))
-    postfix = random.choice(['.PV', '.CPV', '.MV'])
-    return f"{prefix}-{section}{suffix}{postfix}"
-
-# Generate timestamp list
-timestamps = [start_time + timedelta(minutes=freq_minutes * i) for i in range(periods)]
-
-# Generate random column names and values
-np.random.seed(42)
-random.seed(42)
-columns = [generate_random_tag() for _ in range(num_columns)]
-columns = list(set(columns))  # Remove duplicates if any
-while len(columns) < num_columns:  # Refill if any duplicates were removed
-    new_tag = generate_random_tag()
-    if new_tag not in columns:
-        columns.append(new_tag)
-
-data = {"timestamp": timestamps}
-for col in columns:
-    # Assign value ranges based on tag prefix
-    if col.startswith("TI") or col.startswith("TIC"):
-        values = np.random.uniform(20, 600, size=periods)
-    elif col.startswith("PI") or col.startswith("PDI") or col.startswith("PIC"):
-        values = np.random.uniform(0, 100, size=periods)
-    elif col.startswith("FI") or col.startswith("FIC"):
-        values = np.random.uniform(100, 1000, size=periods)
-    elif col.endswith(".MV"):
-        values = np.random.uniform(0, 1, size=periods)
-    else:
-        values = np.random.uniform(0, 500, size=periods)
-
-    # Add outliers (randomly adding some extreme values to create outliers)
-    num_outliers = int(periods * 0.05)  # 5% of the data will have outliers
-    outlier_indices = random.sample(range(periods), num_outliers)
-
-    for idx in outlier_indices:
-        # Create outliers by assigning extreme values outside the normal range
-        if col.startswith("TI") or col.startswith("TIC"):
-            values[idx] = random.choice([1000, 1500, 2000, 5000])  # Add high outlier
-        elif col.startswith("PI") or col.startswith("PDI") or col.startswith("PIC"):
-            values[idx] = random.choice([120, 150, 200])  # Add high outlier
-        elif col.startswith("FI") or col.startswith("FIC"):
-            values[idx] = random.choice([2000, 3000, 4000])  # Add high outlier
-        elif col.endswith(".MV"):
-            values[idx] = random.choice([2, 3, 10])  # Add high outlier
-        else:
-            values[idx] = random.choice([600, 700, 1000])  # Add high outlier
-
-    # Introduce missing values
-    num_missing = int(periods * 0.1)  # 10% of the data will have missing values
-    missing_indices = random.sample(range(periods), num_missing)
-    for idx in missing_indices:
-        values[idx] = np.nan  # Assign NaN to create missing values
-
-    data[col] = values
-
-# Export to DataFrame
-df = pd.DataFrame(data)
-df.to_csv("data/dummy_data_with_outliers.csv", index=False)
-print("✅ File 'dummy_data_with_outliers.csv' has been generated successfully with missing values.")
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+# Synthetic sensor data in the historian export format: a timestamp column and one column per
+# sensor tag, with outliers and missing values. Values, outliers and gaps are drawn for a whole
+# chunk of rows at once, so GB-scale files are written in seconds and without holding them in memory.
+
+prefixes = np.array(['AI', 'TI', 'PI', 'FI', 'PDI', 'TIC', 'FIC', 'PIC', 'TY', 'RX', 'SN', 'CAT'])
+postfixes = np.array(['.PV', '.CPV', '.MV'])
+letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+alphanumerics = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"))
+
+
+def generate_tags(count, rng):
+    # Unique tag names like "TI-2B7QX.PV"; duplicates are redrawn
+    tags = []
+    while len(tags) < count:
+        size = 2 * (count - len(tags))
+        names = np.char.add(np.char.add(rng.choice(prefixes, size), "-"), rng.integers(1, 4, size).astype(str))
+        names = np.char.add(names, rng.choice(letters, size))
+        names = np.char.add(names, rng.integers(1, 10, size).astype(str))
+        names = np.char.add(np.char.add(names, rng.choice(alphanumerics, size)), rng.choice(alphanumerics, size))
+        names = np.char.add(names, rng.choice(postfixes, size))
+        tags = list(dict.fromkeys(tags + names.tolist()))[:count]
+    return tags
+
+
+def value_ranges(tags):
+    # Normal range and outlier values of each tag, by its prefix
+    low, high = np.zeros(len(tags)), np.full(len(tags), 500.0)
+    outliers = np.tile([600.0, 700.0, 1000.0, 1000.0], (len(tags), 1))
+    for position, tag in enumerate(tags):
+        if tag.startswith("TI"):
+            low[position], high[position], outliers[position] = 20, 600, [1000, 1500, 2000, 5000]
+        elif tag.startswith(("PI", "PDI")):
+            high[position], outliers[position] = 100, [120, 150, 200, 200]
+        elif tag.startswith("FI"):
+            low[position], high[position], outliers[position] = 100, 1000, [2000, 3000, 4000, 4000]
+        elif tag.endswith(".MV"):
+            high[position], outliers[position] = 1, [2, 3, 10, 10]
+    return low, high, outliers
+
+
+def generate_chunk(rows, tags, ranges, rng, missing_rate=0.1, outlier_rate=0.05):
+    low, high, outliers = ranges
+    values = rng.uniform(low, high, size=(rows, len(tags)))
+    # Outliers and gaps are independent Bernoulli masks over the whole block
+    outlier_rows, outlier_columns = np.nonzero(rng.random(values.shape) < outlier_rate)
+    values[outlier_rows, outlier_columns] = outliers[outlier_columns, rng.integers(0, outliers.shape[1], len(outlier_columns))]
+    values[rng.random(values.shape) < missing_rate] = np.nan
+    return values
+
+
+def generate_frame(rows=96, columns=50, missing_rate=0.1, outlier_rate=0.05, seed=42,
+                   start="2021-05-15 00:00:00", freq="30min"):
+    return pd.concat(iter_frames(rows, columns, missing_rate, outlier_rate, seed, start, freq), ignore_index=True)
+
+
+def iter_frames(rows=96, columns=50, missing_rate=0.1, outlier_rate=0.05, seed=42,
+                start="2021-05-15 00:00:00", freq="30min", chunk_rows=100000):
+    # Chunk i is drawn from its own seeded stream, so the output only depends on the parameters
+    # (including chunk_rows), not on how the chunks are consumed
+    tags = generate_tags(columns, np.random.default_rng(seed))
+    ranges = value_ranges(tags)
+    step = pd.Timedelta(freq)
+    for index, first in enumerate(range(0, rows, chunk_rows)):
+        size = min(chunk_rows, rows - first)
+        rng = np.random.default_rng([seed, index])
+        df = pd.DataFrame(generate_chunk(size, tags, ranges, rng, missing_rate, outlier_rate), columns=tags)
+        df.insert(0, "timestamp", pd.Timestamp(start) + step * np.arange(first, first + size))
+        yield df
+
+
+def _open_writer(path, schema):
+    if path.endswith(".csv"):
+        # Unquoted, like the historian exports
+        with open(path, "w") as file:
+            file.write(",".join(schema.names) + "\n")
+        options = pacsv.WriteOptions(include_header=False, quoting_style="none")
+        return pacsv.CSVWriter(pa.OSFile(path, "ab"), schema, write_options=options)
+    if path.endswith(".parquet"):
+        return pq.ParquetWriter(path, schema, compression="snappy")
+    return pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(compression=None))
+
+
+def write_dataset(path, chunk_rows=100000, **params):
+    # Written with Arrow's writers chunk by chunk: CSV, or Feather/Parquet like the stage storage
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    writer = None
+    rows = 0
+    try:
+        for df in iter_frames(chunk_rows=chunk_rows, **params):
+            if path.endswith(".csv"):
+                df["timestamp"] = df["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S")
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            writer = writer or _open_writer(path, table.schema)
+            writer.write_table(table)
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic sensor data with outliers and missing values.")
+    parser.add_argument("--rows", type=int, default=96, help="number of rows (default: 48 hours at 30 minutes)")
+    parser.add_argument("--columns", type=int, default=50, help="number of sensor columns")
+    parser.add_argument("--missing-rate", type=float, default=0.1, help="share of missing values")
+    parser.add_argument("--outlier-rate", type=float, default=0.05, help="share of outliers")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start", default="2021-05-15 00:00:00", help="first timestamp")
+    parser.add_argument("--freq", default="30min", help="sampling interval")
+    parser.add_argument("--chunk-rows", type=int, default=100000, help="rows generated and written at a time")
+    parser.add_argument("--output", default="data/dummy_data_with_outliers.csv", help=".csv, .feather or .parquet file")
+    args = parser.parse_args(argv)
+
+    rows = write_dataset(args.output, chunk_rows=args.chunk_rows, rows=args.rows, columns=args.columns,
+                         missing_rate=args.missing_rate, outlier_rate=args.outlier_rate, seed=args.seed,
+                         start=args.start, freq=args.freq)
+    print(f"✅ File '{args.output}' has been generated with {rows} rows and {args.columns} sensor columns.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import pytest
+from app import app as flask_app
+from core.workspace import current_dataset
+
+@pytest.fixture
+def data_dir(monkeypatch, tmp_path):
+    # Stage outputs and the dataset index go to a temporary data directory. Requests set the
+    # current dataset of this thread; later tests expect the default one.
+    monkeypatch.setattr("core.config.data_dir", str(tmp_path))
+    token = current_dataset.set(None)
+    yield tmp_path
+    current_dataset.reset(token)
+
+@pytest.fixture
+def client(data_dir):
+    with flask_app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def upload(data_dir):
+    # Uploads a CSV body as a named dataset and optionally runs the pipeline on it
+    def upload(dataset, data, pipeline=None):
+        with flask_app.test_client() as client:
+            response = client.post(f'/api/v1/datasets/{dataset}/upload', data=data, content_type='text/csv')
+            assert response.status_code == 200
+            if pipeline is not None:
+                response = client.post(f'/api/v1/datasets/{dataset}/pipeline', json=pipeline)
+                assert response.status_code == 200
+            return response
+    return upload
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from core.artifacts import segments, versions
+from core.backends import read_frame
+
+csv = "timestamp,col1,col2\n" + "\n".join(
+    f"2021-05-15 {hour:02d}:00:00,{hour},{'' if hour == 2 else 10 + hour}" for hour in range(6)
+)
+
+@pytest.fixture
+def client(client, upload):
+    upload('plant-a', csv, pipeline={"fill_method": "ffill", "outlier_method": "iqr", "top_x": 100})
+    return client
+
+def rows(client):
+    with client.get('/api/v1/datasets/plant-a/get_dataframe') as response:
+        return response.json
+
+def test_append_extends_every_stage_with_the_new_rows_only(client, tmp_path):
+    assert client.get('/api/v1/datasets/plant-a/describe').json["col1"]["count"] == 6
+    batch = [{"timestamp": "2021-05-15 06:00:00", "col1": None, "col2": 16},
+             {"timestamp": "2021-05-15 07:00:00", "col1": 100.0, "col2": 17}]
+    response = client.post('/api/v1/datasets/plant-a/append', json=batch)
+    assert response.status_code == 200
+    assert response.json["appended"] == 2 and response.json["stale"] == []
+    assert [stage["stage"] for stage in response.json["stages"]] == ["raw", "fill_missing", "detect_outliers", "feature_extraction"]
+
+    # Each stage got a version holding only the two new rows, on top of the previous one
+    path = str(tmp_path / "datasets" / "plant-a" / "imputed_data.feather")
+    assert segments(path, versions(path)[-1]) == [1]
+    assert len(read_frame(path)) == 2
+
+    data = rows(client)
+    assert len(data) == 8
+    # The gap at the start of the batch is filled forward from the stored rows; 100 is capped
+    assert data[6]["col1"] == 5.0
+    assert data[7]["col1"] < 100.0 and data[7]["timestamp"] == "2021-05-15 07:00:00"
+
+    # The cached summary was extended with the batch and agrees with a full scan
+    approximate = client.get('/api/v1/datasets/plant-a/describe').json
+    exact = client.get('/api/v1/datasets/plant-a/describe?exact=true').json
+    assert approximate["col1"]["count"] == exact["col1"]["count"] == 8
+    assert np.isclose(approximate["col2"]["mean"], exact["col2"]["mean"])
+
+def test_late_rows_are_skipped_or_upserted(client):
+    batch = "timestamp,col1,col2\n2021-05-15 01:00:00,-1,-1\n2021-05-15 06:00:00,6,16\n2021-05-15 06:00:00,7,17"
+    response = client.post('/api/v1/datasets/plant-a/append', data=batch, content_type='text/csv')
+    assert response.json["received"] == 2 and response.json["skipped"] == 1 and response.json["appended"] == 1
+    # The last of the repeated timestamps wins
+    assert rows(client)[-1]["col1"] == 7.0
+
+    batch = "timestamp,col1,col2\n2021-05-15 01:00:00,2.5,11\n2021-05-15 01:30:00,3,12"
+    response = client.post('/api/v1/datasets/plant-a/append?conflict=update', data=batch, content_type='text/csv')
+    # 01:00 replaced a stored row, 01:30 was inserted
+    assert response.json["rewritten"] is True and response.json["updated"] == 1 and response.json["appended"] == 1
+    data = rows(client)
+    assert [row["timestamp"][11:16] for row in data[:4]] == ["00:00", "01:00", "01:30", "02:00"]
+    assert data[1]["col1"] == 2.5 and len(data) == 8
+
+def test_append_rejects_unknown_columns_and_conflict_modes(client):
+    response = client.post('/api/v1/datasets/plant-a/append', json=[{"timestamp": "2021-05-16 00:00:00", "col3": 1}])
+    assert response.status_code == 400 and "col3" in response.json["error"]
+    response = client.post('/api/v1/datasets/plant-a/append?conflict=replace', json=[])
+    assert response.status_code == 400
+    response = client.post('/api/v1/datasets/plant-b/append', data=csv, content_type='text/csv')
+    assert response.status_code == 400
@@ -0,0 +1,96 @@
+import fcntl
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from core import config
+from core.artifacts import (append_artifact, artifact_path, current_version, read_artifact, read_lock, read_tail,
+                            segments, versions, write_artifact)
+from core.backends import read_frame
+from core.workspace import FileLock
+
+
+def test_versions_are_immutable_and_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "artifact_versions", 3)
+    path = str(tmp_path / "imputed_data.feather")
+    for value in range(5):
+        assert write_artifact(pd.DataFrame({"col1": [float(value)]}), path) == value + 1
+
+    assert versions(path) == [3, 4, 5]
+    assert current_version(path) == 5
+    assert read_frame(path)["col1"].tolist() == [4.0]
+    assert read_frame(artifact_path(path, 3))["col1"].tolist() == [2.0]
+    with pytest.raises(FileNotFoundError):
+        artifact_path(path, 1)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_appends_write_segments_until_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "artifact_versions", 2)
+    monkeypatch.setattr(config, "append_max_segments", 4)
+    path = str(tmp_path / "raw.feather")
+    write_artifact(pd.DataFrame({"col1": [0.0, 1.0]}), path)
+    for value in (2.0, 3.0, 4.0):
+        append_artifact(pd.DataFrame({"col1": [value]}), path)
+
+    # Version 4 holds one row; the rows before it stay in the files of versions 1-3, which are kept
+    assert segments(path, 4) == [1, 2, 3] and versions(path) == [1, 2, 3, 4]
+    assert read_artifact(path)["col1"].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert read_artifact(path, 2)["col1"].tolist() == [0.0, 1.0, 2.0]
+    assert read_tail(path, 2)["col1"].tolist() == [3.0, 4.0]
+
+    # The next append rewrites the artifact as one file; the segments go once version 4 is pruned
+    append_artifact(pd.DataFrame({"col1": [5.0]}), path)
+    assert segments(path, 5) == [] and versions(path) == [1, 2, 3, 4, 5]
+    assert read_frame(path)["col1"].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    append_artifact(pd.DataFrame({"col1": [6.0]}), path)
+    assert versions(path) == [5, 6]
+    with pytest.raises(FileNotFoundError):
+        read_artifact(path, 4)
+
+
+def test_readers_never_see_partial_files(tmp_path):
+    path = str(tmp_path / "selected_features.csv")
+    df = pd.DataFrame({"col1": range(20000), "col2": range(20000)})
+    write_artifact(df, path)
+    errors = []
+
+    def read():
+        for _ in range(30):
+            with read_lock(path):
+                rows = len(read_frame(path))
+            if rows != len(df):
+                errors.append(rows)
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    for _ in range(10):
+        write_artifact(df, path)
+    for reader in readers:
+        reader.join()
+    assert errors == []
+
+
+def test_file_lock_is_shared_or_exclusive_across_descriptors(tmp_path):
+    lock_path = str(tmp_path / ".lock")
+
+    def try_lock(mode):
+        with open(lock_path, "a+") as file:
+            try:
+                fcntl.flock(file.fileno(), mode | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                return False
+
+    lock = FileLock(lock_path)
+    with lock.shared():
+        assert try_lock(fcntl.LOCK_SH)
+        assert not try_lock(fcntl.LOCK_EX)
+    with lock.exclusive():
+        # Reentrant within the thread
+        with lock.shared():
+            assert not try_lock(fcntl.LOCK_SH)
+    assert try_lock(fcntl.LOCK_EX)
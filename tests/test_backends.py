@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+from core import config
+from core.backends import backend_for_path, export_frame, get_backend, read_frame, stage_path, write_frame
+
+
+@pytest.mark.parametrize("extension", [".csv", ".feather", ".parquet"])
+def test_round_trip(tmp_path, extension):
+    df = pd.DataFrame({
+        "timestamp": pd.date_range("2021-05-15", periods=3, freq="30min"),
+        "col1": [1.5, None, 3.0],
+    })
+    path = str(tmp_path / f"frame{extension}")
+    write_frame(df, path)
+    result = read_frame(path)
+    assert list(result.columns) == ["timestamp", "col1"]
+    assert result["col1"].isna().sum() == 1
+    if extension != ".csv":
+        # Binary formats keep dtypes between stages
+        pd.testing.assert_frame_equal(result, df)
+
+
+def test_stage_path_uses_configured_format(monkeypatch):
+    monkeypatch.setattr(config, "data_dir", "workdir")
+    assert stage_path("imputed") == f"workdir/imputed_data{get_backend().extension}"
+    assert stage_path("selected", "csv") == "workdir/selected_features.csv"
+    assert backend_for_path("unknown.txt").name == "csv"
+    with pytest.raises(ValueError):
+        get_backend("xlsx")
+
+
+def test_export_frame_writes_csv_copy(tmp_path):
+    df = pd.DataFrame({"col1": [1, 2]})
+    path = str(tmp_path / "imputed_data.feather")
+    write_frame(df, path)
+    export_path = export_frame(df, path)
+    assert export_path == str(tmp_path / "imputed_data.csv")
+    assert pd.read_csv(export_path)["col1"].tolist() == [1, 2]
+
+
+@pytest.mark.parametrize("extension", [".csv", ".feather", ".parquet"])
+def test_open_writer_appends_chunks(tmp_path, extension):
+    path = str(tmp_path / f"frame{extension}")
+    writer = get_backend(extension[1:]).open_writer(path)
+    writer.write(pd.DataFrame({"col1": [1.0, 2.0], "tag": ["a", "b"]}))
+    writer.write(pd.DataFrame({"col1": [None], "tag": ["c"]}))
+    writer.close()
+    result = read_frame(path)
+    assert len(result) == 3
+    assert result["tag"].tolist() == ["a", "b", "c"]
@@ -0,0 +1,14 @@
+from benchmarks import harness
+
+
+def test_run_and_compare(tmp_path):
+    document = harness.run(["200x5"], repeat=1, select=["fill_missing[mean]", "pipeline"], log=lambda line: None)
+    assert [result["benchmark"] for result in document["results"]] == ["upload", "fill_missing[mean]", "pipeline"]
+    assert all(result["seconds"]["median"] > 0 and result["peak_bytes"] > 0 for result in document["results"])
+
+    path = str(tmp_path / "results.json")
+    harness.save(document, path)
+    slower = harness.load(path)
+    slower["results"][1]["seconds"]["median"] *= 2
+    rows = harness.compare(document, slower)
+    assert [row["regression"] for row in rows] == [False, True, False]
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+from core.backends import stage_path
+from core.cache import cached_view, response_cache
+from core.metrics import registry
+from scripts.generate_data import generate_frame
+
+@pytest.fixture
+def client(client, upload):
+    response_cache.clear()
+    registry.clear()
+    upload('cached', generate_frame(500, 5).to_csv(index=False), pipeline={"fill_method": "mean", "outlier_method": "iqr", "top_x": 50})
+    yield client
+    response_cache.clear()
+
+def cache_results(result):
+    return registry.value("feature_engine_response_cache_total", result=result) or 0
+
+def test_unchanged_outputs_are_not_modified(client):
+    response = client.get('/api/v1/datasets/cached/describe')
+    assert response.status_code == 200 and response.headers['Cache-Control'] == 'no-cache'
+    etag, modified = response.headers['ETag'], response.headers['Last-Modified']
+    assert client.get('/api/v1/datasets/cached/describe', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/v1/datasets/cached/describe', headers={'If-Modified-Since': modified}).status_code == 304
+    # Other parameters and encodings are other representations
+    assert client.get('/api/v1/datasets/cached/describe?percentiles=0.1', headers={'If-None-Match': etag}).status_code == 200
+    compressed = client.get('/api/v1/datasets/cached/describe', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip' and compressed.headers['ETag'] != etag
+    # A new version of the selected features changes the ETag
+    client.post('/api/v1/datasets/cached/pipeline', json={"fill_method": "mean", "outlier_method": "iqr", "top_x": 20})
+    response = client.get('/api/v1/datasets/cached/describe', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag and len(response.json) < 5
+
+def test_bodies_are_served_from_memory_or_disk(client):
+    first = client.get('/api/v1/datasets/cached/get_dataframe?limit=20&orient=split', headers={'Accept-Encoding': 'zstd'})
+    assert cache_results("miss") == 1
+    second = client.get('/api/v1/datasets/cached/get_dataframe?limit=20&orient=split', headers={'Accept-Encoding': 'zstd'})
+    assert cache_results("hit") == 1
+    assert second.data == first.data and second.headers['ETag'] == first.headers['ETag']
+    assert second.headers['X-Total-Count'] == first.headers['X-Total-Count'] and second.headers['Content-Encoding'] == 'zstd'
+    # Another process (or a restart) finds the body on disk
+    response_cache.clear()
+    third = client.get('/api/v1/datasets/cached/get_dataframe?limit=20&orient=split', headers={'Accept-Encoding': 'zstd'})
+    assert third.data == first.data and cache_results("hit") == 2
+    assert client.get('/api/v1/datasets/cached/get_dataframe?columns=unknown').status_code == 400
+
+def test_large_bodies_are_streamed_with_an_etag(client, monkeypatch):
+    monkeypatch.setattr("core.config.response_cache_max_entry", 100)
+    response = client.get('/api/v1/datasets/cached/get_dataframe', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200 and response.headers['Content-Encoding'] == 'gzip' and response.data
+    assert response_cache.stats()["entries"] == 0
+    assert client.get('/api/v1/datasets/cached/get_dataframe', headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']}).status_code == 304
+
+def test_views_are_computed_once_per_version(client):
+    calls = []
+    compute = lambda: calls.append(1) or {"page": len(calls)}
+    path = stage_path("selected", dataset="cached")
+    assert cached_view("table", path, compute, 0, 10) == cached_view("table", path, compute, 0, 10) == {"page": 1}
+    assert cached_view("table", path, compute, 1, 10) == {"page": 2}
+    client.post('/api/v1/datasets/cached/pipeline', json={"fill_method": "mean", "outlier_method": "iqr", "top_x": 20})
+    assert cached_view("table", path, compute, 0, 10) == {"page": 3}
+    # Views are only kept in memory
+    assert not os.path.isdir(response_cache.directory)
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+from core.chunked import MemoryGuard, MemoryLimitError, _anonymous_memory
+from core.imputation import Imputer
+from core.outliers import OutlierDetector
+from core.stats import ColumnSummary
+from scripts.generate_data import generate_frame
+
+@pytest.fixture
+def client(client, upload, monkeypatch):
+    monkeypatch.setattr("core.config.chunk_rows", 300)
+    upload('big', generate_frame(2000, 6).to_csv(index=False))
+    return client
+
+def selected(client):
+    with client.get('/api/v1/datasets/big/get_dataframe?limit=5000') as response:
+        return pd.DataFrame(response.json)
+
+def test_chunked_pipeline_matches_the_in_memory_one(client):
+    spec = {"fill_method": "mean", "outlier_method": "gaussian", "top_x": 50}
+    memory = client.post('/api/v1/datasets/big/pipeline', json={**spec, "mode": "memory"}).json
+    memory_df = selected(client)
+    chunked = client.post('/api/v1/datasets/big/pipeline', json={**spec, "mode": "chunked"}).json
+    assert chunked["execution"]["mode"] == "chunked" and chunked["execution"]["chunk_rows"] == 300
+    assert chunked["selected_features"] == memory["selected_features"]
+    assert [stage["rows"] for stage in chunked["stages"]] == [2000, 2000, 2000]
+    for stage in ("fill_missing", "detect_outliers"):
+        memory_stage, chunked_stage = (next(s for s in run["stages"] if s["stage"] == stage) for run in (memory, chunked))
+        assert chunked_stage.get("total_filled") == memory_stage.get("total_filled")
+        assert chunked_stage.get("outlier_counts") == memory_stage.get("outlier_counts")
+    chunked_df = selected(client)
+    pd.testing.assert_frame_equal(chunked_df, memory_df, rtol=1e-6)
+    # The summary written with the chunks answers /describe
+    assert client.get('/api/v1/datasets/big/describe').json[memory["selected_features"][0]]["count"] == 2000
+
+def test_auto_mode_streams_inputs_above_the_memory_limit(client, monkeypatch):
+    # As if the input took a million times its size in memory
+    monkeypatch.setattr("core.chunked.memory_copies", 10 ** 6)
+    response = client.get('/api/v1/datasets/big/fill_missing?method=ffill')
+    assert response.status_code == 200 and response.json["mode"] == "chunked"
+    # The forward fill continues across chunk boundaries: only leading gaps remain
+    values = generate_frame(2000, 6).drop(columns="timestamp")
+    assert response.json["remaining_missing"] == int(values.ffill().isna().sum().sum())
+    # In memory, or as a whole frame in the response, it would not fit
+    assert client.get('/api/v1/datasets/big/fill_missing?method=mean&mode=memory').status_code == 507
+    assert client.get('/api/v1/datasets/big/fill_missing?method=mean&format=arrow').status_code == 507
+    # Fills that need the whole history are refused in chunks
+    response = client.get('/api/v1/datasets/big/fill_missing?method=time&mode=chunked')
+    assert response.status_code == 400 and "mode=memory" in response.json["error"]
+    assert client.get('/api/v1/datasets/big/fill_missing?method=mean&mode=fast').status_code == 400
+
+def test_chunked_fits_match_the_in_memory_fits():
+    df = generate_frame(1000, 5)
+    chunks = [df.iloc[start:start + 128] for start in range(0, len(df), 128)]
+    np.testing.assert_allclose(Imputer("mean").fit_chunks(chunks).fill_values_, Imputer("mean").fit(df).fill_values_)
+    summary = ColumnSummary.from_frame(df)
+    detector = OutlierDetector("gaussian").fit_summary(summary)
+    expected = OutlierDetector("gaussian").fit(df)
+    np.testing.assert_allclose(detector.lower_, expected.lower_)
+    np.testing.assert_allclose(detector.upper_, expected.upper_)
+
+@pytest.mark.skipif(_anonymous_memory() is None, reason="needs /proc/self/status")
+def test_memory_guard_stops_jobs_above_the_limit():
+    guard = MemoryGuard(limit=8 * 2 ** 20)
+    guard.check()
+    block = np.ones(32 * 2 ** 20 // 8)
+    with pytest.raises(MemoryLimitError):
+        guard.check()
+    del block
@@ -1,11 +1,5 @@
 import pytest
 from flask import Flask
-from app import app as flask_app
-
-@pytest.fixture
-def client():
-    with flask_app.test_client() as client:
-        yield client
 
 def test_index(client):
     response = client.get('/api/v1/')
@@ -41,16 +35,24 @@ def test_detect_outliers_file_not_found(client, monkeypatch):
     assert response.status_code == 500
     assert "error" in response.json
 
+def test_detect_outliers_rejects_invalid_folds(client, upload):
+    upload('plant-a', "timestamp,col1\n2021-05-15 00:00:00,1\n2021-05-15 00:30:00,2\n2021-05-15 01:00:00,90", pipeline={"fill_method": "mean"})
+    for query in ("method=quantile&fold=0.9", "method=iqr&fold=-1", "method=gaussian&fold=0"):
+        response = client.get(f'/api/v1/datasets/plant-a/detect_outliers?{query}')
+        assert response.status_code == 400 and "fold" in response.json["error"]
+    assert client.get('/api/v1/datasets/plant-a/detect_outliers?method=quantile&fold=0.1').status_code == 200
+
 def test_feature_extraction_file_not_found(client, monkeypatch):
     monkeypatch.setattr("endpoints.feature_extraction.file_path", "non_existent_file.csv")
     response = client.get('/api/v1/feature_extraction?top_x=10')
     assert response.status_code == 404
     assert "error" in response.json
 
-def test_upload_data_success(client, tmp_path):
+def test_upload_data_success(client, monkeypatch, tmp_path):
     # Create a temporary CSV file
     temp_file = tmp_path / "test_data.csv"
     temp_file.write_text("col1,col2\n1,2\n3,4")
+    monkeypatch.setattr("endpoints.upload_data.file_path", str(tmp_path / "raw.feather"))
 
     with open(temp_file, "rb") as file:
         response = client.post('/api/v1/upload', data={'file': (file, 'test_data.csv')})
@@ -84,10 +86,272 @@ def test_describe_data_success(client, monkeypatch, tmp_path):
 def test_fill_missing_invalid_method(client):
     response = client.get('/api/v1/fill_missing?method=invalid')
     assert response.status_code == 400
-    assert response.json == {"error": "Invalid method. Only \"mean\", \"constant\", \"linear\" are supported."}
+    assert response.json == {"error": "Invalid method. Only \"mean\", \"constant\", \"linear\", \"time\", \"ffill\", \"bfill\", \"rolling_median\", \"seasonal\" are supported."}
 
 def test_detect_outliers_invalid_method(client, monkeypatch):
     monkeypatch.setattr("endpoints.detect_outliers.file_path", "data/valid_data.csv")
     response = client.get('/api/v1/detect_outliers?method=invalid')
     assert response.status_code == 500
-    assert "error" in response.json
\ No newline at end of file
+    assert "error" in response.json
+def test_pipeline_stages_hand_off_through_stage_storage(client, monkeypatch, data_dir):
+    raw_file = data_dir / "raw.csv"
+    raw_file.write_text("timestamp,col1,col2\n2021-05-15 00:00:00,1,\n2021-05-15 00:30:00,,4\n2021-05-15 01:00:00,3,6")
+    monkeypatch.setattr("endpoints.fill_missing.file_path", str(raw_file))
+    monkeypatch.setattr("endpoints.detect_outliers.file_path", str(data_dir / "imputed_data.feather"))
+
+    response = client.get('/api/v1/fill_missing?method=mean&export=csv')
+    assert response.status_code == 200
+    assert response.json["file_path"].endswith("imputed_data.feather")
+    assert (data_dir / "imputed_data.csv").exists()
+
+    response = client.get('/api/v1/detect_outliers?method=iqr')
+    assert response.status_code == 200
+    assert (data_dir / "transformed_data.feather").exists()
+
+def test_fill_missing_invalid_export(client, monkeypatch, tmp_path):
+    raw_file = tmp_path / "raw.csv"
+    raw_file.write_text("col1,col2\n1,\n3,4")
+    monkeypatch.setattr("endpoints.fill_missing.file_path", str(raw_file))
+    response = client.get('/api/v1/fill_missing?method=constant&export=xlsx')
+    assert response.status_code == 400
+    assert "Invalid export format" in response.json["error"]
+
+def test_upload_data_stream_returns_schema_summary(client, monkeypatch, tmp_path):
+    monkeypatch.setattr("endpoints.upload_data.file_path", str(tmp_path / "raw.feather"))
+    monkeypatch.setattr("core.config.ingest_chunk_rows", 2)
+    body = "timestamp,col1,col2\n2021-05-15 00:00:00,1,a\n2021-05-15 00:30:00,,b\n2021-05-15 01:00:00,3,c"
+    response = client.post('/api/v1/upload', data=body, content_type='text/csv')
+    assert response.status_code == 200
+    assert response.json["rows"] == 3
+    assert response.json["columns"] == 3
+    assert response.json["schema"]["col1"] == "float64"
+
+def test_upload_data_rejects_chunk_not_matching_schema(client, monkeypatch, tmp_path):
+    monkeypatch.setattr("endpoints.upload_data.file_path", str(tmp_path / "raw.feather"))
+    monkeypatch.setattr("core.config.ingest_chunk_rows", 2)
+    body = "col1,col2\n1,2\n3,4\nx,5"
+    response = client.post('/api/v1/upload', data=body, content_type='text/csv')
+    assert response.status_code == 400
+    assert "Rows 2-2" in response.json["error"]
+    assert not (tmp_path / "raw.feather").exists()
+
+def test_pipeline_runs_all_stages_in_one_call(client, monkeypatch, data_dir):
+    monkeypatch.setattr("endpoints.pipeline.file_path", "data/dummy_data_with_outliers.csv")
+    response = client.post('/api/v1/pipeline', json={"fill_method": "mean", "outlier_method": "iqr", "top_x": 50})
+    assert response.status_code == 200
+    assert [stage["stage"] for stage in response.json["stages"]] == ["fill_missing", "detect_outliers", "feature_extraction"]
+    assert set(response.json["description"]) == set(response.json["selected_features"])
+    for name in ("imputed_data", "transformed_data", "selected_features"):
+        assert (data_dir / f"{name}.feather").exists()
+
+def test_pipeline_invalid_spec(client):
+    response = client.get('/api/v1/pipeline?fill_method=median')
+    assert response.status_code == 400
+    response = client.get('/api/v1/pipeline?top_x=abc')
+    assert response.status_code == 400
+
+def test_transform_applies_fitted_models_to_new_batch(client, monkeypatch, data_dir):
+    raw_file = data_dir / "raw.csv"
+    raw_file.write_text("timestamp,col1,col2\n2021-05-15 00:00:00,1,\n2021-05-15 00:30:00,,4\n2021-05-15 01:00:00,3,6\n2021-05-15 01:30:00,2,5")
+    monkeypatch.setattr("endpoints.fill_missing.file_path", str(raw_file))
+    monkeypatch.setattr("endpoints.detect_outliers.file_path", str(data_dir / "imputed_data.feather"))
+
+    first = client.get('/api/v1/fill_missing?method=mean').json
+    assert first["refit"] is True
+    # The same model, written as the next version of the imputed stage
+    assert client.get('/api/v1/fill_missing?method=mean').json == {**first, "refit": False, "version": first["version"] + 1}
+    client.get('/api/v1/detect_outliers?method=iqr')
+
+    batch = "timestamp,col1,col2\n2021-05-15 02:00:00,,100"
+    response = client.post('/api/v1/transform', data=batch, content_type='text/csv')
+    assert response.status_code == 200
+    assert [model["stage"] for model in response.json["models"]] == ["fill_missing", "detect_outliers"]
+    row = response.json["data"][0]
+    assert row["col1"] == 2.0
+    assert row["col2"] == response.json["models"][1]["bounds"]["col2"]["upper"]
+
+def test_transform_invalid_stage(client):
+    response = client.post('/api/v1/transform?stage=feature_extraction', json=[])
+    assert response.status_code == 400
+
+def test_feature_extraction_keeps_top_ranked_features(client, monkeypatch, data_dir):
+    transformed_file = data_dir / "transformed.csv"
+    transformed_file.write_text("timestamp,low,high,mid\nt1,1,10,5\nt2,2,50,7\nt3,1,90,9\nt4,2,20,1")
+    monkeypatch.setattr("endpoints.feature_extraction.file_path", str(transformed_file))
+    response = client.get('/api/v1/feature_extraction?top_x=34')
+    assert response.status_code == 200
+    assert response.json["selected_features"] == ["high"]
+    assert response.json["scores"]["high"] > response.json["scores"]["mid"] > response.json["scores"]["low"]
+
+    response = client.get('/api/v1/feature_extraction?scorer=correlation')
+    assert response.status_code == 400
+
+def test_get_dataframe_pages_projects_and_filters(client, monkeypatch, tmp_path):
+    temp_file = tmp_path / "selected.csv"
+    temp_file.write_text(
+        "timestamp,col1,col2\n2021-05-15 00:00:00,1,\n2021-05-15 00:30:00,2,4\n"
+        "2021-05-15 01:00:00,3,6\n2021-05-15 01:30:00,4,8"
+    )
+    monkeypatch.setattr("endpoints.get_dataframe.file_path", str(temp_file))
+
+    response = client.get('/api/v1/get_dataframe')
+    assert response.status_code == 200
+    assert response.json[0] == {"timestamp": "2021-05-15 00:00:00", "col1": 1, "col2": None}
+
+    response = client.get('/api/v1/get_dataframe?offset=1&limit=2&columns=col2')
+    assert response.json == [{"col2": 4.0}, {"col2": 6.0}]
+    assert response.headers["X-Total-Count"] == "4"
+
+    response = client.get('/api/v1/get_dataframe?start=2021-05-15 00:30&end=2021-05-15 01:00&orient=split')
+    assert response.json == {"columns": ["timestamp", "col1", "col2"],
+                             "data": [["2021-05-15 00:30:00", 2, 4.0], ["2021-05-15 01:00:00", 3, 6.0]]}
+
+    response = client.get('/api/v1/get_dataframe?columns=col1&orient=columns')
+    assert response.json == {"col1": [1, 2, 3, 4]}
+
+    response = client.get('/api/v1/get_dataframe?format=ndjson&limit=2')
+    assert response.mimetype == "application/x-ndjson"
+    assert len(response.data.decode().splitlines()) == 2
+
+    response = client.get('/api/v1/get_dataframe?columns=missing')
+    assert response.status_code == 400
+
+def test_get_dataframe_binary_formats_and_compression(client, monkeypatch, tmp_path):
+    import io, gzip
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import zstandard
+    temp_file = tmp_path / "selected.csv"
+    temp_file.write_text("timestamp,col1,col2\n2021-05-15 00:00:00,1.5,\n2021-05-15 00:30:00,2.5,4")
+    monkeypatch.setattr("endpoints.get_dataframe.file_path", str(temp_file))
+
+    response = client.get('/api/v1/get_dataframe', headers={"Accept": "application/vnd.apache.arrow.stream"})
+    assert response.mimetype == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.data).read_all()
+    assert table.column("col1").to_pylist() == [1.5, 2.5]
+
+    response = client.get('/api/v1/get_dataframe?format=parquet&columns=col2')
+    assert pq.read_table(io.BytesIO(response.data)).column_names == ["col2"]
+
+    response = client.get('/api/v1/get_dataframe', headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert b'"col1":1.5' in gzip.decompress(response.data)
+
+    response = client.get('/api/v1/get_dataframe?format=arrow', headers={"Accept-Encoding": "zstd, gzip;q=0.5"})
+    assert response.headers["Content-Encoding"] == "zstd"
+    data = zstandard.ZstdDecompressor().decompressobj().decompress(response.data)
+    assert pa.ipc.open_stream(data).read_all().num_rows == 2
+
+    response = client.get('/api/v1/get_dataframe?format=xml')
+    assert response.status_code == 400
+
+def test_describe_and_stage_endpoints_negotiate_arrow(client, monkeypatch, data_dir):
+    import json
+    import pyarrow as pa
+    temp_file = data_dir / "data.csv"
+    temp_file.write_text("timestamp,col1,col2\n2021-05-15 00:00:00,1,\n2021-05-15 00:30:00,3,4")
+    monkeypatch.setattr("endpoints.describe_data.file_path", str(temp_file))
+    monkeypatch.setattr("endpoints.fill_missing.file_path", str(temp_file))
+    accept = {"Accept": "application/vnd.apache.arrow.stream"}
+
+    table = pa.ipc.open_stream(client.get('/api/v1/describe', headers=accept).data).read_all()
+    assert table.column("statistic").to_pylist()[:2] == ["count", "mean"]
+
+    response = client.get('/api/v1/fill_missing?method=constant', headers=accept)
+    table = pa.ipc.open_stream(response.data).read_all()
+    assert table.column("col2").to_pylist() == [0.0, 4.0]
+    assert json.loads(table.schema.metadata[b"feature_engine"])["message"] == "Missing values filled successfully."
+
+def test_describe_approximate_exact_and_percentiles(client, monkeypatch, tmp_path):
+    temp_file = tmp_path / "data.csv"
+    temp_file.write_text("col1,col2\n1,2\n3,4\n5,\n7,8")
+    monkeypatch.setattr("endpoints.describe_data.file_path", str(temp_file))
+
+    approximate = client.get('/api/v1/describe?percentiles=0.1,0.9').json
+    exact = client.get('/api/v1/describe?percentiles=0.1,0.9&exact=true').json
+    for column in exact:
+        assert approximate[column] == pytest.approx(exact[column])
+    assert set(exact["col1"]) == {"count", "mean", "std", "min", "10%", "50%", "90%", "max"}
+    assert (tmp_path / "data.csv.stats.npz").exists()
+
+    response = client.get('/api/v1/describe?percentiles=1.5')
+    assert response.status_code == 400
+
+def test_dashboard_analysis_runs_in_process(client, monkeypatch, data_dir):
+    # The callback must not call back into the server over HTTP, so it works on any host and port
+    monkeypatch.setattr("endpoints.dash_plot.original_data_path", "data/dummy_data_with_outliers.csv")
+    states = {"fill-missing-method": "mean", "detect-outliers-method": "iqr", "feature-extraction-top-x": 50,
+              "feature-extraction-scorer": "variance", "feature-extraction-target": None}
+    response = client.post('/_dash-update-component', json={
+        "output": "..analysis-status.children...analysis-result.data..",
+        "outputs": [{"id": "analysis-status", "property": "children"}, {"id": "analysis-result", "property": "data"}],
+        "inputs": [{"id": "analyze-button", "property": "n_clicks", "value": 1}],
+        "state": [{"id": key, "property": "value", "value": value} for key, value in states.items()],
+        "changedPropIds": ["analyze-button.n_clicks"],
+    })
+    assert response.status_code == 200
+    outputs = response.json["response"]
+    assert outputs["analysis-status"]["children"] == "Data analysis completed successfully!"
+    assert outputs["analysis-result"]["data"]["spec"]["top_x"] == 50
+    assert (data_dir / "selected_features.feather").exists()
+
+def test_datasets_are_isolated(client, data_dir):
+    csv = "timestamp,col1,col2\n2021-05-15 00:00:00,1,\n2021-05-15 00:30:00,3,4\n2021-05-15 01:00:00,5,6"
+    response = client.post('/api/v1/datasets/plant-a/upload', data=csv, content_type='text/csv')
+    assert response.status_code == 200
+    assert response.json["dataset"] == "plant-a"
+    assert (data_dir / "datasets" / "plant-a" / "dummy_data_with_outliers.feather").exists()
+
+    response = client.post('/api/v1/datasets/plant-a/pipeline', json={"fill_method": "constant"})
+    assert response.status_code == 200
+    run_id = response.json["run_id"]
+    response = client.get('/api/v1/datasets/plant-a/get_dataframe')
+    assert [row["col2"] for row in response.json] == [0.0, 4.0, 6.0]
+
+    # Nothing was uploaded for plant-b, and the default dataset is untouched
+    assert client.get('/api/v1/datasets/plant-b/get_dataframe').status_code == 404
+    assert not (data_dir / "selected_features.feather").exists()
+
+    entry = client.get('/api/v1/datasets/plant-a').json
+    assert set(entry["stages"]) == {"raw", "imputed", "transformed", "selected"}
+    assert [run["id"] for run in entry["runs"]] == [run_id]
+    assert [dataset["id"] for dataset in client.get('/api/v1/datasets').json] == ["plant-a"]
+
+    assert client.get('/api/v1/datasets/-bad/describe').status_code == 400
+
+    assert client.delete('/api/v1/datasets/plant-a').status_code == 200
+    assert not (data_dir / "datasets" / "plant-a").exists()
+    assert client.delete('/api/v1/datasets/plant-a').status_code == 404
+    assert client.delete('/api/v1/datasets/default').status_code == 400
+    # Names that are not dataset ids never reach the file system
+    for name in ("..", ".", "-bad"):
+        assert client.delete(f'/api/v1/datasets/{name}').status_code == 400
+        assert client.get(f'/api/v1/datasets/{name}/memory').status_code == 400
+    assert data_dir.exists() and client.get('/api/v1/datasets/-bad').status_code == 400
+
+def test_get_dataframe_pins_an_artifact_version(client, monkeypatch, tmp_path):
+    monkeypatch.setattr("endpoints.pipeline.file_path", "data/dummy_data_with_outliers.csv")
+    monkeypatch.setattr("endpoints.get_dataframe.file_path", str(tmp_path / "selected_features.feather"))
+    client.post('/api/v1/pipeline', json={"top_x": 50})
+    client.post('/api/v1/pipeline', json={"top_x": 10})
+
+    response = client.get('/api/v1/get_dataframe?limit=1')
+    assert response.headers["X-Artifact-Version"] == "2"
+    current = response.json[0]
+    response = client.get('/api/v1/get_dataframe?limit=1&version=1')
+    assert response.headers["X-Artifact-Version"] == "1"
+    assert len(response.json[0]) > len(current)
+
+def test_upload_float32_and_memory_report(client):
+    csv = "timestamp,col1,tag\n2021-05-15 00:00:00,1,a\n2021-05-15 00:30:00,,a\n2021-05-15 01:00:00,3,b\n2021-05-15 01:30:00,4,a"
+    response = client.post('/api/v1/datasets/plant-a/upload?float_dtype=float32', data=csv, content_type='text/csv')
+    assert response.json["schema"] == {"timestamp": "datetime64[ns]", "col1": "float32", "tag": "category"}
+    response = client.post('/api/v1/datasets/plant-a/pipeline', json={"fill_method": "time"})
+    assert response.status_code == 200
+    rows = client.get('/api/v1/datasets/plant-a/get_dataframe').json
+    assert rows[1] == {"timestamp": "2021-05-15 00:30:00", "col1": 2.0, "tag": "a"}
+
+    memory = client.get('/api/v1/datasets/plant-a/memory').json
+    assert memory["stages"]["selected"]["dtypes"]["float32"] == 16
+    assert memory["bytes"] == sum(stage["bytes"] for stage in memory["stages"].values())
+    assert client.get('/api/v1/datasets/plant-b/memory').status_code == 404
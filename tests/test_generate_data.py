@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from scripts.generate_data import generate_frame, write_dataset
+
+
+def test_generate_frame_is_parameterized_and_seeded():
+    df = generate_frame(rows=20000, columns=30, missing_rate=0.2, outlier_rate=0.0, seed=7)
+    assert df.shape == (20000, 31)
+    assert df["timestamp"].iloc[1] - df["timestamp"].iloc[0] == pd.Timedelta("30min")
+    assert df.columns[1:].is_unique
+    assert abs(df.iloc[:, 1:].isna().to_numpy().mean() - 0.2) < 0.01
+    pd.testing.assert_frame_equal(df, generate_frame(rows=20000, columns=30, missing_rate=0.2, outlier_rate=0.0, seed=7))
+
+
+def test_outliers_are_out_of_range():
+    df = generate_frame(rows=5000, columns=10, missing_rate=0.0, outlier_rate=0.05, seed=1)
+    values = df.iloc[:, 1:]
+    # Outlier values lie well above the normal range of their tag
+    share = (values > values.quantile(0.9) * 1.05).to_numpy().mean()
+    assert 0.02 < share < 0.06
+
+
+def test_write_dataset_in_chunks(tmp_path):
+    path = str(tmp_path / "data.csv")
+    assert write_dataset(path, chunk_rows=100, rows=250, columns=5, seed=3) == 250
+    df = pd.read_csv(path, parse_dates=["timestamp"])
+    assert df.shape == (250, 6)
+    assert df["timestamp"].is_monotonic_increasing
+    feather_path = str(tmp_path / "data.feather")
+    write_dataset(feather_path, chunk_rows=100, rows=250, columns=5, seed=3)
+    np.testing.assert_allclose(pd.read_feather(feather_path).iloc[:, 1:], df.iloc[:, 1:])
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+from feature_engine.imputation import MeanMedianImputer
+from core import stages
+from core.imputation import Imputer
+from core.models import ModelRegistry
+
+
+@pytest.fixture
+def df():
+    # Irregularly sampled sensors with gaps of different lengths
+    rng = np.random.default_rng(7)
+    stamps = pd.Timestamp("2021-05-15") + pd.to_timedelta(np.sort(rng.choice(24 * 60 * 4, 300, replace=False)), unit="min")
+    values = rng.normal(50, 5, size=(300, 3))
+    values[0:3, 0] = np.nan
+    values[40:45, 0] = np.nan
+    values[100:102, 1] = np.nan
+    values[150:170, 1] = np.nan
+    values[295:, 2] = np.nan
+    df = pd.DataFrame(values, columns=["TI-1", "PI-2", "FI-3"])
+    df.insert(0, "timestamp", stamps.astype(str))
+    return df
+
+
+def test_mean_matches_feature_engine(df):
+    imputed, report = Imputer("mean").fit_transform(df)
+    expected = MeanMedianImputer(imputation_method="mean").fit_transform(df[["TI-1", "PI-2", "FI-3"]])
+    pd.testing.assert_frame_equal(imputed[expected.columns], expected)
+    assert list(imputed.columns) == list(df.columns)
+    assert report["filled"] == {"TI-1": 8, "PI-2": 22, "FI-3": 5}
+    assert report["remaining_missing"] == 0
+
+
+@pytest.mark.parametrize("method", ["linear", "time"])
+def test_interpolation_matches_pandas(df, method):
+    imputed, report = Imputer(method).fit_transform(df)
+    frame = df.set_index(pd.to_datetime(df["timestamp"])).drop(columns="timestamp")
+    expected = frame.interpolate(method=method)
+    np.testing.assert_allclose(imputed[frame.columns].to_numpy(), expected.to_numpy())
+    # Leading gaps have nothing to interpolate from
+    assert report["remaining_missing"] == 3
+
+
+def test_ffill_and_bfill_respect_max_gap(df):
+    frame = df.drop(columns="timestamp")
+    imputed, _ = Imputer("ffill", max_gap=3).fit_transform(df)
+    pd.testing.assert_frame_equal(imputed[frame.columns], frame.ffill(limit=3))
+    imputed, _ = Imputer("bfill", max_gap=2).fit_transform(df)
+    pd.testing.assert_frame_equal(imputed[frame.columns], frame.bfill(limit=2))
+
+
+def test_max_gap_skips_long_gaps(df):
+    imputed, report = Imputer("time", max_gap=5).fit_transform(df)
+    # The 20-row gap stays, the shorter ones are interpolated
+    assert imputed["PI-2"].iloc[150:170].isna().all()
+    assert report["filled"] == {"TI-1": 5, "PI-2": 2, "FI-3": 5}
+
+    stamps = pd.to_datetime(df["timestamp"])
+    imputed, _ = Imputer("ffill", max_gap="30min").fit_transform(df)
+    previous = stamps.iloc[149]
+    expected = (stamps.iloc[150:170] - previous <= pd.Timedelta("30min")).to_numpy()
+    np.testing.assert_array_equal(imputed["PI-2"].iloc[150:170].notna().to_numpy(), expected)
+
+
+def test_rolling_median_and_overrides(df):
+    imputed, report = Imputer("rolling_median", overrides="FI-3:constant", window=7, value=-1).fit_transform(df)
+    frame = df.drop(columns="timestamp")
+    medians = frame["PI-2"].rolling(7, center=True, min_periods=1).median()
+    np.testing.assert_allclose(imputed["PI-2"], frame["PI-2"].fillna(medians))
+    assert (imputed["FI-3"].iloc[295:] == -1).all()
+    assert report["filled"]["FI-3"] == 5
+
+
+def test_seasonal_fills_from_the_daily_profile():
+    stamps = pd.date_range("2021-05-15", periods=24 * 14, freq="h")
+    values = np.sin(2 * np.pi * stamps.hour / 24) * 10 + 50
+    df = pd.DataFrame({"timestamp": stamps, "TI-1": values})
+    df.loc[100:105, "TI-1"] = np.nan
+    imputed, report = Imputer("seasonal", period="1D").fit_transform(df)
+    np.testing.assert_allclose(imputed["TI-1"], values)
+    assert report["filled"] == {"TI-1": 6}
+
+    without_time = df.drop(columns="timestamp")
+    imputed, _ = Imputer("seasonal", period=24).fit_transform(without_time)
+    np.testing.assert_allclose(imputed["TI-1"], values)
+
+
+def test_invalid_options(df):
+    with pytest.raises(ValueError, match="Invalid method"):
+        Imputer("median")
+    with pytest.raises(ValueError, match="Invalid method"):
+        Imputer("mean", overrides="TI-1:median")
+    with pytest.raises(ValueError, match="unknown"):
+        Imputer("mean", overrides="TI-9:ffill").fit(df)
+    with pytest.raises(ValueError, match="max_gap"):
+        Imputer("ffill", max_gap="soon").fit_transform(df)
+
+
+def test_stage_caches_the_imputer(df, tmp_path, monkeypatch):
+    monkeypatch.setattr(stages, "model_registry", ModelRegistry(str(tmp_path)))
+    first_df, first = stages.fill_missing(df, "seasonal", period="1D")
+    second_df, second = stages.fill_missing(df, "seasonal", period="1D")
+    assert first["refit"] and not second["refit"]
+    assert first["model_id"] == second["model_id"]
+    pd.testing.assert_frame_equal(first_df, second_df)
@@ -0,0 +1,45 @@
+import time
+import pytest
+from core.jobs import JobManager
+
+@pytest.fixture
+def manager(monkeypatch, data_dir):
+    (data_dir / "dummy_data_with_outliers.csv").write_text(
+        "timestamp,col1,col2\n2021-05-15 00:00:00,1,\n2021-05-15 00:30:00,,4\n2021-05-15 01:00:00,3,6"
+    )
+    manager = JobManager(max_workers=1, max_pending=2)
+    monkeypatch.setattr("endpoints.jobs.job_manager", manager)
+    yield manager
+    manager.shutdown()
+
+def wait_for(client, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f'/api/v1/jobs/{job_id}').json
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.1)
+    raise AssertionError("Job did not finish in time")
+
+def test_stage_job_runs_in_pool(client, manager, data_dir):
+    response = client.post('/api/v1/jobs', json={"stage": "fill_missing", "params": {"method": "constant"}})
+    assert response.status_code == 202
+    job = wait_for(client, response.json["id"])
+    assert job["status"] == "succeeded"
+    assert job["progress"] == 1.0
+    assert job["result"][0]["stage"] == "fill_missing"
+    assert (data_dir / "imputed_data.feather").exists()
+
+def test_failed_job_reports_error(client, manager):
+    response = client.post('/api/v1/jobs', json={"stage": "fill_missing", "params": {"method": "median"}})
+    job = wait_for(client, response.json["id"])
+    assert job["status"] == "failed"
+    assert "Invalid method" in job["error"]
+
+def test_submit_unknown_stage(client, manager):
+    response = client.post('/api/v1/jobs', json={"pipeline": [{"stage": "unknown"}]})
+    assert response.status_code == 400
+
+def test_get_and_cancel_unknown_job(client):
+    assert client.get('/api/v1/jobs/missing').status_code == 404
+    assert client.delete('/api/v1/jobs/missing').status_code == 404
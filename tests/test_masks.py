@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from core.backends import stage_path
+from core.masks import MaskBuilder, mask_store
+from core.workspace import current_dataset
+from scripts.generate_data import generate_frame
+
+# col1 has a spike at 03:00 and col2 is missing at 02:00 and 05:00
+csv = "timestamp,col1,col2\n" + "\n".join(
+    f"2021-05-15 {hour:02d}:00:00,{1000 if hour == 3 else hour % 4},{'' if hour in (2, 5) else 10 + hour % 3}" for hour in range(24)
+)
+
+@pytest.fixture
+def client(client, upload):
+    upload('plant-a', csv)
+    return client
+
+def test_chunks_and_appends_build_the_same_index():
+    df = generate_frame(1000, 6)
+    whole = MaskBuilder().add(df).finish()
+    chunked = MaskBuilder()
+    for start in range(0, 1000, 37):
+        chunked.add(df.iloc[start:start + 37])
+    appended = MaskBuilder(MaskBuilder().add(df.iloc[:333]).finish()).add(df.iloc[333:]).finish()
+    for index in (chunked.finish(), appended):
+        np.testing.assert_array_equal(index.bits["missing"], whole.bits["missing"])
+        np.testing.assert_array_equal(index.timestamps, whole.timestamps)
+    assert whole.counts["missing"].tolist() == df.isna().sum().tolist()
+    assert whole.bits["outliers"] is None
+
+def test_queries_answer_from_the_index(client):
+    response = client.get('/api/v1/datasets/plant-a/masks/columns?min_percent=5')
+    assert response.json["columns"] == [{"column": "col2", "count": 2, "percent": pytest.approx(100 * 2 / 24)}]
+    # Outliers are flagged by outlier detection
+    assert client.get('/api/v1/datasets/plant-a/masks/rows').status_code == 404
+    client.post('/api/v1/datasets/plant-a/pipeline', json={"fill_method": "ffill", "outlier_method": "iqr", "top_x": 100})
+    response = client.get('/api/v1/datasets/plant-a/masks/rows?start=2021-05-15 01:00&end=2021-05-15 04:00')
+    assert response.json["total"] == 1
+    assert response.json["rows"] == [{"row": 3, "timestamp": "2021-05-15 03:00:00", "columns": ["col1"]}]
+    assert client.get('/api/v1/datasets/plant-a/masks/rows?start=2021-05-15 04:00').json["total"] == 0
+    # Nothing is missing once filled, but the raw data still has its gaps
+    assert client.get('/api/v1/datasets/plant-a/masks/columns?stage=imputed').json["columns"] == []
+    matrix = client.get('/api/v1/datasets/plant-a/masks/matrix?columns=col2').json
+    assert matrix["columns"] == ["col2"] and matrix["rows"] == [[0, 24]] and matrix["share"] == [[pytest.approx(2 / 24, abs=1e-6)]]
+    assert client.get('/api/v1/datasets/plant-a/masks/rows?kind=outliers&stage=raw').status_code == 400
+    assert client.get('/api/v1/datasets/plant-a/masks/columns?kind=nan').status_code == 400
+
+def test_writes_keep_the_index_current(client):
+    client.post('/api/v1/datasets/plant-a/pipeline', json={"fill_method": "ffill", "outlier_method": "iqr", "top_x": 100, "mode": "chunked"})
+    assert client.get('/api/v1/datasets/plant-a/masks?kind=outliers').json["total_outliers"] == 1
+    batch = "timestamp,col1,col2\n2021-05-16 00:00:00,5000,\n2021-05-16 01:00:00,1,11"
+    response = client.post('/api/v1/datasets/plant-a/append', data=batch, content_type='text/csv')
+    assert response.status_code == 200
+    current_dataset.set("plant-a")
+    # Extended with the new rows, not rebuilt from the data
+    index = mask_store.get(stage_path("transformed"))
+    assert index is not None and index.rows == 26 and index.counts["outliers"].tolist() == [0, 2, 0]
+    assert mask_store.get(stage_path("raw")).counts["missing"].tolist() == [0, 0, 3]
+    matrix = client.get('/api/v1/datasets/plant-a/masks/matrix?kind=outliers&bins=4').json
+    assert sum(share[1] * (stop - start) for share, (start, stop) in zip(matrix["share"], matrix["rows"])) == pytest.approx(2, abs=1e-4)
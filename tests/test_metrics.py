@@ -0,0 +1,64 @@
+import json
+import logging
+
+import pytest
+from core.logs import JsonFormatter
+from core.metrics import Registry, registry
+
+csv = "timestamp,col1,col2\n2021-05-15 00:00:00,1,\n2021-05-15 00:30:00,3,4\n2021-05-15 01:00:00,5,6"
+
+@pytest.fixture
+def client(client):
+    registry.clear()
+    return client
+
+def test_registry_renders_prometheus_text():
+    metrics = Registry()
+    metrics.inc("requests_total", {"endpoint": 'a"b'}, 2, "Requests.")
+    metrics.observe("request_seconds", {"endpoint": "a"}, 0.3, "Latency.")
+    text = metrics.render()
+    assert '# TYPE requests_total counter\nrequests_total{endpoint="a\\"b"} 2' in text
+    assert 'request_seconds_bucket{endpoint="a",le="0.25"} 0' in text
+    assert 'request_seconds_bucket{endpoint="a",le="0.5"} 1' in text
+    assert 'request_seconds_bucket{endpoint="a",le="+Inf"} 1' in text
+    assert 'request_seconds_sum{endpoint="a"} 0.3' in text
+
+def test_requests_are_counted_and_timed_by_phase(client, caplog, capsys):
+    with caplog.at_level(logging.INFO, logger="core.metrics"):
+        assert client.post('/api/v1/datasets/plant-a/upload', data=csv, content_type='text/csv').status_code == 200
+        assert client.post('/api/v1/datasets/plant-a/pipeline', json={"fill_method": "mean"}).status_code == 200
+        # A streamed body is measured once the server closes the response
+        with client.get('/api/v1/datasets/plant-a/get_dataframe') as response:
+            assert len(response.json) == 3
+    # Debug output goes through logging, not stdout
+    assert capsys.readouterr().out == ""
+
+    assert registry.value("feature_engine_requests_total", endpoint="pipeline", status="200") == 1
+    assert registry.value("feature_engine_rows_processed_total", endpoint="upload_data") == 3
+    assert registry.value("feature_engine_cells_processed_total", endpoint="get_dataframe") == 9
+    assert registry.value("feature_engine_request_phase_seconds_total", endpoint="pipeline", phase="write") > 0
+    assert registry.value("feature_engine_request_phase_seconds_total", endpoint="get_dataframe", phase="serialize") > 0
+
+    record = next(record for record in caplog.records if record.fields["endpoint"] == "pipeline")
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "request" and entry["dataset"] == "plant-a" and entry["status"] == 200
+    assert set(entry["phases"]) == {"read", "write", "serialize", "compute"}
+
+    response = client.get('/api/v1/metrics')
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert 'feature_engine_request_seconds_count{endpoint="pipeline"} 1' in text
+    assert 'feature_engine_stage_seconds_count{stage="fill_missing"} 1' in text
+    assert "process_resident_memory_bytes" in text
+    assert "# TYPE process_cpu_seconds_total counter" in text and "# TYPE feature_engine_store_hits_total counter" in text
+    assert "# TYPE feature_engine_store_misses_total counter" in text
+
+def test_profile_returns_breakdown_instead_of_body(client):
+    client.post('/api/v1/datasets/plant-a/upload', data=csv, content_type='text/csv')
+    client.post('/api/v1/datasets/plant-a/pipeline', json={"fill_method": "mean"})
+    response = client.get('/api/v1/datasets/plant-a/describe?exact=true&profile=1')
+    assert response.status_code == 200
+    assert response.json["endpoint"] == "describe_data" and response.json["status"] == 200
+    assert response.json["peak_memory_bytes"] > 0
+    assert response.json["profile"][0]["cumulative_seconds"] >= response.json["profile"][-1]["cumulative_seconds"]
+    assert any("describe" in row["function"] for row in response.json["profile"])
@@ -0,0 +1,51 @@
+import os
+import pandas as pd
+from feature_engine.imputation import MeanMedianImputer
+from core.models import ModelRegistry, fingerprint
+
+
+def make_df(values):
+    return pd.DataFrame({"timestamp": ["t1", "t2", "t3"], "col1": values})
+
+
+def test_fingerprint_depends_on_content():
+    df = make_df([1.0, None, 3.0])
+    assert fingerprint(df) == fingerprint(make_df([1.0, None, 3.0]))
+    assert fingerprint(df) != fingerprint(make_df([1.0, None, 4.0]))
+    assert fingerprint(df) != fingerprint(df.rename(columns={"col1": "col2"}))
+
+
+def test_fit_is_cached_in_memory_and_on_disk(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    df = make_df([1.0, None, 3.0])
+    calls = []
+
+    def fit(data):
+        calls.append(1)
+        return MeanMedianImputer().fit(data)
+
+    model, model_id, refit = registry.fit("fill_missing", {"method": "mean"}, df, fit)
+    assert refit and os.path.exists(tmp_path / f"{model_id}.joblib")
+    _, same_id, refit = registry.fit("fill_missing", {"method": "mean"}, make_df([1.0, None, 3.0]), fit)
+    assert same_id == model_id and not refit
+    assert len(calls) == 1
+
+    # A fresh registry (e.g. another worker) loads the model from disk
+    other = ModelRegistry(str(tmp_path))
+    assert other.latest("fill_missing") == model_id
+    assert other.get(model_id).imputer_dict_ == model.imputer_dict_
+    assert other.get("../../etc/passwd") is None
+
+
+def test_reuse_skips_refit_on_new_data(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    _, model_id, _ = registry.fit("fill_missing", {"method": "mean"}, make_df([1.0, None, 3.0]), MeanMedianImputer().fit)
+    _, reused_id, refit = registry.fit("fill_missing", {"method": "mean"}, make_df([5.0, 6.0, None]), MeanMedianImputer().fit, reuse=True)
+    assert reused_id == model_id and not refit
+
+
+def test_disk_eviction(tmp_path):
+    registry = ModelRegistry(str(tmp_path), max_memory_entries=1, max_disk_entries=2)
+    for value in range(4):
+        registry.fit("fill_missing", {"method": "mean"}, make_df([float(value), None, 1.0]), MeanMedianImputer().fit)
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".joblib")]) == 2
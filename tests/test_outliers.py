@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from feature_engine.outliers import Winsorizer
+from core import stages
+from core.models import ModelRegistry
+from core.outliers import OutlierDetector
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(42)
+    values = rng.normal(50, 5, size=(200, 3))
+    values[:5, 0] = 500
+    values[10:20, 1] = np.nan
+    df = pd.DataFrame(values, columns=["TI-1", "PI-2", "FI-3"])
+    df.insert(0, "timestamp", pd.date_range("2021-05-15", periods=200, freq="30min").astype(str))
+    return df
+
+
+@pytest.mark.parametrize("method,capping_method", [("iqr", "iqr"), ("gaussian", "gaussian"), ("mad", "mad"), ("quantile", "quantiles")])
+def test_bounds_match_feature_engine(df, method, capping_method):
+    detector = OutlierDetector(method).fit(df)
+    winsorizer = Winsorizer(capping_method=capping_method, tail="both", fold=detector.fold, missing_values="ignore")
+    winsorizer.fit(df[detector.columns_])
+    np.testing.assert_allclose(detector.lower_, [winsorizer.left_tail_caps_[c] for c in detector.columns_])
+    np.testing.assert_allclose(detector.upper_, [winsorizer.right_tail_caps_[c] for c in detector.columns_])
+
+
+def test_cap_clips_values_and_reports_counts(df):
+    transformed, report = OutlierDetector("iqr").fit_transform(df)
+    assert report["outlier_counts"]["TI-1"] >= 5
+    assert transformed["TI-1"].max() == pytest.approx(report["bounds"]["TI-1"]["upper"])
+    assert transformed["PI-2"].isna().sum() == 10
+    assert transformed["timestamp"].equals(df["timestamp"])
+
+
+def test_flag_leaves_values_untouched(df):
+    transformed, report = OutlierDetector("gaussian", tail="right").fit_transform(df, action="flag")
+    assert transformed is df
+    assert report["bounds"]["TI-1"]["lower"] is None
+    assert report["total_outliers"] > 0
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        OutlierDetector("mean")
+    with pytest.raises(ValueError):
+        OutlierDetector("iqr", tail="middle")
+    for method, fold in (("quantile", 0.9), ("quantile", 0.5), ("iqr", -1), ("gaussian", 0), ("mad", float("nan"))):
+        with pytest.raises(ValueError):
+            OutlierDetector(method, fold)
+
+
+def test_reuse_applies_previously_fitted_bounds(df, monkeypatch, tmp_path):
+    monkeypatch.setattr(stages, "model_registry", ModelRegistry(str(tmp_path)))
+    _, first = stages.detect_outliers(df, "iqr")
+    batch = df.iloc[:20]
+    _, second = stages.detect_outliers(batch, "iqr", reuse=True)
+    assert first["refit"] and not second["refit"]
+    assert second["bounds"] == first["bounds"]
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+from core import parallel
+from core.imputation import Imputer
+from core.outliers import OutlierDetector
+from core.stats import ColumnSummary
+from scripts.generate_data import generate_frame
+
+@pytest.fixture
+def frame():
+    return generate_frame(3000, 7)
+
+def run_both(monkeypatch, function):
+    serial = function()
+    monkeypatch.setattr("core.config.column_min_cells", 0)
+    monkeypatch.setattr("core.config.column_workers", 2)
+    try:
+        return serial, function()
+    finally:
+        parallel.shutdown()
+
+def test_shards_cover_every_column_once():
+    assert parallel.shards(7, 3) == [(0, 2), (2, 4), (4, 7)]
+    assert parallel.shards(2, 4) == [(0, 1), (1, 2)]
+
+@pytest.mark.parametrize("method", ["mean", "ffill", "time"])
+def test_parallel_fills_match_serial_fills(monkeypatch, frame, method):
+    serial, shared = run_both(monkeypatch, lambda: Imputer(method).fit(frame).transform(frame))
+    pd.testing.assert_frame_equal(shared[0], serial[0])
+    assert shared[1] == serial[1]
+
+@pytest.mark.parametrize("method", ["iqr", "gaussian", "mad", "quantile"])
+def test_parallel_outlier_bounds_and_caps_match_serial_ones(monkeypatch, frame, method):
+    def detect():
+        detector = OutlierDetector(method).fit(frame)
+        return detector, detector.transform(frame, "cap"), detector.transform(frame, "flag")
+    serial, shared = run_both(monkeypatch, detect)
+    np.testing.assert_allclose(shared[0].lower_, serial[0].lower_, rtol=1e-12)
+    np.testing.assert_allclose(shared[0].upper_, serial[0].upper_, rtol=1e-12)
+    for action in (1, 2):
+        pd.testing.assert_frame_equal(shared[action][0], serial[action][0])
+        assert shared[action][1]["outlier_counts"] == serial[action][1]["outlier_counts"]
+
+def test_parallel_summaries_match_serial_ones(monkeypatch, frame):
+    def summarize():
+        summary = ColumnSummary.from_frame(frame.iloc[:1000])
+        return summary.update(summary_block(frame.iloc[1000:], summary.columns))
+    serial, shared = run_both(monkeypatch, summarize)
+    for name in ("count", "mean", "m2", "min", "max"):
+        np.testing.assert_allclose(getattr(shared, name), getattr(serial, name))
+    np.testing.assert_allclose(shared.quantiles([0.25, 0.5, 0.75]), serial.quantiles([0.25, 0.5, 0.75]))
+
+def summary_block(df, columns):
+    return df[columns].to_numpy(dtype=np.float64)
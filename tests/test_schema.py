@@ -0,0 +1,65 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from core.ingest import ingest_csv
+from core.responses import iter_json
+from core.schema import apply_schema, infer_schema, load_schema, memory_report, read_csv
+from core.store import DatasetStore
+
+
+# The schema is stored in the dataset directory
+pytestmark = pytest.mark.usefixtures("data_dir")
+
+
+@pytest.fixture
+def csv():
+    rng = np.random.default_rng(3)
+    timestamps = pd.date_range("2021-05-15", periods=200, freq="30min").strftime("%Y-%m-%d %H:%M:%S")
+    df = pd.DataFrame({"timestamp": timestamps, "TI-1": rng.normal(50, 5, 200), "count": rng.integers(0, 9, 200),
+                       "unit": rng.choice(["degC", "bar"], 200), "note": [f"n{i}" for i in range(200)]})
+    return df.to_csv(index=False)
+
+
+def test_infer_schema(csv):
+    schema = infer_schema(pd.read_csv(io.StringIO(csv)), "float32")
+    assert schema["dtypes"] == {"timestamp": "datetime64[ns]", "TI-1": "float32", "count": "float32",
+                                "unit": "category", "note": "object"}
+    assert schema["timestamp_format"] == "%Y-%m-%d %H:%M:%S"
+    with pytest.raises(ValueError, match="float dtype"):
+        infer_schema(pd.read_csv(io.StringIO(csv)), "float16")
+
+
+def test_upload_schema_is_used_by_every_reader(csv, tmp_path):
+    path = str(tmp_path / "raw.feather")
+    summary = ingest_csv(io.BytesIO(csv.encode()), path, chunk_rows=64, float_dtype="float32")
+    assert summary["schema"]["TI-1"] == "float32"
+    assert load_schema()["dtypes"] == summary["schema"]
+
+    df = DatasetStore().load("raw", path)
+    assert df.dtypes.astype(str).to_dict() == summary["schema"]
+    expected = pd.read_csv(io.StringIO(csv), parse_dates=["timestamp"])
+    np.testing.assert_allclose(df["TI-1"], expected["TI-1"], rtol=1e-6)
+    assert (df["timestamp"] == expected["timestamp"]).all()
+
+    # Stage outputs computed in float64 are stored with the dataset dtypes
+    saved = DatasetStore().save("imputed", df.astype({"TI-1": "float64"}), str(tmp_path / "imputed.feather"))
+    assert saved["TI-1"].dtype == np.float32
+
+    batch = read_csv(io.StringIO(csv), load_schema())
+    assert batch.dtypes.astype(str).to_dict() == summary["schema"]
+
+
+def test_memory_report_shows_the_savings(csv):
+    df = pd.read_csv(io.StringIO(csv))
+    compact = apply_schema(df, infer_schema(df, "float32"))
+    report = memory_report(compact)
+    assert report["bytes"] < memory_report(df)["bytes"]
+    assert report["dtypes"]["float32"] == 2 * 200 * 4
+    assert report["float64_bytes"] == 2 * 200 * 8
+
+
+def test_json_keeps_plain_timestamps():
+    df = pd.DataFrame({"timestamp": pd.to_datetime(["2021-05-15 00:00:00", None]), "col1": [1.0, 2.0]})
+    assert "".join(iter_json(df)) == '[{"timestamp":"2021-05-15 00:00:00","col1":1.0},{"timestamp":null,"col1":2.0}]'
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+from core.selection import rank_features
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    target = rng.normal(size=500)
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2021-05-15", periods=500, freq="30min").astype(str),
+        "noise": rng.normal(scale=10, size=500),
+        "signal": target * 2 + rng.normal(scale=0.1, size=500),
+        "weak": target + rng.normal(scale=1, size=500),
+        "target": target,
+    })
+
+
+def test_variance_ranks_by_score(df):
+    scores = rank_features(df)
+    assert scores.index[0] == "noise"
+    assert "timestamp" not in scores.index
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+@pytest.mark.parametrize("scorer", ["correlation", "mutual_info", "tree"])
+def test_target_scorers_find_the_signal(df, scorer):
+    scores = rank_features(df, scorer, target="target", n_jobs=1)
+    assert list(scores.index[:2]) == ["signal", "weak"]
+    assert "target" not in scores.index
+
+
+def test_seeded_scores_are_deterministic(df):
+    first = rank_features(df, "tree", target="target", sample_rows=200, n_estimators=10)
+    second = rank_features(df, "tree", target="target", sample_rows=200, n_estimators=10)
+    pd.testing.assert_series_equal(first, second)
+
+
+def test_invalid_options(df):
+    with pytest.raises(ValueError):
+        rank_features(df, "chi2")
+    with pytest.raises(ValueError):
+        rank_features(df, "correlation")
+    with pytest.raises(ValueError):
+        rank_features(df, "correlation", target="missing")
@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from app import create_app, parse_components
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Seconds an API-only app may add to the import of its unavoidable dependencies
+import_budget = float(os.environ.get("FEATURE_ENGINE_IMPORT_BUDGET", "0.5"))
+
+heavy_modules = ("sklearn", "scipy", "dash", "dash_bootstrap_components", "plotly", "feature_engine")
+
+script = """
+import json, sys, time
+started = time.perf_counter()
+import flask, pandas, pyarrow
+baseline = time.perf_counter()
+import app
+print(json.dumps({"seconds": time.perf_counter() - baseline, "dependencies": baseline - started,
+                  "modules": sorted({name.split(".")[0] for name in sys.modules})}))
+"""
+
+def start(components):
+    env = {**os.environ, "FEATURE_ENGINE_COMPONENTS": components}
+    result = subprocess.run([sys.executable, "-c", script], cwd=root, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_api_only_app_skips_heavy_imports_within_budget():
+    # The best of a few runs, so a busy machine does not fail the check
+    runs = [start("api") for _ in range(3)]
+    assert not set(heavy_modules) & set(runs[0]["modules"])
+    assert min(run["seconds"] for run in runs) < import_budget
+
+def test_components_select_what_the_app_serves():
+    rules = lambda app: {rule.rule for rule in app.url_map.iter_rules()}
+    api = rules(create_app("api"))
+    assert "/api/v1/fill_missing" in api and "/" not in api
+    dashboard = rules(create_app("dashboard"))
+    assert "/" in dashboard and "/api/v1/fill_missing" not in dashboard
+    assert parse_components("api, dashboard") == ("api", "dashboard")
+    with pytest.raises(ValueError):
+        parse_components("api,admin")
@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.ingest import ingest_csv
+from core.stats import ColumnSummary, SummaryStore, summary_path
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.lognormal(size=(20000, 4)), columns=["a", "b", "c", "d"])
+    df.loc[::5, "b"] = np.nan
+    df["tag"] = "x"
+    return df
+
+
+def test_small_frames_match_pandas_describe():
+    df = pd.DataFrame({"a": [1.0, 3.0, 2.0, np.nan], "b": [4.0, 1.0, 2.0, 8.0]})
+    pd.testing.assert_frame_equal(ColumnSummary.from_frame(df).describe(), df.describe())
+
+
+def test_merged_summaries_approximate_the_full_frame(frame):
+    summary = ColumnSummary.from_frame(frame.iloc[:7000])
+    summary.merge(ColumnSummary.from_frame(frame.iloc[7000:]))
+    description, exact = summary.describe([0.01, 0.5, 0.99]), frame.describe([0.01, 0.5, 0.99])
+
+    np.testing.assert_allclose(description.loc[["count", "mean", "std", "min", "max"]], exact.loc[["count", "mean", "std", "min", "max"]])
+    for q in (0.01, 0.5, 0.99):
+        values = description.loc[f"{q * 100:g}%"]
+        ranks = [frame[column].dropna().le(values[column]).mean() for column in description.columns]
+        assert np.abs(np.array(ranks) - q).max() < 0.005
+
+
+def test_summary_store_caches_on_disk_by_file_signature(frame, tmp_path):
+    path = str(tmp_path / "data.csv")
+    frame.to_csv(path, index=False)
+    loads = []
+
+    def load_frame():
+        loads.append(1)
+        return frame
+
+    SummaryStore().load(path, load_frame)
+    summary = SummaryStore().load(path, load_frame)
+    assert len(loads) == 1
+    assert summary.columns == ["a", "b", "c", "d"]
+
+    frame.iloc[:10].to_csv(path, index=False)
+    os.utime(path, ns=(0, 0))
+    SummaryStore().load(path, load_frame)
+    assert len(loads) == 2
+
+
+def test_ingest_builds_the_summary_chunk_by_chunk(frame, data_dir):
+    # The upload also stores the dataset schema in the data directory
+    source = data_dir / "upload.csv"
+    frame.to_csv(source, index=False)
+    path = str(data_dir / "raw.feather")
+    with open(source, "rb") as stream:
+        ingest_csv(stream, path, chunk_rows=3000)
+
+    summary, _ = ColumnSummary.load(summary_path(path))
+    assert summary.count.tolist() == frame[["a", "b", "c", "d"]].count().tolist()
+    np.testing.assert_allclose(summary.mean, frame[["a", "b", "c", "d"]].mean())
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+from core.store import DatasetStore
+
+
+# Saves record their artifacts in the dataset index under the data directory
+pytestmark = pytest.mark.usefixtures("data_dir")
+
+
+def test_load_is_cached_until_file_changes(tmp_path):
+    temp_file = tmp_path / "data.csv"
+    temp_file.write_text("col1,col2\n1,2\n3,4")
+    store = DatasetStore()
+
+    first = store.load("raw", str(temp_file))
+    second = store.load("raw", str(temp_file))
+    assert first is second
+    assert store.hits == 1 and store.misses == 1
+
+    temp_file.write_text("col1,col2\n1,2\n3,4\n5,6")
+    assert len(store.load("raw", str(temp_file))) == 3
+
+
+def test_save_and_invalidate(tmp_path):
+    store = DatasetStore()
+    df = pd.DataFrame({"col1": [1.0, 2.0]})
+    store.save("imputed", df, str(tmp_path / "imputed.csv"))
+    assert store.load("imputed", str(tmp_path / "imputed.csv")) is not None
+    assert store.hits == 1
+
+    store.invalidate()
+    assert store.stats()["entries"] == []
+    assert store.memory_usage == 0
+
+
+def test_lru_eviction_respects_memory_budget(tmp_path):
+    df = pd.DataFrame({"col1": range(1000)}, dtype="float64")
+    nbytes = int(df.memory_usage(deep=True).sum())
+    store = DatasetStore(memory_budget=nbytes * 2)
+
+    store.save("raw", df, str(tmp_path / "raw.csv"))
+    store.save("imputed", df, str(tmp_path / "imputed.csv"))
+    store.load("raw", str(tmp_path / "raw.csv"))
+    store.save("transformed", df, str(tmp_path / "transformed.csv"))
+
+    stages = [entry["stage"] for entry in store.stats()["entries"]]
+    assert stages == ["raw", "transformed"]
+    assert store.memory_usage <= store.memory_budget
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.stats import ColumnSummary
+from core.views import box_figure, box_stats, filter_frame, lttb, minmax, series_figure, table_page
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "timestamp": pd.date_range("2021-05-15", periods=5000, freq="30min"),
+        "a": rng.normal(size=5000),
+        "b": rng.normal(size=5000),
+    })
+    df.loc[1234, "a"] = 50.0
+    return df
+
+
+def test_box_stats_match_tukey_boxes():
+    df = pd.DataFrame({"a": [1.0, 2.0, 3.0, 4.0, 100.0, np.nan]})
+    stats = box_stats(df).loc["a"]
+    assert (stats["q1"], stats["median"], stats["q3"]) == (2.0, 3.0, 4.0)
+    assert (stats["lowerfence"], stats["upperfence"], stats["outliers"]) == (1.0, 4.0, 1)
+
+
+def test_box_figure_uses_the_summary_quartiles(frame):
+    figure = box_figure(frame, ColumnSummary.from_frame(frame))
+    (trace,) = figure["data"]
+    assert trace["x"] == ["a", "b"]
+    assert "y" not in trace
+    assert trace["median"] == pytest.approx(frame[["a", "b"]].median().tolist(), abs=0.02)
+    assert trace["text"][0] == f"{int(box_stats(frame).loc['a', 'outliers'])} outliers"
+
+
+def test_downsampling_keeps_ends_and_spikes(frame):
+    x, y = np.arange(5000, dtype=np.float64), frame["a"].to_numpy()
+    indices = lttb(x, y, 100)
+    assert len(indices) == 100 and indices[0] == 0 and indices[-1] == 4999
+    assert np.all(np.diff(indices) > 0)
+    assert 1234 in indices
+    assert 1234 in minmax(y, 100)
+
+    figure = series_figure(frame, "a", points=200)
+    assert len(figure["data"][0]["x"]) == 200
+    assert figure["data"][0]["x"][0] == "2021-05-15 00:00:00"
+
+
+def test_table_page_filters_sorts_and_pages(frame):
+    filtered = filter_frame(frame, "{a} > 0 && {b} le 0")
+    assert ((filtered["a"] > 0) & (filtered["b"] <= 0)).all()
+    assert len(filter_frame(frame, "{timestamp} datestartswith 2021-05-16")) == 48
+
+    records, page_count = table_page(frame, 1, 10, [{"column_id": "a", "direction": "desc"}], "{a} > 0")
+    assert page_count == -(-int((frame["a"] > 0).sum()) // 10)
+    expected = frame[frame["a"] > 0].sort_values("a", ascending=False)["a"].iloc[10:20]
+    assert [record["a"] for record in records] == expected.tolist()
+
+    with pytest.raises(ValueError):
+        filter_frame(frame, "{missing} > 0")
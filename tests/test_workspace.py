@@ -0,0 +1,45 @@
+import pytest
+
+from core.backends import stage_path
+from core.workspace import Workspace, current_dataset, dataset_dir, dataset_id
+
+
+def test_stage_paths_follow_the_current_dataset(data_dir):
+    assert stage_path("raw", "csv") == str(data_dir / "dummy_data_with_outliers.csv")
+    token = current_dataset.set("plant-a")
+    try:
+        assert dataset_id() == "plant-a"
+        assert stage_path("raw", "csv") == str(data_dir / "datasets" / "plant-a" / "dummy_data_with_outliers.csv")
+    finally:
+        current_dataset.reset(token)
+    assert dataset_id() == "default"
+
+
+def test_cleanup_removes_expired_datasets_and_runs(data_dir, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("core.workspace.time.time", lambda: clock[0])
+    workspace = Workspace(ttl=3600)
+    for name in ("default", "old", "fresh"):
+        (data_dir / "datasets" / name).mkdir(parents=True)
+        workspace.record(name, "raw", f"{name}.feather", 10, run={"id": name})
+
+    clock[0] += 3000
+    workspace.record("fresh", run={"id": "fresh-2"})
+    clock[0] += 3000
+    assert workspace.cleanup() == ["old"]
+    assert not (data_dir / "datasets" / "old").exists()
+    assert [entry["id"] for entry in workspace.list()] == ["default", "fresh"]
+    assert workspace.get("default")["runs"] == []
+    assert [run["id"] for run in workspace.get("fresh")["runs"]] == ["fresh-2"]
+
+    assert Workspace(ttl=0).cleanup() == []
+
+
+def test_dataset_dirs_stay_inside_the_datasets_directory(data_dir):
+    (data_dir / "datasets" / "kept").mkdir(parents=True)
+    for name in ("..", ".", "../kept", "kept/.."):
+        with pytest.raises(ValueError):
+            dataset_dir(name)
+        with pytest.raises(ValueError):
+            Workspace().delete(name)
+    assert (data_dir / "datasets" / "kept").exists()